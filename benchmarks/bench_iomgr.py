@@ -0,0 +1,33 @@
+import pytest
+
+
+@pytest.fixture(scope="module")
+def iomgr():
+    from cc.plugin_manager import Iomgr, DataSource
+    from cc.datastore import DataStore
+
+    stores = [DataStore(name=f"store{i}", store_type="S3", profile="CC", params={"root": "r"}) for i in range(10)]
+    inputs = [DataSource(name=f"input{i}", paths={"default": f"in/{i}"}, store_name=f"store{i % 10}") for i in range(500)]
+    outputs = [DataSource(name=f"output{i}", paths={"default": f"out/{i}"}, store_name=f"store{i % 10}") for i in range(500)]
+    return Iomgr({}, stores, inputs, outputs)
+
+
+def test_get_input_data_source(benchmark, iomgr):
+    ds = benchmark(iomgr.get_input_data_source, "input499")
+    assert ds.name == "input499"
+
+
+def test_get_output_data_source(benchmark, iomgr):
+    ds = benchmark(iomgr.get_output_data_source, "output499")
+    assert ds.name == "output499"
+
+
+def test_get_store(benchmark, iomgr):
+    assert benchmark(iomgr.get_store, "store9").name == "store9"
+
+
+def test_plugin_manager_startup(benchmark, plugin_manager):
+    from cc.plugin_manager import PluginManager
+
+    pm = benchmark.pedantic(PluginManager, rounds=5)
+    assert pm.get_payload().attributes["test123"] == "TEST123"
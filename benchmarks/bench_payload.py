@@ -0,0 +1,42 @@
+import json
+import pytest
+
+
+def test_payload_decode(benchmark, payload_json):
+    from cc.plugin_manager import Payload
+
+    content = json.dumps(payload_json)
+    payload = benchmark(Payload.from_json, content)
+    assert len(payload.inputs) == len(payload_json["inputs"])
+
+
+@pytest.mark.parametrize("count", [100, 10000])
+def test_template_substitution(benchmark, count):
+    from cc.plugin_manager import _handle_template_substitution
+
+    attrs = {"scenario": "base", "event": "42", "models": ["ras", "hms", "fia"]}
+    templates = {
+        f"path{i}": "/sims/{ATTR::scenario}/{ENV::CC_EVENT_NUMBER}/{ATTR::models[1]}/out.hdf"
+        for i in range(count)
+    }
+
+    def substitute():
+        t = dict(templates)
+        _handle_template_substitution(t, attrs)
+        return t
+
+    result = benchmark(substitute)
+    assert result["path0"] == "/sims/base/1/hms/out.hdf"
+
+
+def test_template_expansion(benchmark):
+    from cc.plugin_manager import _handle_template_substitution
+
+    attrs = {"events": [str(i) for i in range(1000)]}
+
+    def expand():
+        t = {"path": "/sims/{ATTR::events[]}/out.hdf"}
+        _handle_template_substitution(t, attrs)
+        return t
+
+    assert len(benchmark(expand)) == 1000
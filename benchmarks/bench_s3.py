@@ -0,0 +1,44 @@
+import io
+import os
+import pytest
+from cc.plugin_manager import DataSourceOpInput
+
+SIZES = {"1KB": 1024, "1MB": 1024 * 1024, "32MB": 32 * 1024 * 1024}
+
+
+@pytest.fixture(scope="module", params=SIZES.keys())
+def object_size(request):
+    return SIZES[request.param]
+
+
+def test_put_object(benchmark, s3_store, object_size):
+    data = os.urandom(object_size)
+    benchmark(lambda: s3_store.put_object(f"bench/put/{object_size}", io.BytesIO(data)))
+    benchmark.extra_info["bytes"] = object_size
+
+
+def test_get_object(benchmark, s3_store, object_size):
+    s3_store.put_object(f"bench/get/{object_size}", io.BytesIO(os.urandom(object_size)))
+    data = benchmark(lambda: s3_store.get_object(f"bench/get/{object_size}").read())
+    assert len(data) == object_size
+    benchmark.extra_info["bytes"] = object_size
+
+
+def test_copy(benchmark, plugin_manager, object_size):
+    data_store = plugin_manager.get_store("FFRD")
+    src = plugin_manager.get_input_data_source("TestFile")
+    data_store._session.put(io.BytesIO(os.urandom(object_size)), data_store.full_path(src.paths["default"]), None)
+    benchmark(
+        plugin_manager.copy,
+        DataSourceOpInput("TestFile", "default", None),
+        DataSourceOpInput("TestFileOut", "default", None),
+    )
+    benchmark.extra_info["bytes"] = object_size
+
+
+@pytest.mark.parametrize("files", [100, 1000])
+def test_put_folder_small_files(benchmark, s3_store, tmp_path, files):
+    for i in range(files):
+        (tmp_path / f"{i:05d}.txt").write_bytes(os.urandom(512))
+    keys = benchmark.pedantic(s3_store.put_folder, args=(tmp_path, f"bench/folder/{files}"), rounds=3)
+    assert len(keys) == files
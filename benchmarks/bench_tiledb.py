@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+from cc import event_store
+from cc.event_store import ConsolidationMode
+
+SHAPE = (512, 512)
+
+
+def _create(tdb, array_path, array_type=event_store.ArrayType.DENSE):
+    tdb.create_array(
+        event_store.CreateArrayInput(
+            attributes={"depth": np.float32},
+            dimensions=[
+                event_store.ArrayDimension(name="row", domain=[1, SHAPE[0]], tile_extent=128, dimension_type=np.int32),
+                event_store.ArrayDimension(name="col", domain=[1, SHAPE[1]], tile_extent=128, dimension_type=np.int32),
+            ],
+            array_path=array_path,
+            array_type=array_type.value,
+            cell_layout=event_store.LayoutOrder.ROWMAJOR,
+            tile_layout=event_store.LayoutOrder.ROWMAJOR,
+        )
+    )
+
+
+def _put(tdb, array_path, data):
+    tdb.put_array(
+        event_store.PutArrayInput(
+            buffers=[event_store.PutArrayBuffers(attr_name="depth", buffer=data, offsets=None)],
+            buffer_range=None,
+            array_path=array_path,
+            array_type=event_store.ArrayType.DENSE,
+            put_layout=event_store.LayoutOrder.ROWMAJOR.value,
+            coords=None,
+        )
+    )
+
+
+def _get_input(array_path):
+    return event_store.GetArrayInput(attrs=["depth"], array_path=array_path, buffer_range=[1, SHAPE[0] + 1, 1, SHAPE[1] + 1])
+
+
+def _table():
+    import pyarrow as pa
+
+    row, col = np.meshgrid(np.arange(1, SHAPE[0] + 1, dtype=np.int32), np.arange(1, SHAPE[1] + 1, dtype=np.int32), indexing="ij")
+    depth = np.random.default_rng(0).random(SHAPE, dtype=np.float32).ravel()
+    return pa.table({"row": row.ravel(), "col": col.ravel(), "depth": depth})
+
+
+def test_create_array(benchmark, event_store):
+    paths = iter(range(1000000))
+    benchmark(lambda: _create(event_store, f"create/{next(paths)}"))
+
+
+def test_put_array(benchmark, event_store):
+    _create(event_store, "put")
+    data = np.random.default_rng(0).random(SHAPE, dtype=np.float32)
+    benchmark(_put, event_store, "put", data)
+    benchmark.extra_info["bytes"] = data.nbytes
+
+
+def test_get_array(benchmark, event_store):
+    _create(event_store, "get")
+    _put(event_store, "get", np.random.default_rng(0).random(SHAPE, dtype=np.float32))
+    result = benchmark(event_store.get_array, _get_input("get"))
+    assert result["depth"].shape == SHAPE
+
+
+@pytest.mark.parametrize("consolidated", [False, True])
+def test_get_array_fragments(benchmark, event_store, consolidated):
+    _create(event_store, "fragments")
+    for i in range(20):
+        _put(event_store, "fragments", np.full(SHAPE, i, dtype=np.float32))
+    if consolidated:
+        event_store.consolidate("fragments")
+        event_store.vacuum("fragments")
+        event_store.consolidate("fragments", ConsolidationMode.FRAGMENT_META)
+        event_store.vacuum("fragments", ConsolidationMode.FRAGMENT_META)
+    benchmark.extra_info["fragments"] = event_store.fragment_count("fragments")
+    benchmark(event_store.get_array, _get_input("fragments"))
+
+
+def test_metadata(benchmark, event_store):
+    def roundtrip():
+        event_store.put_metadata("key", "value")
+        return event_store.get_metadata("key")
+
+    assert benchmark(roundtrip) == "value"
+
+
+@pytest.mark.parametrize("array_type", [event_store.ArrayType.DENSE, event_store.ArrayType.SPARSE])
+def test_put_table(benchmark, event_store, array_type):
+    _create(event_store, "table", array_type)
+    table = _table()
+    benchmark(event_store.put_table, table, "table")
+    benchmark.extra_info["bytes"] = table.column("depth").nbytes
+
+
+@pytest.mark.parametrize("array_type", [event_store.ArrayType.DENSE, event_store.ArrayType.SPARSE])
+@pytest.mark.parametrize("format", ["numpy", "arrow", "dataframe"])
+def test_get_array_format(benchmark, event_store, array_type, format):
+    _create(event_store, "formats", array_type)
+    table = _table()
+    event_store.put_table(table, "formats")
+    get_input = _get_input("formats")
+    get_input.format = format
+    if format != "numpy":
+        # DataFrame and Arrow queries use inclusive ranges
+        get_input.buffer_range = [1, SHAPE[0], 1, SHAPE[1]]
+    benchmark(event_store.get_array, get_input)
+    benchmark.extra_info["bytes"] = table.column("depth").nbytes
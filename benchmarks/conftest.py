@@ -0,0 +1,98 @@
+"""
+Fixtures for the benchmark suite.  S3 is provided by an in-process moto server and
+the TileDB event store uses a local file:// root, so the suite runs offline.
+
+Run with: make bench (from the repository root, so the shared test helpers in
+tests/conftest.py can be imported)
+"""
+
+import json
+import os
+import socket
+from pathlib import Path
+import pytest
+from tests.conftest import aws_env, CC_ROOT, PAYLOAD_ID
+
+BUCKET = "cc-benchmarks"
+SAMPLE_PAYLOAD = Path(__file__).parent.parent / "tests" / "sample_payload"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture(scope="session")
+def s3_endpoint():
+    from moto.server import ThreadedMotoServer
+
+    port = _free_port()
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=port, verbose=False)
+    server.start()
+    endpoint = f"http://127.0.0.1:{port}"
+
+    env = aws_env(BUCKET, endpoint, key="benchmark")
+    env["CC_EVENT_NUMBER"] = "1"
+    saved = {k: os.environ.get(k) for k in env}
+    os.environ.update(env)
+
+    import boto3
+
+    boto3.client(
+        "s3",
+        endpoint_url=endpoint,
+        region_name="us-east-1",
+        aws_access_key_id="benchmark",
+        aws_secret_access_key="benchmark",
+    ).create_bucket(Bucket=BUCKET)
+
+    yield endpoint
+
+    server.stop()
+    for k, v in saved.items():
+        if v is None:
+            os.environ.pop(k, None)
+        else:
+            os.environ[k] = v
+
+
+@pytest.fixture(scope="session")
+def s3_store(s3_endpoint):
+    from cc import filesapi
+
+    return filesapi.NewS3FileStore("CC", BUCKET)
+
+
+@pytest.fixture(scope="session")
+def payload_json() -> dict:
+    payload = json.loads(SAMPLE_PAYLOAD.read_text())
+    for store in payload["stores"]:
+        store["params"]["root"] = "model-library"
+    return payload
+
+
+@pytest.fixture(scope="session")
+def plugin_manager(s3_store, payload_json):
+    import io
+    from cc import plugin_manager
+
+    path = f"{CC_ROOT}/{PAYLOAD_ID}/{plugin_manager.PAYLOAD_FILE_NAME}"
+    s3_store.put_object(path, io.BytesIO(json.dumps(payload_json).encode()))
+    return plugin_manager.PluginManager()
+
+
+@pytest.fixture
+def event_store(tmp_path):
+    from cc import event_store_tiledb
+    from cc.datastore import DataStore
+
+    store = DataStore(
+        name="EVENT_STORE",
+        store_type="TILEDB",
+        profile="FFRD",
+        params={"root": f"file://{tmp_path}"},
+    )
+    tdb = event_store_tiledb.TileDbEventStore()
+    tdb.connect(store)
+    return tdb
@@ -0,0 +1,234 @@
+import logging
+import multiprocessing
+import time
+import traceback
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    FIRST_COMPLETED,
+    wait,
+)
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Callable, List, Optional, Set
+
+ExecutorType = Enum(
+    "ExecutorType",
+    [
+        ("THREAD", "thread"),
+        ("PROCESS", "process"),
+    ],
+)
+
+ActionStatus = Enum(
+    "ActionStatus",
+    [
+        ("PENDING", 1),
+        ("RUNNING", 2),
+        ("SUCCEEDED", 3),
+        ("FAILED", 4),
+        ("SKIPPED", 5),
+    ],
+)
+
+
+@dataclass
+class ActionResult:
+    """
+    The outcome of a single action run by the ActionScheduler.
+
+    Attributes:
+    - index : int
+        The position of the action in the payload
+    - name : str
+        The action name
+    - status : ActionStatus
+        The final status of the action
+    - value : any
+        The value returned by the action runner
+    - error : str
+        The error message if the action failed, or the reason it was skipped
+    - traceback : str
+        The formatted traceback if the action failed
+    - wall_time : float
+        Elapsed seconds spent running the action
+    """
+
+    index: int
+    name: str
+    status: ActionStatus = field(default=ActionStatus.PENDING)
+    value: any = field(default=None)
+    error: Optional[str] = field(default=None)
+    traceback: Optional[str] = field(default=None)
+    wall_time: float = field(default=0.0)
+
+
+class ActionExecutionError(Exception):
+    """
+    Raised when one or more actions fail.  The results attribute holds the
+    ActionResult for every action in the payload.
+    """
+
+    def __init__(self, results: List[ActionResult]):
+        self.results = results
+        failed = [r for r in results if r.status == ActionStatus.FAILED]
+        summary = ", ".join(f"{r.name}[{r.index}]: {r.error}" for r in failed)
+        super().__init__(f"{len(failed)} action(s) failed: {summary}")
+
+
+def action_dependencies(actions: List[any]) -> List[Set[int]]:
+    """
+    Returns the indexes of the actions each action depends on.  Dependencies are
+    the actions named in depends_on, plus earlier actions that share a data source
+    path where either action writes it (read after write, write after read and
+    write after write).  Data sources are compared by store name and path using
+    the action level inputs and outputs.
+    """
+
+    def paths(sources) -> Set[tuple]:
+        return {
+            (ds.store_name, path)
+            for ds in sources or []
+            for path in (ds.paths or {}).values()
+        }
+
+    reads = [paths(a._iomgr.inputs) for a in actions]
+    writes = [paths(a._iomgr.outputs) for a in actions]
+
+    deps = []
+    for j, action in enumerate(actions):
+        jdeps = set()
+        for name in getattr(action, "depends_on", None) or []:
+            matches = [i for i, a in enumerate(actions) if a.name == name and i != j]
+            if not matches:
+                raise ValueError(f"Action {action.name} depends on unknown action {name}")
+            jdeps.update(matches)
+        for i in range(j):
+            if writes[i] & (reads[j] | writes[j]) or reads[i] & writes[j]:
+                jdeps.add(i)
+        deps.append(jdeps)
+
+    _check_cycles(actions, deps)
+    return deps
+
+
+def _check_cycles(actions: List[any], deps: List[Set[int]]):
+    visiting, visited = set(), set()
+
+    def visit(i: int):
+        if i in visited:
+            return
+        if i in visiting:
+            raise ValueError(f"Circular action dependency at {actions[i].name}")
+        visiting.add(i)
+        for d in deps[i]:
+            visit(d)
+        visiting.remove(i)
+        visited.add(i)
+
+    for i in range(len(actions)):
+        visit(i)
+
+
+class ActionScheduler:
+    """
+    Runs payload actions on a pool of workers, starting each action once every
+    action it depends on has succeeded.  With a single worker actions run one at
+    a time in payload order.
+
+    Attributes:
+    - max_workers : int
+        The maximum number of actions running at once
+    - fail_fast : bool
+        When True no new actions are started after a failure. Otherwise only the
+        actions depending on the failed action are skipped
+    - executor_type : ExecutorType
+        Run actions on a thread pool or a process pool.  With a process pool
+        run_action, its return value and any exception it raises must be picklable
+    - start_method : str
+        The multiprocessing start method for the process pool. None uses the platform default
+
+    Methods:
+    - run(actions, run_action)->List[ActionResult]: runs run_action(index) for each
+        action and returns the results.  Raises ActionExecutionError if any action fails
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 1,
+        fail_fast: bool = True,
+        executor_type: ExecutorType = ExecutorType.THREAD,
+        start_method: str = None,
+    ):
+        self.max_workers = max(1, max_workers)
+        self.fail_fast = fail_fast
+        self.executor_type = ExecutorType(executor_type)
+        self.start_method = start_method
+
+    def _executor(self) -> Executor:
+        if self.executor_type == ExecutorType.PROCESS:
+            return ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context(self.start_method),
+            )
+        return ThreadPoolExecutor(max_workers=self.max_workers)
+
+    def run(
+        self, actions: List[any], run_action: Callable[[int], any]
+    ) -> List[ActionResult]:
+        deps = action_dependencies(actions)
+        results = [ActionResult(i, a.name) for i, a in enumerate(actions)]
+        pending = list(range(len(actions)))
+        failed = False
+
+        with self._executor() as executor:
+            running = {}
+            while pending or running:
+                for i in list(pending):
+                    if len(running) >= self.max_workers or (failed and self.fail_fast):
+                        break
+                    dep_status = {results[d].status for d in deps[i]}
+                    if dep_status & {ActionStatus.FAILED, ActionStatus.SKIPPED}:
+                        self._skip(results[i], "dependency did not succeed")
+                        pending.remove(i)
+                    elif dep_status <= {ActionStatus.SUCCEEDED}:
+                        logging.info(f"Starting action {actions[i].name}[{i}]")
+                        results[i].status = ActionStatus.RUNNING
+                        start = time.perf_counter()
+                        running[executor.submit(run_action, i)] = (i, start)
+                        pending.remove(i)
+
+                if not running:
+                    # nothing left can start
+                    for i in pending:
+                        self._skip(results[i], "an earlier action failed")
+                    pending = []
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i, start = running.pop(future)
+                    result = results[i]
+                    result.wall_time = time.perf_counter() - start
+                    try:
+                        result.value = future.result()
+                        result.status = ActionStatus.SUCCEEDED
+                        logging.info(
+                            f"Action {result.name}[{i}] succeeded in {result.wall_time:.3f}s"
+                        )
+                    except Exception as e:
+                        failed = True
+                        result.status = ActionStatus.FAILED
+                        result.error = f"{type(e).__name__}: {e}"
+                        result.traceback = "".join(traceback.format_exception(e))
+                        logging.error(f"Action {result.name}[{i}] failed: {result.error}")
+
+        if failed:
+            raise ActionExecutionError(results)
+        return results
+
+    def _skip(self, result: ActionResult, reason: str):
+        result.status = ActionStatus.SKIPPED
+        result.error = reason
+        logging.warning(f"Skipping action {result.name}[{result.index}]: {reason}")
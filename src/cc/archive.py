@@ -0,0 +1,176 @@
+import io
+import json
+import os
+import tarfile
+from enum import Enum
+from pathlib import Path
+from typing import Iterable, List, Optional
+from cc import tracing
+from cc.filesapi import S3FileStore, DEFAULT_EXCLUDES, _iter_local_files
+
+ARCHIVE_INDEX_SUFFIX = ".index.json"
+ZSTD_SUFFIXES = (".zst", ".zstd")
+DEFAULT_ZSTD_LEVEL = 3
+
+
+class ArchiveCompression(Enum):
+    NONE = "none"
+    ZSTD = "zstd"
+
+
+def put_folder_archive(
+    store: S3FileStore,
+    local_dir: str | os.PathLike,
+    key: str,
+    compression: ArchiveCompression | str = None,
+    index: bool = False,
+    include: Optional[Iterable[str]] = None,
+    exclude: Optional[Iterable[str]] = None,
+    follow_symlinks: bool = False,
+    level: int = DEFAULT_ZSTD_LEVEL,
+) -> dict:
+    """
+    Streams the files under local_dir as a tar archive into a multipart upload to
+    key, so folders of many small files are stored as one object without writing a
+    local archive first.  compression="zstd" compresses the stream (requires the
+    zstandard package).
+
+    Returns the archive index: {"archive", "compression", "members"} where members
+    maps each member name to the byte offset and size of its data in the tar stream.
+    With index=True the index is also stored as {key}.index.json so single members
+    can be read with get_archive_member.  Offsets are only addressable with range
+    requests in uncompressed archives, so index requires compression=None.
+    """
+    compression = _compression(compression, key)
+    if index and compression != ArchiveCompression.NONE:
+        raise ValueError("an archive index requires an uncompressed archive")
+    local_root = Path(local_dir).expanduser().resolve()
+    if not local_root.is_dir():
+        raise ValueError(f"Not a directory: {local_root}")
+    include = list(include) if include is not None else ["**"]
+    exclude = list(exclude) if exclude is not None else DEFAULT_EXCLUDES
+
+    members = {}
+    with tracing.get_tracer().span(
+        "archive.put_folder", bucket=store.bucket, key=key, compression=compression.value
+    ) as span:
+        writer = store.open_writer(key)
+        try:
+            out = writer
+            if compression == ArchiveCompression.ZSTD:
+                out = _zstd().ZstdCompressor(level=level).stream_writer(
+                    writer, closefd=False
+                )
+            offset = 0
+            with tarfile.open(fileobj=out, mode="w|", format=tarfile.PAX_FORMAT) as tar:
+                for abs_file, rel_posix in _iter_local_files(
+                    local_root, include, exclude, follow_symlinks
+                ):
+                    # built from stat rather than gettarinfo to skip the per file
+                    # user and group name lookups
+                    stat = abs_file.stat()
+                    tarinfo = tarfile.TarInfo(rel_posix)
+                    tarinfo.size = stat.st_size
+                    tarinfo.mtime = int(stat.st_mtime)
+                    tarinfo.mode = stat.st_mode & 0o7777
+                    header = len(tarinfo.tobuf(tar.format, tar.encoding, tar.errors))
+                    members[rel_posix] = {"offset": offset + header, "size": tarinfo.size}
+                    with open(abs_file, "rb") as f:
+                        tar.addfile(tarinfo, f)
+                    offset += header + _padded(tarinfo.size)
+            if out is not writer:
+                # ends the zstd frame, the multipart writer stays open
+                out.close()
+            writer.close()
+        except BaseException:
+            writer.abort()
+            raise
+        span.set_attribute("members", len(members))
+        span.set_attribute("bytes", writer.bytes_written)
+
+    doc = {"archive": key, "compression": compression.value, "members": members}
+    if index:
+        store.put_object(
+            key + ARCHIVE_INDEX_SUFFIX, io.BytesIO(json.dumps(doc).encode())
+        )
+    return doc
+
+
+def extract_archive(
+    store: S3FileStore,
+    key: str,
+    local_dir: str | os.PathLike,
+    compression: ArchiveCompression | str = None,
+) -> List[str]:
+    """
+    Streams a tar archive from S3 and extracts it into local_dir without
+    downloading the archive first.  Archives with a .zst/.zstd suffix are
+    decompressed unless compression is given.  Returns the extracted member names.
+    Members that would be written outside local_dir are rejected.
+    """
+    compression = _compression(compression, key)
+    os.makedirs(local_dir, exist_ok=True)
+    names = []
+    with tracing.get_tracer().span("archive.extract", bucket=store.bucket, key=key):
+        body = store.get_object(key)
+        if compression == ArchiveCompression.ZSTD:
+            body = _zstd().ZstdDecompressor().stream_reader(body)
+        with tarfile.open(fileobj=body, mode="r|") as tar:
+            for member in tar:
+                if hasattr(tarfile, "data_filter"):
+                    tar.extract(member, local_dir, filter="data")
+                else:
+                    _check_member(member, local_dir)
+                    tar.extract(member, local_dir)
+                names.append(member.name)
+    return names
+
+
+def load_archive_index(store: S3FileStore, key: str) -> dict:
+    return json.loads(store.get_object(key + ARCHIVE_INDEX_SUFFIX).read())
+
+
+def get_archive_member(
+    store: S3FileStore, key: str, member: str, index: dict = None
+) -> bytes:
+    """
+    Returns the content of one archive member with a range request, using the
+    index stored by put_folder_archive(index=True) unless one is given.
+    """
+    if index is None:
+        index = load_archive_index(store, key)
+    try:
+        entry = index["members"][member]
+    except KeyError:
+        raise KeyError(f"{member} is not a member of {key}") from None
+    return store.get_range(key, entry["offset"], entry["size"])
+
+
+def _compression(compression, key: str) -> ArchiveCompression:
+    if compression is None:
+        if key.endswith(ZSTD_SUFFIXES):
+            return ArchiveCompression.ZSTD
+        return ArchiveCompression.NONE
+    return ArchiveCompression(compression)
+
+
+def _padded(size: int) -> int:
+    blocks, remainder = divmod(size, tarfile.BLOCKSIZE)
+    return (blocks + (remainder > 0)) * tarfile.BLOCKSIZE
+
+
+def _check_member(member: tarfile.TarInfo, local_dir: str | os.PathLike):
+    root = os.path.realpath(local_dir)
+    target = os.path.realpath(os.path.join(root, member.name))
+    if os.path.commonpath([root, target]) != root or member.islnk() or member.issym():
+        raise tarfile.ExtractError(f"unsafe archive member: {member.name}")
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(
+            "zstd archives require the zstandard package: pip install cc_py_sdk[zstd]"
+        ) from None
+    return zstandard
@@ -0,0 +1,164 @@
+import io
+from typing import List, Optional, Tuple
+import numpy as np
+from numpy.lib import format as npy_format
+
+NPY_SUFFIX = ".npy"
+READ_CHUNKSIZE = 1024 * 1024 * 8
+
+
+def read_array(
+    reader,
+    dtype=None,
+    shape: Optional[Tuple[int, ...]] = None,
+    out: Optional[np.ndarray] = None,
+    npy: bool = False,
+) -> np.ndarray:
+    """
+    Reads an array from a binary reader straight into the memory of out, or of a
+    newly allocated array, so the data is copied once and no intermediate bytes
+    object is created.  Readers with readinto (S3 bodies, local files) fill the
+    array directly, other readers are read in READ_CHUNKSIZE chunks.
+
+    With npy=True the reader holds a .npy file and dtype, shape and memory order
+    come from its header; dtype and shape, when given, must match it.  Raw data
+    needs dtype and shape, or an out array.  The reader is read to its end, which
+    lets S3 bodies verify their checksum, and a ValueError is raised when its size
+    does not match the array.
+    """
+    fortran_order = False
+    if npy:
+        header_shape, fortran_order, header_dtype = _read_npy_header(reader)
+        if dtype is not None and np.dtype(dtype) != header_dtype:
+            raise ValueError(f"array has dtype {header_dtype}, expected {np.dtype(dtype)}")
+        if shape is not None and tuple(shape) != header_shape:
+            raise ValueError(f"array has shape {header_shape}, expected {tuple(shape)}")
+        dtype, shape = header_dtype, header_shape
+
+    if out is None:
+        if dtype is None or shape is None:
+            raise ValueError("dtype and shape (or out) are required to read a raw array")
+        out = np.empty(shape, dtype=dtype, order="F" if fortran_order else "C")
+    else:
+        if dtype is not None and out.dtype != np.dtype(dtype):
+            raise ValueError(f"out has dtype {out.dtype}, expected {np.dtype(dtype)}")
+        if shape is not None and out.shape != tuple(shape):
+            raise ValueError(f"out has shape {out.shape}, expected {tuple(shape)}")
+        contiguous = out.flags.f_contiguous if fortran_order else out.flags.c_contiguous
+        if not contiguous or not out.flags.writeable:
+            raise ValueError("out must be a writeable, contiguous array")
+
+    buffer = _byte_view(out)
+    readinto = getattr(reader, "readinto", None)
+    n = 0
+    while n < len(buffer):
+        if readinto is not None:
+            count = readinto(buffer[n:])
+        else:
+            chunk = reader.read(min(READ_CHUNKSIZE, len(buffer) - n))
+            count = len(chunk)
+            buffer[n : n + count] = chunk
+        if not count:
+            raise ValueError(f"object ended after {n} of {len(buffer)} array bytes")
+        n += count
+    if reader.read(1):
+        raise ValueError(f"object is larger than the {len(buffer)} byte array")
+    return out
+
+
+def array_reader(arr: np.ndarray, npy: bool = False) -> "BufferReader":
+    """
+    Returns a seekable reader over the memory of arr, preceded by a .npy header
+    when npy=True, so an upload reads the array without copying it first.  Arrays
+    that are not contiguous are copied once.  Raw data is written in C order,
+    .npy files keep Fortran order.
+    """
+    buffers = []
+    if npy:
+        if not (arr.flags.c_contiguous or arr.flags.f_contiguous):
+            arr = np.ascontiguousarray(arr)
+        if arr.dtype.hasobject:
+            raise ValueError("object arrays can not be written without pickling")
+        header = io.BytesIO()
+        d = npy_format.header_data_from_array_1_0(arr)
+        try:
+            npy_format.write_array_header_1_0(header, d)
+        except ValueError:
+            # header too large for format 1.0
+            header = io.BytesIO()
+            npy_format.write_array_header_2_0(header, d)
+        buffers.append(memoryview(header.getvalue()))
+    elif not arr.flags.c_contiguous:
+        arr = np.ascontiguousarray(arr)
+    buffers.append(_byte_view(arr))
+    return BufferReader(buffers)
+
+
+class BufferReader(io.RawIOBase):
+    """
+    Seekable reader over a sequence of buffers, read in order as one stream.  Reads
+    return slices of the buffers, the buffers themselves are never concatenated.
+    """
+
+    def __init__(self, buffers: List[memoryview]):
+        self._buffers = [memoryview(b).cast("B") for b in buffers]
+        self.size = sum(len(b) for b in self._buffers)
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self.size + offset
+        else:
+            raise ValueError(f"invalid whence: {whence}")
+        if pos < 0:
+            raise ValueError(f"negative seek position {pos}")
+        self._pos = pos
+        return pos
+
+    def readinto(self, b) -> int:
+        out = memoryview(b).cast("B")
+        n = 0
+        start = 0
+        for buffer in self._buffers:
+            end = start + len(buffer)
+            if self._pos + n < end and n < len(out):
+                offset = self._pos + n - start
+                count = min(len(buffer) - offset, len(out) - n)
+                out[n : n + count] = buffer[offset : offset + count]
+                n += count
+            start = end
+        self._pos += n
+        return n
+
+
+def _read_npy_header(reader) -> Tuple[Tuple[int, ...], bool, np.dtype]:
+    version = npy_format.read_magic(reader)
+    if version == (1, 0):
+        shape, fortran_order, dtype = npy_format.read_array_header_1_0(reader)
+    elif version == (2, 0):
+        shape, fortran_order, dtype = npy_format.read_array_header_2_0(reader)
+    else:
+        raise ValueError(f"unsupported .npy format version {version}")
+    if dtype.hasobject:
+        raise ValueError(".npy files holding python objects are not supported")
+    return shape, fortran_order, dtype
+
+
+def _byte_view(arr: np.ndarray) -> memoryview:
+    # the transpose of a Fortran ordered array is C contiguous over the same memory
+    if not arr.flags.c_contiguous:
+        arr = arr.T
+    return memoryview(arr.reshape(-1).view(np.uint8))
@@ -0,0 +1,218 @@
+import os
+import re
+import threading
+import time
+from enum import Enum
+from typing import Optional
+
+CcBandwidthLimit = "CC_BANDWIDTH_LIMIT"
+CcBandwidthInteractiveShare = "CC_BANDWIDTH_INTERACTIVE_SHARE"
+BANDWIDTH_LIMIT_PARAM = "bandwidth_limit"
+
+DEFAULT_INTERACTIVE_SHARE = 0.8
+# a class stays active this long after its last transfer
+ACTIVE_WINDOW = 0.5  # seconds
+# bucket capacity in seconds of the class rate
+BURST_SECONDS = 0.25
+
+_units = {
+    "": 1,
+    "B": 1,
+    "K": 10**3,
+    "KB": 10**3,
+    "M": 10**6,
+    "MB": 10**6,
+    "G": 10**9,
+    "GB": 10**9,
+    "KIB": 2**10,
+    "MIB": 2**20,
+    "GIB": 2**30,
+}
+_rate = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([A-Za-z]*?)(?:/S)?\s*$", re.IGNORECASE)
+
+
+class Priority(Enum):
+    """
+    Transfer classes sharing the bandwidth limit.  Reads a model is waiting on are
+    INTERACTIVE, uploads of results are BACKGROUND.
+    """
+
+    INTERACTIVE = "interactive"
+    BACKGROUND = "background"
+
+
+def parse_rate(value: str | int | float) -> int:
+    """
+    Parses a bandwidth in bytes per second, e.g. 50000000, "50MB", "40MiB/s" or "1G".
+    """
+    if isinstance(value, (int, float)):
+        return int(value)
+    m = _rate.match(value)
+    if not m or m.group(2).upper() not in _units:
+        raise ValueError(f"Invalid bandwidth limit: {value}")
+    return int(float(m.group(1)) * _units[m.group(2).upper()])
+
+
+class BandwidthLimiter:
+    """
+    Token bucket limiter shared by all transfers in the process.
+
+    Each priority class has its own bucket.  While both classes are transferring,
+    INTERACTIVE refills at interactive_share of the rate and BACKGROUND at the rest.
+    A class that is transferring alone gets the full rate.  interactive_share must be
+    between 0 and 1 (exclusive) so neither class is starved.  Buckets may go into
+    debt, so a chunk larger than the bucket is let through and the debt is repaid
+    by the next acquire.
+
+    Methods:
+    - acquire(nbytes, priority): blocks until nbytes may be transferred
+    - reader(reader, priority)->ThrottledReader: wraps a binary reader
+    - callback(priority): returns a boto3 transfer Callback that throttles the
+        transfer threads as bytes are sent or received
+    """
+
+    def __init__(self, rate: int, interactive_share: float = DEFAULT_INTERACTIVE_SHARE):
+        if rate <= 0:
+            raise ValueError("bandwidth limit must be positive")
+        if not 0 < interactive_share < 1:
+            raise ValueError(
+                f"interactive share must be between 0 and 1, got {interactive_share}"
+            )
+        self.rate = rate
+        self.shares = {
+            Priority.INTERACTIVE: interactive_share,
+            Priority.BACKGROUND: 1.0 - interactive_share,
+        }
+        now = time.monotonic()
+        self._tokens = {p: rate * BURST_SECONDS for p in Priority}
+        self._active = {p: float("-inf") for p in Priority}
+        self._last = now
+        self._cond = threading.Condition()
+
+    def acquire(self, nbytes: int, priority: Priority = Priority.BACKGROUND):
+        if nbytes <= 0:
+            return
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._active[priority] = now
+                self._refill(now)
+                if self._tokens[priority] > 0:
+                    self._tokens[priority] -= nbytes
+                    return
+                rate = self.rate * self._share(priority, now)
+                self._cond.wait(-self._tokens[priority] / rate + 0.001)
+
+    def reader(self, reader, priority: Priority = Priority.INTERACTIVE) -> "ThrottledReader":
+        return ThrottledReader(reader, self, priority)
+
+    def callback(self, priority: Priority = Priority.BACKGROUND):
+        return lambda nbytes: self.acquire(nbytes, priority)
+
+    def _share(self, priority: Priority, now: float) -> float:
+        for other in Priority:
+            if other != priority and now - self._active[other] < ACTIVE_WINDOW:
+                return self.shares[priority]
+        return 1.0
+
+    def _refill(self, now: float):
+        elapsed = now - self._last
+        self._last = now
+        for p in Priority:
+            rate = self.rate * self._share(p, now)
+            self._tokens[p] = min(rate * BURST_SECONDS, self._tokens[p] + rate * elapsed)
+
+
+class ThrottledReader:
+    """
+    Wraps a binary reader and charges every read to a BandwidthLimiter.  All other
+    attributes are passed through to the wrapped reader.
+    """
+
+    def __init__(self, reader, limiter: BandwidthLimiter, priority: Priority):
+        self._reader = reader
+        self._limiter = limiter
+        self._priority = priority
+
+    def read(self, *amt) -> bytes:
+        data = self._reader.read(*amt)
+        self._limiter.acquire(len(data), self._priority)
+        return data
+
+    def readinto(self, b) -> int:
+        n = self._reader.readinto(b)
+        self._limiter.acquire(n, self._priority)
+        return n
+
+    def __iter__(self):
+        while chunk := self.read(1024 * 1024):
+            yield chunk
+
+    def __getattr__(self, name):
+        return getattr(self._reader, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        close = getattr(self._reader, "close", None)
+        if close is not None:
+            close()
+        return False
+
+
+def _limiter_from_env() -> Optional[BandwidthLimiter]:
+    limit = os.environ.get(CcBandwidthLimit)
+    if not limit:
+        return None
+    return BandwidthLimiter(parse_rate(limit), _share_from_env())
+
+
+def _share_from_env() -> float:
+    value = os.environ.get(CcBandwidthInteractiveShare)
+    if value is None:
+        return DEFAULT_INTERACTIVE_SHARE
+    try:
+        share = float(value)
+    except ValueError:
+        share = None
+    if share is None or not 0 < share < 1:
+        raise ValueError(
+            f"{CcBandwidthInteractiveShare} must be a number between 0 and 1, got {value}"
+        )
+    return share
+
+
+_limiter = _limiter_from_env()
+_limiterLock = threading.Lock()
+
+
+def get_limiter() -> Optional[BandwidthLimiter]:
+    """
+    Returns the process limiter, or None when bandwidth is not limited.
+    """
+    return _limiter
+
+
+def set_limiter(limiter: Optional[BandwidthLimiter]):
+    global _limiter
+    _limiter = limiter
+
+
+def configure_from_params(params: dict):
+    """
+    Applies a DataStore "bandwidth_limit" param to the process limiter.  The
+    CC_BANDWIDTH_LIMIT environment variable takes precedence, and when several stores
+    set a limit the lowest one is used.
+    """
+    global _limiter
+    limit = params.get(BANDWIDTH_LIMIT_PARAM) if params else None
+    if not limit or os.environ.get(CcBandwidthLimit):
+        return
+    rate = parse_rate(limit)
+    with _limiterLock:
+        if _limiter is None:
+            _limiter = BandwidthLimiter(rate, _share_from_env())
+        elif rate < _limiter.rate:
+            with _limiter._cond:
+                _limiter.rate = rate
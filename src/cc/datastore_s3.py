@@ -1,5 +1,8 @@
 import os
 from cc.filesapi import *
+from cc import archive
+from cc import bandwidth
+from cc import hdf5
 from cc.datastore import (
     DataStore,
     IStreamingBody,
@@ -16,11 +19,30 @@ class S3DataStore(IConnectionDataStore, IStoreReader, IStoreWriter):
        in S3.
 
     Methods:
-    - connect(ds:DataStore): creates an S3 Session using boto3
+    - connect(ds:DataStore): creates an S3 Session using boto3.  A "bandwidth_limit" param
+        (e.g. "100MB") limits the transfer rate of the process, see cc.bandwidth
     - get(path:str,datapath:str): gets a reader for the S3 object described in the path
         interface argument datapath is ignored
     - put(reader: IStreamingBody, destpath:str, datapath:str): takes a reader and uploads
         the data into an object described by the path.  interface argument datapath is ignored
+    - open_writer(destpath:str, datapath:str)->S3MultipartWriter: returns a writable file object
+        that streams to the object described by the path.  interface argument datapath is ignored
+    - put_folder_archive(path:str, destpath:str, compression, index:bool)->dict: streams a local
+        directory as a tar archive object, see archive.put_folder_archive
+    - extract_archive(path:str, localpath:str, compression)->List[str]: streams a tar archive
+        object into a local directory
+    - get_archive_member(path:str, member:str)->bytes: reads one member of an indexed archive
+    - get_dataset(path:str, datapath:str, selection)->np.ndarray: reads a dataset, or a
+        selection of it, from a remote HDF5 file with range requests, see hdf5.read_dataset
+    - get_file(path:str, localpath:str)->int: downloads the object to a local file, verifying
+        its checksum.  returns the number of bytes written
+    - put_file(localpath:str, destpath:str, skip_unchanged:bool)->bool: uploads a local file.
+        returns False if skip_unchanged is set and the object already has identical content
+    - put_folder(path:str, dest_prefix:str, skip_unchanged:bool)->List[str]: uploads a local
+        directory and returns the uploaded keys.  skip_unchanged skips files whose
+        checksum matches the existing object
+    - sync_folder(path:str, dest_prefix:str, compare, delete_orphans:bool)->SyncResult:
+        incrementally uploads a local directory, see S3FileStore.sync_folder
     """
 
     def __init__(self):
@@ -28,6 +50,7 @@ class S3DataStore(IConnectionDataStore, IStoreReader, IStoreWriter):
 
     def connect(self, ds: DataStore):
         self.data_store = ds
+        bandwidth.configure_from_params(ds.params)
         bucket = os.environ[f"{ds.profile}_{AwsS3Bucket}"]
         self.filestore = NewS3FileStore(ds.profile, bucket)
 
@@ -39,5 +62,48 @@ class S3DataStore(IConnectionDataStore, IStoreReader, IStoreWriter):
         # s3 file store does not use the data path
         self.filestore.put_object(destpath, reader)
 
-    def put_folder(self, path: str, dest_prefix: str):
-        self.filestore.put_folder(path, dest_prefix)
+    def open_writer(self, destpath: str, datapath: str) -> S3MultipartWriter:
+        # s3 file store does not use the data path
+        return self.filestore.open_writer(destpath)
+
+    def put_folder_archive(
+        self, path: str, destpath: str, compression: str = None, index: bool = False
+    ) -> dict:
+        return archive.put_folder_archive(
+            self.filestore, path, destpath, compression=compression, index=index
+        )
+
+    def extract_archive(
+        self, path: str, localpath: str, compression: str = None
+    ) -> List[str]:
+        return archive.extract_archive(
+            self.filestore, path, localpath, compression=compression
+        )
+
+    def get_archive_member(self, path: str, member: str) -> bytes:
+        return archive.get_archive_member(self.filestore, path, member)
+
+    def get_dataset(self, path: str, datapath: str, selection=None):
+        return hdf5.read_dataset(self.filestore, path, datapath, selection)
+
+    def get_file(self, path: str, localpath: str) -> int:
+        return self.filestore.download_file(path, localpath)
+
+    def put_file(self, localpath: str, destpath: str, skip_unchanged: bool = False) -> bool:
+        return self.filestore.upload_file(localpath, destpath, skip_unchanged)
+
+    def put_folder(
+        self, path: str, dest_prefix: str, skip_unchanged: bool = False
+    ) -> List[str]:
+        return self.filestore.put_folder(path, dest_prefix, sync=skip_unchanged)
+
+    def sync_folder(
+        self,
+        path: str,
+        dest_prefix: str,
+        compare: SyncCompare | str = SyncCompare.CHECKSUM,
+        delete_orphans: bool = False,
+    ) -> SyncResult:
+        return self.filestore.sync_folder(
+            path, dest_prefix, compare=compare, delete_orphans=delete_orphans
+        )
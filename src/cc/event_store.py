@@ -22,6 +22,70 @@ ArrayType = Enum(
     ],
 )
 
+ConsolidationMode = Enum(
+    "ConsolidationMode",
+    [
+        ("FRAGMENTS", "fragments"),
+        ("FRAGMENT_META", "fragment_meta"),
+        ("ARRAY_META", "array_meta"),
+        ("COMMITS", "commits"),
+    ],
+)
+
+ResultFormat = Enum(
+    "ResultFormat",
+    [
+        ("NUMPY", "numpy"),
+        ("DATAFRAME", "dataframe"),
+        ("ARROW", "arrow"),
+    ],
+)
+
+ArrayReduction = Enum(
+    "ArrayReduction",
+    [
+        ("SUM", "sum"),
+        ("MIN", "min"),
+        ("MAX", "max"),
+        ("MEAN", "mean"),
+    ],
+)
+
+FilterType = Enum(
+    "FilterType",
+    [
+        ("ZSTD", "zstd"),
+        ("LZ4", "lz4"),
+        ("GZIP", "gzip"),
+        ("BITSHUFFLE", "bitshuffle"),
+        ("BYTESHUFFLE", "byteshuffle"),
+        ("DELTA", "delta"),
+        ("DOUBLE_DELTA", "double-delta"),
+        ("BIT_WIDTH_REDUCTION", "bit-width-reduction"),
+    ],
+)
+
+
+@dataclass
+class ArrayFilter:
+    """
+    A single filter in a filter pipeline.  Filters are applied in list order on write.
+
+    Attributes:
+    - filter_type : FilterType
+        The filter to apply
+    - level : int
+        Compression level for compressors, or the window for bit width reduction.
+        None uses the filter default
+    - reinterpret_type : np.dtype
+        Optional type to reinterpret the data as before a delta or double-delta
+        filter. Required to delta encode floating point data
+    """
+
+    filter_type: FilterType
+    level: int = field(default=None)
+    reinterpret_type: np.dtype = field(default=None)
+
 
 @dataclass
 class ArrayDimension:
@@ -29,16 +93,31 @@ class ArrayDimension:
     dimension_type: np.dtype
     domain: List[int]
     tile_extent: int
+    filters: List[ArrayFilter] = field(default_factory=list)
 
 
 @dataclass
 class CreateArrayInput:
+    """
+    Attributes:
+    - attribute_filters : Dict[str, List[ArrayFilter]]
+        Filter pipelines keyed by attribute name. Attributes without an entry
+        are stored unfiltered
+    - offsets_filters : List[ArrayFilter]
+        Filter pipeline for the offsets of variable length attributes
+    - capacity : int
+        The number of cells per data tile in sparse arrays. None uses the TileDB default
+    """
+
     attributes: Dict[str, any]
     dimensions: List[ArrayDimension]
     array_path: str
     array_type: ArrayType
     cell_layout: LayoutOrder
     tile_layout: LayoutOrder
+    attribute_filters: Dict[str, List[ArrayFilter]] = field(default_factory=dict)
+    offsets_filters: List[ArrayFilter] = field(default_factory=list)
+    capacity: int = field(default=None)
 
 
 @dataclass
@@ -76,6 +155,49 @@ class GetArrayInput:
     buffer_range: List[int] = field(default=None)
     search_order: LayoutOrder = field(default="C")
     df: bool = field(default=False)
+    batch_size: int = field(default=None)  # memory budget in bytes for iter_array
+    format: ResultFormat = field(default=None)  # overrides df when set
+
+
+@dataclass
+class GetArraysInput:
+    """
+    Reads the same attributes and range from many arrays, typically one array per event.
+
+    Attributes:
+    - attrs : List[str]
+        The attributes to read from each array
+    - array_paths : List[str]
+        The arrays to read
+    - buffer_range : List[int]
+        The subarray to read, as in GetArrayInput
+    - df : bool
+        Return DataFrames instead of dicts of numpy arrays. Not supported with reduce
+    - format : ResultFormat
+        The result format.  Overrides df when set. Only numpy supports reduce
+    - reduce : ArrayReduction
+        Optional reduction across arrays.  Only the running result is held in memory
+    - max_workers : int
+        Maximum number of arrays read concurrently. None uses the io thread count
+    """
+
+    attrs: List[str]
+    array_paths: List[str]
+    buffer_range: List[int] = field(default=None)
+    df: bool = field(default=False)
+    reduce: ArrayReduction = field(default=None)
+    max_workers: int = field(default=None)
+    format: ResultFormat = field(default=None)
+
+
+def result_format(input: GetArrayInput | GetArraysInput) -> ResultFormat:
+    """
+    Resolves the result format of a get input.  Accepts either a ResultFormat or
+    its string value (e.g. format="arrow"), falling back to the df flag.
+    """
+    if input.format is None:
+        return ResultFormat.DATAFRAME if input.df else ResultFormat.NUMPY
+    return ResultFormat(input.format)
 
 
 class ISimpleArrayStore(metaclass=abc.ABCMeta):
@@ -1,7 +1,13 @@
+import json
+import logging
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Iterator, List, Tuple
 import numpy as np
 import tiledb
 import cc.plugin_manager as pm
+from cc import tracing
 from cc.datastore import DataStore
 from cc.event_store import *
 
@@ -9,32 +15,122 @@ from cc.event_store import *
 _defaultAttrName: str = "a"
 _defaultMetadataPath: str = "/scalars"
 _defaultTileExtent: int = 256
+_defaultPartSize: int = 16 * 1024 * 1024
+_defaultBatchSize: int = 64 * 1024 * 1024
+_localRootPrefix: str = "file://"
+_configParamPrefix: str = "tiledb."
+
+# DataStore.params keys that map directly onto TileDB config parameters
+TileDbConfigParams = {
+    "max_parallel_ops": "vfs.s3.max_parallel_ops",
+    "multipart_part_size": "vfs.s3.multipart_part_size",
+    "memory_budget": "sm.memory_budget",
+    "memory_budget_var": "sm.memory_budget_var",
+    "compute_threads": "sm.compute_concurrency_level",
+    "io_threads": "sm.io_concurrency_level",
+}
+# DataStore.params keys that TileDB no longer reads
+_ignoredParams = {"tile_cache_size": "TileDB 2.6 removed the tile cache"}
+
+_filterTypes = {
+    FilterType.ZSTD: tiledb.ZstdFilter,
+    FilterType.LZ4: tiledb.LZ4Filter,
+    FilterType.GZIP: tiledb.GzipFilter,
+    FilterType.BITSHUFFLE: tiledb.BitShuffleFilter,
+    FilterType.BYTESHUFFLE: tiledb.ByteShuffleFilter,
+    FilterType.DELTA: tiledb.DeltaFilter,
+    FilterType.DOUBLE_DELTA: tiledb.DoubleDeltaFilter,
+    FilterType.BIT_WIDTH_REDUCTION: tiledb.BitWidthReductionFilter,
+}
+
+
+def tiledb_config(data_store: DataStore) -> tiledb.Config:
+    """
+    Builds the TileDB config for an event store.  Defaults scale with the number
+    of CPUs and are overridden by any of the TileDbConfigParams keys in the
+    DataStore params.  Params prefixed with "tiledb." are passed through as raw
+    TileDB config parameters (e.g. "tiledb.sm.mem.total_budget").  The S3 endpoint
+    can be overridden with the "endpoint" param or the {profile}_AWS_ENDPOINT
+    environment variable.
+    """
+    cpus = os.cpu_count() or 1
+    config = tiledb.Config()
+    config["vfs.s3.max_parallel_ops"] = str(max(2, cpus))
+    config["vfs.s3.multipart_part_size"] = str(_defaultPartSize)
+    config["sm.compute_concurrency_level"] = str(cpus)
+    config["sm.io_concurrency_level"] = str(cpus)
+
+    params = data_store.params
+    root_path = params["root"]
+    if not root_path.startswith(_localRootPrefix):
+        profile = data_store.profile
+        config["vfs.s3.region"] = os.environ[f"{profile}_{pm.AwsDefaultRegion}"]
+        config["vfs.s3.aws_access_key_id"] = os.environ[f"{profile}_{pm.AwsAccessKeyId}"]
+        config["vfs.s3.aws_secret_access_key"] = os.environ[
+            f"{profile}_{pm.AwsSecretAccessKey}"
+        ]
+        endpoint = params.get("endpoint", os.environ.get(f"{profile}_{pm.AwsEndpoint}"))
+        if endpoint:
+            scheme, _, host = endpoint.rpartition("://")
+            config["vfs.s3.endpoint_override"] = host
+            config["vfs.s3.scheme"] = scheme or "https"
+            config["vfs.s3.use_virtual_addressing"] = "false"
+
+    for key, val in params.items():
+        if key in _ignoredParams:
+            logging.warning(f"Ignoring event store param {key}: {_ignoredParams[key]}")
+        elif key in TileDbConfigParams:
+            config[TileDbConfigParams[key]] = str(val)
+        elif key.startswith(_configParamPrefix):
+            config[key.removeprefix(_configParamPrefix)] = str(val)
+    return config
+
+
+_contexts = {}
+_contextsLock = threading.Lock()
+
+
+def get_context(config: tiledb.Config) -> tiledb.Ctx:
+    """
+    Returns a TileDB context for config, shared by every event store in the process
+    with the same config.  A context owns its thread pools and S3 client, so batch
+    runs and long lived workers connect an event store per event without creating
+    them again.
+    """
+    key = json.dumps(config.dict(), sort_keys=True)
+    with _contextsLock:
+        ctx = _contexts.get(key)
+        if ctx is None:
+            ctx = tiledb.Ctx(config)
+            _contexts[key] = ctx
+        return ctx
 
 
 # class TileDbEventStore(ISimpleArrayStore):
 class TileDbEventStore:
+    """
+    TileDB Event Store implementation.
+
+    The store root is read from the DataStore "root" param.  Roots beginning with
+    file:// are opened on the local filesystem, otherwise the root is a path in the
+    S3 bucket for the DataStore profile.  See tiledb_config for the params used to
+    tune the TileDB context.
+    """
 
     def connect(self, data_store: DataStore):
-        profile = data_store.profile
         root_path = data_store.params["root"]
+        if root_path.startswith(_localRootPrefix):
+            self.s3bucket = None
+            self.uri = f"{root_path.rstrip('/')}/event_store"
+        else:
+            self.s3bucket = os.environ[f"{data_store.profile}_{pm.AwsS3Bucket}"]
+            self.uri = f"s3://{self.s3bucket}/{root_path}/event_store"
 
-        self.s3bucket = os.environ[f"{profile}_{pm.AwsS3Bucket}"]
-        s3region = os.environ[f"{profile}_{pm.AwsDefaultRegion}"]
-        s3id = os.environ[f"{profile}_{pm.AwsAccessKeyId}"]
-        s3key = os.environ[f"{profile}_{pm.AwsSecretAccessKey}"]
-        self.uri = f"s3://{self.s3bucket}/{root_path}/event_store"
-        config = tiledb.Config()
-        config["vfs.s3.region"] = s3region
-        config["vfs.s3.aws_access_key_id"] = s3id
-        config["vfs.s3.aws_secret_access_key"] = s3key
-        config["vfs.s3.multipart_part_size"] = str(5 * 1024 * 1024)
-        config["vfs.s3.max_parallel_ops"] = "2"
-
-        self.context = tiledb.default_ctx(config)
+        self.context = get_context(tiledb_config(data_store))
         self._create_attribute_array()
 
     def _create_attribute_array(self):
-        uri = self.uri + _defaultMetadataPath
+        uri = self._array_uri(_defaultMetadataPath)
         obj_type = tiledb.object_type(uri, self.context)
         if obj_type != None:
             return  # already created the array
@@ -62,6 +158,7 @@ class TileDbEventStore:
                     dtype=input_dim.dimension_type,
                     domain=input_dim.domain,
                     tile=input_dim.tile_extent,
+                    filters=self._filter_list(input_dim.filters),
                     ctx=self.context,
                 )
             )
@@ -69,7 +166,14 @@ class TileDbEventStore:
 
         attrs = []
         for attrkey, attrval in input.attributes.items():
-            attrs.append(tiledb.Attr(name=attrkey, dtype=attrval, ctx=self.context))
+            attrs.append(
+                tiledb.Attr(
+                    name=attrkey,
+                    dtype=attrval,
+                    filters=self._filter_list(input.attribute_filters.get(attrkey)),
+                    ctx=self.context,
+                )
+            )
 
         isSparse = input.array_type
         schema = tiledb.ArraySchema(
@@ -78,12 +182,30 @@ class TileDbEventStore:
             attrs=attrs,
             cell_order=input.cell_layout.value,
             tile_order=input.tile_layout.value,
+            capacity=input.capacity or 0,
+            offsets_filters=self._filter_list(input.offsets_filters),
             ctx=self.context,
         )
 
-        tiledb.Array.create(
-            uri=self.uri + "/" + input.array_path, schema=schema, ctx=self.context
-        )
+        uri = self._array_uri(input.array_path)
+        with tracing.get_tracer().span("tiledb.create_array", array=uri):
+            tiledb.Array.create(uri=uri, schema=schema, ctx=self.context)
+
+    def _filter_list(self, filters: List[ArrayFilter]) -> tiledb.FilterList:
+        if not filters:
+            return None
+        pipeline = []
+        for f in filters:
+            kwargs = {}
+            if f.level is not None:
+                if f.filter_type == FilterType.BIT_WIDTH_REDUCTION:
+                    kwargs["window"] = f.level
+                else:
+                    kwargs["level"] = f.level
+            if f.reinterpret_type is not None:
+                kwargs["reinterp_dtype"] = f.reinterpret_type
+            pipeline.append(_filterTypes[f.filter_type](ctx=self.context, **kwargs))
+        return tiledb.FilterList(pipeline, ctx=self.context)
 
     def put_array(self, input: PutArrayInput):
 
@@ -94,8 +216,9 @@ class TileDbEventStore:
                 writeinput[buffer.attr_name] = buffer.buffer
                 # writeinput[buffer.attr_name] = (buffer.offsets, buffer.buffer)
 
-            with tiledb.DenseArray(
-                uri=self.uri + "/" + input.array_path, mode="w", ctx=self.context
+            uri = self._array_uri(input.array_path)
+            with tracing.get_tracer().span("tiledb.put_array", array=uri), tiledb.DenseArray(
+                uri=uri, mode="w", ctx=self.context
             ) as array:
                 array[:] = writeinput
                 # array[input.buffer_range] = writeinput
@@ -103,28 +226,351 @@ class TileDbEventStore:
         elif input.array_type == ArrayType.SPARSE:
             pass
 
+    def put_table(self, table: any, array_path: str, buffer_range: List[int] = None):
+        """
+        Writes a pyarrow Table (or RecordBatch) into an existing array.  Columns
+        named after array attributes are written as attribute data.  Sparse arrays
+        take their coordinates from the columns named after the dimensions.  Dense
+        arrays are written in cell order over buffer_range, given as inclusive
+        [start, end] pairs per dimension, or over the full domain when None.
+        Single chunk columns of fixed width types are passed to TileDB without
+        copying.
+        """
+        uri = self._array_uri(array_path)
+        with tracing.get_tracer().span("tiledb.put_table", array=uri), tiledb.open(
+            uri=uri, mode="w", ctx=self.context
+        ) as array:
+            schema = array.schema
+            names = table.column_names
+            data = {
+                schema.attr(i).name: _arrow_to_numpy(table.column(schema.attr(i).name))
+                for i in range(schema.nattr)
+                if schema.attr(i).name in names
+            }
+
+            if schema.sparse:
+                coords = [_arrow_to_numpy(table.column(d.name)) for d in schema.domain]
+                array[tuple(coords)] = data
+                return
+
+            if buffer_range is None:
+                bounds = [d.domain for d in schema.domain]
+            else:
+                bounds = [
+                    (buffer_range[i], buffer_range[i + 1])
+                    for i in range(0, len(buffer_range), 2)
+                ]
+            shape = tuple(hi - lo + 1 for lo, hi in bounds)
+            order = "F" if schema.cell_order == LayoutOrder.COLMAJOR.value else "C"
+            data = {name: buf.reshape(shape, order=order) for name, buf in data.items()}
+            array[tuple(slice(lo, hi + 1) for lo, hi in bounds)] = data
+
     def get_array(self, input: GetArrayInput):
         slices = []
         for i in range(0, len(input.buffer_range), 2):
             slices.append(slice(input.buffer_range[i], input.buffer_range[i + 1]))
 
-        with tiledb.open(
-            uri=self.uri + "/" + input.array_path, mode="r", ctx=self.context
+        uri = self._array_uri(input.array_path)
+        with tracing.get_tracer().span("tiledb.get_array", array=uri), tiledb.open(
+            uri=uri, mode="r", ctx=self.context
         ) as array:
+            fmt = result_format(input)
+            if fmt == ResultFormat.ARROW:
+                # arrow results are built directly from the TileDB buffers
+                return array.query(attrs=input.attrs, return_arrow=True).df[*slices]
             q = array.query(attrs=input.attrs)
-            if input.df:
+            if fmt == ResultFormat.DATAFRAME:
                 return q.df[*slices]
             else:
                 return q[*slices]
 
+    def iter_array(self, input: GetArrayInput) -> Iterator[any]:
+        """
+        Yields the results of a get_array query in batches that fit within
+        input.batch_size bytes, so arrays larger than memory can be processed.
+        Sparse arrays use TileDB incomplete queries with the read buffers sized
+        to the budget. TileDB-Py only supports incomplete queries on sparse arrays,
+        so dense arrays are read in bands of whole rows along the first dimension,
+        each band a separate query sized to the budget.
+        Batches have the same format as get_array results and buffer_range has the
+        same meaning (exclusive upper bounds for numpy, inclusive for DataFrames
+        and Arrow tables). When buffer_range is None the non-empty domain is read.
+        """
+        fmt = result_format(input)
+        tabular = fmt != ResultFormat.NUMPY
+        budget = input.batch_size or _defaultBatchSize
+        uri = self._array_uri(input.array_path)
+        schema = tiledb.ArraySchema.load(uri, ctx=self.context)
+        # each attribute and dimension gets its own read buffer
+        buffers = len(input.attrs) + schema.domain.ndim
+        with tiledb.open(
+            uri=uri, mode="r", ctx=self._batch_context(budget // buffers)
+        ) as array:
+            # inclusive (start, end) bounds for each dimension
+            if input.buffer_range is None:
+                bounds = array.nonempty_domain() or [d.domain for d in schema.domain]
+            else:
+                end_adjust = 0 if tabular else 1
+                bounds = [
+                    (input.buffer_range[i], input.buffer_range[i + 1] - end_adjust)
+                    for i in range(0, len(input.buffer_range), 2)
+                ]
+
+            if schema.sparse:
+                q = array.query(
+                    attrs=input.attrs,
+                    return_incomplete=True,
+                    return_arrow=fmt == ResultFormat.ARROW,
+                )
+                indexer = q.df if tabular else q.multi_index
+                yield from indexer[tuple(slice(lo, hi) for lo, hi in bounds)]
+                return
+
+            cell_bytes = sum(schema.attr(a).dtype.itemsize for a in input.attrs)
+            row_cells = int(np.prod([hi - lo + 1 for lo, hi in bounds[1:]]))
+            rows = max(1, budget // (cell_bytes * row_cells))
+            q = array.query(attrs=input.attrs, return_arrow=fmt == ResultFormat.ARROW)
+            first_lo, first_hi = bounds[0]
+            for lo in range(first_lo, first_hi + 1, rows):
+                hi = min(lo + rows - 1, first_hi)
+                if tabular:
+                    rest = [slice(dlo, dhi) for dlo, dhi in bounds[1:]]
+                    yield q.df[lo:hi, *rest]
+                else:
+                    rest = [slice(dlo, dhi + 1) for dlo, dhi in bounds[1:]]
+                    yield q[lo : hi + 1, *rest]
+
+    def _batch_context(self, buffer_bytes: int) -> tiledb.Ctx:
+        # the read buffer size is rounded down to a power of two so batch reads with
+        # different budgets share a few cached contexts, see get_context
+        buffer_bytes = 1 << (max(1, buffer_bytes).bit_length() - 1)
+        config = tiledb.Config(self.context.config().dict())
+        config["py.init_buffer_bytes"] = str(buffer_bytes)
+        return get_context(config)
+
+    def iter_arrays(self, input: GetArraysInput) -> Iterator[Tuple[str, any]]:
+        """
+        Reads each array in input.array_paths on a bounded thread pool and yields
+        (array_path, result) tuples in completion order.  At most max_workers
+        results are held in memory at a time.
+        """
+        workers = input.max_workers or int(
+            self.context.config()["sm.io_concurrency_level"]
+        )
+        paths = iter(input.array_paths)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = {}
+
+            def submit_next() -> bool:
+                path = next(paths, None)
+                if path is None:
+                    return False
+                getInput = GetArrayInput(
+                    attrs=input.attrs,
+                    array_path=path,
+                    buffer_range=input.buffer_range,
+                    df=input.df,
+                    format=input.format,
+                )
+                pending[executor.submit(self.get_array, getInput)] = path
+                return True
+
+            for _ in range(workers):
+                if not submit_next():
+                    break
+            try:
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        path = pending.pop(future)
+                        submit_next()
+                        yield path, future.result()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def get_arrays(self, input: GetArraysInput) -> any:
+        """
+        Reads many arrays concurrently.  With input.reduce set, returns a dict of
+        attribute name to the reduced array.  Otherwise returns a dict of attribute
+        name to the results stacked along a new leading axis in array_paths order.
+        DataFrame results are concatenated with an array_path index level and Arrow
+        results are concatenated with an array_path column.  Raises a ValueError
+        when an array path is listed more than once.
+        """
+        seen = set()
+        for path in input.array_paths:
+            if path in seen:
+                raise ValueError(f"Array path {path} is listed more than once")
+            seen.add(path)
+        fmt = result_format(input)
+        if input.reduce is not None:
+            if fmt != ResultFormat.NUMPY:
+                raise ValueError(f"Reductions are not supported for {fmt.value} results")
+            return self._reduce_arrays(input)
+
+        results = dict(self.iter_arrays(input))
+        ordered = [results.pop(path) for path in input.array_paths]
+        if fmt == ResultFormat.DATAFRAME:
+            import pandas as pd
+
+            return pd.concat(ordered, keys=input.array_paths, names=["array_path"])
+        if fmt == ResultFormat.ARROW:
+            import pyarrow as pa
+
+            tables = [
+                t.append_column("array_path", pa.repeat(pa.scalar(path), t.num_rows))
+                for path, t in zip(input.array_paths, ordered)
+            ]
+            return pa.concat_tables(tables)
+        return {attr: np.stack([r[attr] for r in ordered]) for attr in input.attrs}
+
+    def _reduce_arrays(self, input: GetArraysInput) -> dict:
+        reduced = {}
+        count = 0
+        for _, result in self.iter_arrays(input):
+            count = count + 1
+            for attr in input.attrs:
+                data = result[attr]
+                acc = reduced.get(attr)
+                if acc is None:
+                    if input.reduce in (ArrayReduction.SUM, ArrayReduction.MEAN):
+                        wide = np.float64 if data.dtype.kind in "fc" else np.int64
+                        reduced[attr] = data.astype(wide)
+                    else:
+                        reduced[attr] = data.copy()
+                elif input.reduce == ArrayReduction.MIN:
+                    np.minimum(acc, data, out=acc)
+                elif input.reduce == ArrayReduction.MAX:
+                    np.maximum(acc, data, out=acc)
+                else:
+                    np.add(acc, data, out=acc)
+
+        if input.reduce == ArrayReduction.MEAN:
+            return {attr: acc / count for attr, acc in reduced.items()}
+        return reduced
+
+    def consolidate(
+        self,
+        array_path: str,
+        mode: ConsolidationMode = ConsolidationMode.FRAGMENTS,
+        steps: int = None,
+        step_min_frags: int = None,
+        step_max_frags: int = None,
+        buffer_size: int = None,
+    ):
+        """
+        Consolidates the fragments, fragment metadata, array metadata or commits
+        of an array.  Consolidation writes new fragments alongside the existing
+        ones so it is safe to run while other workers are reading the array.
+        The consolidated fragments are not removed until vacuum is called.
+
+        - steps: maximum number of consolidation steps
+        - step_min_frags/step_max_frags: fragment count bounds per step
+        - buffer_size: attribute buffer budget in bytes used by each step
+        """
+        config = tiledb.Config()
+        config["sm.consolidation.mode"] = mode.value
+        if steps is not None:
+            config["sm.consolidation.steps"] = str(steps)
+        if step_min_frags is not None:
+            config["sm.consolidation.step_min_frags"] = str(step_min_frags)
+        if step_max_frags is not None:
+            config["sm.consolidation.step_max_frags"] = str(step_max_frags)
+        if buffer_size is not None:
+            config["sm.consolidation.buffer_size"] = str(buffer_size)
+        uri = self._array_uri(array_path)
+        with tracing.get_tracer().span("tiledb.consolidate", array=uri, mode=mode.value):
+            tiledb.consolidate(uri, config=config, ctx=self.context)
+
+    def vacuum(
+        self, array_path: str, mode: ConsolidationMode = ConsolidationMode.FRAGMENTS
+    ):
+        """
+        Removes the fragments, fragment metadata, array metadata or commits
+        made obsolete by a previous consolidate call using the same mode.
+        Readers that opened the array before the vacuum may fail, so this
+        should be run as a separate maintenance step.
+        """
+        config = tiledb.Config()
+        config["sm.vacuum.mode"] = mode.value
+        uri = self._array_uri(array_path)
+        with tracing.get_tracer().span("tiledb.vacuum", array=uri, mode=mode.value):
+            tiledb.vacuum(uri, config=config, ctx=self.context)
+
+    def fragment_count(self, array_path: str) -> int:
+        fragments = tiledb.array_fragments(
+            self._array_uri(array_path), ctx=self.context
+        )
+        return len(fragments)
+
+    def _array_uri(self, array_path: str) -> str:
+        return self.uri + "/" + array_path.removeprefix("/")
+
     def put_metadata(self, key: str, val: any):
-        with tiledb.Array(self.uri + "/" + _defaultMetadataPath, "w") as array:
+        uri = self._array_uri(_defaultMetadataPath)
+        with tiledb.Array(uri, "w", ctx=self.context) as array:
             array.meta[key] = val
 
     def get_metadata(self, key: str) -> any:
-        with tiledb.Array(self.uri + "/" + _defaultMetadataPath, "r") as array:
+        uri = self._array_uri(_defaultMetadataPath)
+        with tiledb.Array(uri, "r", ctx=self.context) as array:
             return array.meta[key]
 
     def del_metadata(self, key: str):
-        with tiledb.Array(self.uri + "/" + _defaultMetadataPath, "w") as array:
+        uri = self._array_uri(_defaultMetadataPath)
+        with tiledb.Array(uri, "w", ctx=self.context) as array:
             del array.meta[key]
+
+
+def _arrow_to_numpy(column: any) -> np.ndarray:
+    # zero copy for single chunk fixed width columns without nulls
+    if hasattr(column, "num_chunks"):
+        if column.num_chunks == 1:
+            column = column.chunk(0)
+        else:
+            column = column.combine_chunks()
+    return column.to_numpy(zero_copy_only=False)
+
+
+class TileDbMaintenanceRunner:
+    """
+    Action runner that consolidates and vacuums event store arrays.  Register it
+    with action_runner.register_action_runner and add an action to the payload
+    so maintenance runs as its own step, separate from the actions writing data.
+
+    Action Attributes:
+    - store : str
+        The name of the TileDB event store. Defaults to EVENT_STORE
+    - arrays : list[str]
+        The array paths to consolidate. The metadata array is always included
+    - modes : list[str]
+        Consolidation modes to run in order. Defaults to fragments, fragment_meta
+    - steps, step_min_frags, step_max_frags, buffer_size : str
+        Optional consolidation budgets. See TileDbEventStore.consolidate
+    - vacuum : str
+        "false" to skip vacuuming after consolidation
+    """
+
+    pm: any
+    action: any
+
+    def run(self):
+        attrs = self.action.attributes
+        store = self.pm.get_store(attrs.get("store", "EVENT_STORE"))
+        tdb = TileDbEventStore()
+        tdb.connect(store)
+
+        budgets = {}
+        for budget in ["steps", "step_min_frags", "step_max_frags", "buffer_size"]:
+            if budget in attrs:
+                budgets[budget] = int(attrs[budget])
+
+        modes = attrs.get("modes", ["fragments", "fragment_meta"])
+        arrays = list(attrs.get("arrays", [])) + [_defaultMetadataPath]
+        for array_path in arrays:
+            for mode in modes:
+                tdb.consolidate(array_path, ConsolidationMode(mode), **budgets)
+            if str(attrs.get("vacuum", "true")).lower() != "false":
+                for mode in modes:
+                    tdb.vacuum(array_path, ConsolidationMode(mode))
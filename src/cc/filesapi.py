@@ -1,12 +1,27 @@
 import fnmatch
+import hashlib
+import logging
 import mimetypes
 import os
 import abc
-from typing import Iterable, List, Optional
-from collections import namedtuple
+import base64
+import io
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from enum import Enum
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from collections import OrderedDict, namedtuple
 from pathlib import Path
 import boto3
 from boto3.s3.transfer import TransferConfig
+from botocore import xform_name
+from botocore.config import Config
+from cc import bandwidth
+from cc import tracing
+from cc import transfer_governor
+from cc.bandwidth import Priority
+from cc.transfer_governor import TransferGovernor
 
 AwsAccessKeyId = "AWS_ACCESS_KEY_ID"
 AwsSecretAccessKey = "AWS_SECRET_ACCESS_KEY"
@@ -15,8 +30,48 @@ AwsS3Bucket = "AWS_S3_BUCKET"
 AwsEndpoint = "AWS_ENDPOINT"
 
 S3_TRANSFER_CONCURRENCY = 5
+# attempts made by botocore itself for the requests the TransferGovernor wraps.  the
+# governor retries their throttling and transient errors so it can adjust concurrency
+S3_CLIENT_MAX_ATTEMPTS = 1
+S3_LIST_CONCURRENCY = 8
+LIST_QUEUE_PAGES = 16  # listed pages buffered ahead of an iter_dir consumer
 MULTIPART_THRESHOLD = 1024 * 1024 * 1000  # 1GB Threshold
 MULTIPART_CHUNKSIZE = 1024 * 1024 * 10  # 10 mb chunks
+MIN_MULTIPART_PARTSIZE = 1024 * 1024 * 5  # S3 minimum for all but the last part
+HASH_CHUNKSIZE = 1024 * 1024 * 8
+RANGE_BLOCKSIZE = 1024 * 1024  # bytes fetched per range request block
+RANGE_CACHE_BLOCKS = 64  # blocks kept by an S3RangeReader
+
+# S3 additional checksum computed by boto3 for each uploaded part and verified by S3
+S3_CHECKSUM_ALGORITHM = "SHA256"
+# user metadata (or, for multipart uploads, object tag) holding the sha256 of the
+# whole object.  The S3 checksum of an object uploaded in one request is the sha256
+# of the object, but the S3 checksum of a multipart upload is a checksum of the part
+# checksums, so the digest computed while uploading is stored separately for
+# download verification and change detection
+CHECKSUM_METADATA_KEY = "cc-sha256"
+
+DEFAULT_EXCLUDES = [
+    "**/__pycache__/**",
+    "**/*.pyc",
+    "**/.DS_Store",
+    "**/.git/**",
+    "**/.pytest_cache/**",
+    "**/.mypy_cache/**",
+]
+
+SyncResult = namedtuple("SyncResult", ["uploaded", "skipped", "deleted"])
+
+
+class SyncCompare(Enum):
+    """
+    How put_folder/sync_folder decide that a local file matches an existing object.
+    """
+
+    SIZE = "size"
+    MTIME = "mtime"
+    CHECKSUM = "checksum"
+
 
 FileStoreResultObject = namedtuple(
     "FileStoreResultObject",
@@ -30,6 +85,53 @@ class IStreamingBody(metaclass=abc.ABCMeta):
         pass
 
 
+class ChecksumError(Exception):
+    """
+    Raised when downloaded data does not match the checksum stored with the object,
+    or when a local file changed while it was uploaded.
+    """
+
+    def __init__(self, path: str, expected: str, actual: str):
+        super().__init__(
+            f"Checksum mismatch for {path}: expected sha256 {expected}, got {actual}"
+        )
+        self.path = path
+        self.expected = expected
+        self.actual = actual
+
+
+def stored_sha256(response: dict, get_tagging) -> Optional[str]:
+    """
+    Returns the hex sha256 of a whole object from a head_object or get_object
+    response made with ChecksumMode="ENABLED": the cc-sha256 metadata, the S3
+    SHA256 checksum of an object uploaded in one request, or else the cc-sha256 tag
+    recorded after a multipart upload.  get_tagging() returns the get_object_tagging
+    response and is only called in the last case.  Returns None when the object
+    has no recorded sha256.
+    """
+    sha256 = response.get("Metadata", {}).get(CHECKSUM_METADATA_KEY)
+    if sha256:
+        return sha256
+    checksum = response.get("ChecksumSHA256")
+    # multipart uploads have an ETag ending in -<part count>
+    multipart = "-" in response.get("ETag", "") or response.get("ChecksumType") == "COMPOSITE"
+    if checksum and "-" not in checksum and not multipart:
+        return base64.b64decode(checksum).hex()
+    tags = {t["Key"]: t["Value"] for t in get_tagging().get("TagSet", [])}
+    return tags.get(CHECKSUM_METADATA_KEY)
+
+
+def file_sha256(path: str | os.PathLike) -> str:
+    """
+    Returns the hex sha256 digest of a local file.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNKSIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
 ##############################################################
 ####  S3
 ##############################################################
@@ -44,6 +146,9 @@ class S3FileInfo:
     - size()->int: returns the size of the object in bytes
     - mod_time()->date: returns the date/time that the object was last modified
     - is_dir()->bool: returns a boolean indicating if the object represents an s3 prefix
+    - etag()->str: returns the object ETag
+    - sha256()->str: returns the sha256 digest of the object recorded by S3 or by
+        the sdk when it was uploaded, or None
     """
 
     def __init__(self, objectSummary):
@@ -61,15 +166,83 @@ class S3FileInfo:
     def is_dir(self):
         return False
 
+    def etag(self) -> str:
+        return self.objectSummary.e_tag
+
+    def sha256(self) -> Optional[str]:
+        client = self.objectSummary.meta.client
+        params = {"Bucket": self.objectSummary.bucket_name, "Key": self.objectSummary.key}
+        head = client.head_object(ChecksumMode="ENABLED", **params)
+        return stored_sha256(head, lambda: client.get_object_tagging(**params))
+
+
+class S3DirEntry:
+    """
+    A directory (common prefix) or object listed by S3FileStore.iter_dir.
+
+    Attributes:
+    - key : str
+        The full object key, or the prefix ending in "/" for directories
+    - size : int
+        The object size in bytes, 0 for directories
+    - modified : datetime
+        The object last modified time, None for directories
+    - is_dir : bool
+        True for common prefixes
+    """
+
+    __slots__ = ("key", "size", "modified", "is_dir")
+
+    def __init__(self, key: str, size: int = 0, modified=None, is_dir: bool = False):
+        self.key = key
+        self.size = size
+        self.modified = modified
+        self.is_dir = is_dir
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.key.rstrip("/"))
+
+    def __repr__(self) -> str:
+        return f"S3DirEntry({self.key!r}, size={self.size}, is_dir={self.is_dir})"
+
+
+# S3FileStores by profile, bucket and credentials while caching is enabled
+_fileStoreCache = None
+_fileStoreCacheLock = threading.Lock()
+
+
+def set_filestore_cache(enabled: bool):
+    """
+    Enables or disables reuse of S3FileStores across NewS3FileStore calls with the
+    same profile, bucket, credentials and endpoint.  Long lived processes that
+    construct many PluginManagers (e.g. cc.worker) enable it so the boto3 sessions
+    and clients are created once.  Disabling the cache clears it.
+    """
+    global _fileStoreCache
+    with _fileStoreCacheLock:
+        _fileStoreCache = {} if enabled else None
+
 
 def NewS3FileStore(profile, bucket):
+    access_key = os.environ[f"{profile}_{AwsAccessKeyId}"]
+    secret_key = os.environ[f"{profile}_{AwsSecretAccessKey}"]
+    region = os.environ[f"{profile}_{AwsDefaultRegion}"]
+    endpoint = os.environ.get(f"{profile}_{AwsEndpoint}", None)
+    key = (profile, bucket, access_key, secret_key, region, endpoint)
+    with _fileStoreCacheLock:
+        if _fileStoreCache is not None and key in _fileStoreCache:
+            return _fileStoreCache[key]
     session = boto3.Session(
-        aws_access_key_id=os.environ[f"{profile}_{AwsAccessKeyId}"],
-        aws_secret_access_key=os.environ[f"{profile}_{AwsSecretAccessKey}"],
-        region_name=os.environ[f"{profile}_{AwsDefaultRegion}"],
+        aws_access_key_id=access_key,
+        aws_secret_access_key=secret_key,
+        region_name=region,
     )
-    endpoint = os.environ.get(f"{profile}_{AwsEndpoint}", None)
-    return S3FileStore(session, endpoint, bucket)
+    store = S3FileStore(session, endpoint, bucket)
+    with _fileStoreCacheLock:
+        if _fileStoreCache is not None:
+            store = _fileStoreCache.setdefault(key, store)
+    return store
 
 
 class S3FileStore:
@@ -84,75 +257,376 @@ class S3FileStore:
     - resource: boto3.Resource
         The boto3 S3 resource object
     - client: boto3.Client
-        the boto3 S3 Client object
+        the boto3 S3 Client for requests retried by the TransferGovernor.  botocore
+        makes a single attempt
+    - transfer_client: boto3.Client
+        the boto3 S3 Client used by boto3 transfers (upload_fileobj),
+        with botocore standard retries so each request, e.g. one multipart part, is
+        retried on its own
 
     Methods:
     - get_object_info(path:str)->S3FileInfo: takes a path (s3 key) and returns a wrapped S3 ObjectSummary
     - get_dir(path:str)->List[FileStoreResultObject]: for the given path will return all directories (common prefixes in S3)
         and files at the path.  Does not recurse into subdirectories.
+    - iter_dir(path:str,recursive:bool)->Iterator[S3DirEntry]: yields the directories and files at the path
+        as list pages arrive.  recursive=True lists subdirectories in parallel
     - get_object(path:str)->IStreamingBody: for the given file object returns a IStreamingBody (e.g. binary reader)
-    - put_object(path:str,reader:IStreamingBody): copies the reader to the given path in S3.
-        uses the boto3 upload_fileobj and supports large multipart uploads
+    - get_range(path:str,offset:int,length:int)->bytes: returns length bytes of the object from offset
+    - put_object(path:str,reader:IStreamingBody)->str: copies the reader to the given path in S3
+        and returns its sha256, computed while uploading.  uses the boto3 upload_fileobj
+        and supports large multipart uploads
+    - download_file(path:str,localpath:str)->int: downloads an object to a local file and
+        verifies it against the recorded sha256.  returns the number of bytes written
+    - upload_file(localpath:str,path:str,skip_unchanged:bool)->bool: uploads a local file.
+        returns False if skip_unchanged is set and S3 already holds identical content
+    - put_folder(local_dir,dest_prefix,...)->List[str]: uploads a local directory tree and
+        returns the uploaded keys
+    - sync_folder(local_dir,dest_prefix,compare,delete_orphans,...)->SyncResult: uploads only
+        new or changed files and optionally deletes remote orphans
+    - open_writer(path:str,part_size:int,max_in_flight:int)->S3MultipartWriter: returns a
+        writable file object that streams to the object with a multipart upload
+    - open_reader(path:str,block_size:int,cache_blocks:int)->S3RangeReader: returns a
+        seekable file object that reads the object with range requests
+
+    Uploads send an S3 additional checksum (S3_CHECKSUM_ALGORITHM) which S3 verifies on
+    receipt, and downloads ask S3 to return it so boto3 validates the response body.
+    Files are read once: the sha256 of an upload is computed while it is sent, and
+    only hashed beforehand when a skip_unchanged or sync comparison needs it.  The
+    S3 checksum of a single request upload is that sha256; multipart uploads record
+    it in a cc-sha256 object tag (see stored_sha256).
+
+    Reads (get_object, download_file) are INTERACTIVE and uploads are BACKGROUND
+    transfers for the process bandwidth limiter, see cc.bandwidth.
+
+    Requests go through a TransferGovernor (the shared process governor unless one is
+    given), which retries throttled and transient errors with backoff and limits the
+    number of requests and multipart transfer threads in flight.  Uploads made with
+    boto3 transfers and the lazy loads of the boto3 resource are retried per request
+    by botocore instead; their throttles still reduce the governor concurrency.
     """
 
-    def __init__(self, session, endpoint, bucket):
+    def __init__(self, session, endpoint, bucket, governor: TransferGovernor = None):
         self.bucket = bucket
         self.session = session
-        self.resource = self.session.resource("s3", endpoint_url=endpoint)
-        self.client = self.session.client("s3", endpoint_url=endpoint)
+        self.governor = governor or transfer_governor.get_governor()
+        config = Config(
+            retries={"total_max_attempts": S3_CLIENT_MAX_ATTEMPTS, "mode": "standard"}
+        )
+        self.client = self.session.client("s3", endpoint_url=endpoint, config=config)
+        retrying = Config(retries={"mode": "standard"})
+        self.transfer_client = self.session.client(
+            "s3", endpoint_url=endpoint, config=retrying
+        )
+        self.resource = self.session.resource(
+            "s3", endpoint_url=endpoint, config=retrying
+        )
+        for client in (self.transfer_client, self.resource.meta.client):
+            client.meta.events.register("needs-retry.s3", self._observe_retry)
         # session.client("s3", endpoint_url=endpoint)
         # s3_resource = session.resource("s3", endpoint_url=endpoint)
 
+    def _observe_retry(self, response=None, caught_exception=None, operation=None, **kwargs):
+        # reports the errors botocore retries itself to the governor.  returns None so
+        # the retry decision is left to botocore
+        if caught_exception is not None:
+            kind = transfer_governor.classify_error(caught_exception)
+        elif response is not None:
+            kind = transfer_governor.classify_response(response[1])
+        else:
+            kind = None
+        if kind is not None:
+            self.governor.observe(kind, xform_name(operation.name))
+
     def get_object_info(self, path) -> S3FileInfo:
         s3Path = path.removeprefix("/")
         objectSummary = self.resource.ObjectSummary(self.bucket, s3Path)
         return S3FileInfo(objectSummary)
 
     def get_dir(self, path) -> List[FileStoreResultObject]:
-        s3Path = path.removeprefix("/")
-        if s3Path[-1] != "/":
-            s3Path = s3Path + "/"
-        paginator = self.client.get_paginator("list_objects_v2")
-        params = {"Bucket": self.bucket, "Prefix": s3Path, "Delimiter": "/"}
-        page_iterator = paginator.paginate(**params)
-        count = 0
         result = []
-        for page in page_iterator:
-            for prefix in page["CommonPrefixes"]:
+        for count, entry in enumerate(self.iter_dir(path)):
+            if entry.is_dir:
                 fso = FileStoreResultObject(
-                    count, prefix["Prefix"], "", prefix["Prefix"], "", True, "", ""
+                    count, entry.key, "", entry.key, "", True, "", ""
                 )
-                result.append(fso)
-                count = count + 1
-            for s3object in page["Contents"]:
+            else:
                 fso = FileStoreResultObject(
                     count,
-                    os.path.basename(s3object["Key"]),
-                    str(s3object["Size"]),
-                    os.path.dirname(s3object["Key"]),
-                    os.path.splitext(s3object["Key"])[1][1:],
+                    entry.name,
+                    str(entry.size),
+                    os.path.dirname(entry.key),
+                    os.path.splitext(entry.key)[1][1:],
                     False,
-                    s3object["LastModified"],
+                    entry.modified,
                     "",
                 )
-                result.append(fso)
-                count = count + 1
+            result.append(fso)
         return result
 
-    def get_object(self, path: str) -> IStreamingBody:
+    def iter_dir(
+        self,
+        path: str,
+        recursive: bool = False,
+        max_workers: int = S3_LIST_CONCURRENCY,
+    ) -> Iterator[S3DirEntry]:
+        """
+        Yields an S3DirEntry for each common prefix and object at path as list pages
+        arrive.  With recursive=True the common prefixes are also listed, up to
+        max_workers prefixes at a time, and entries from different prefixes are
+        interleaved in the order their pages arrive.
+        """
+        s3Path = path.removeprefix("/")
+        if s3Path and s3Path[-1] != "/":
+            s3Path = s3Path + "/"
+        if not recursive:
+            for page in self._iter_list_pages(s3Path):
+                yield from page
+            return
+
+        pages = queue.Queue(maxsize=LIST_QUEUE_PAGES)
+        stop = threading.Event()
+
+        def put(item) -> bool:
+            # blocks while the consumer is behind, gives up once it has stopped
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def list_prefix(prefix: str):
+            try:
+                for page in self._iter_list_pages(prefix):
+                    for entry in page:
+                        if entry.is_dir and not put(("prefix", entry.key)):
+                            return
+                    if not put(("page", page)):
+                        return
+            except Exception as e:
+                put(("error", e))
+            finally:
+                put(("done", prefix))
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            executor.submit(list_prefix, s3Path)
+            pending = 1
+            while pending:
+                kind, value = pages.get()
+                if kind == "page":
+                    yield from value
+                elif kind == "prefix":
+                    executor.submit(list_prefix, value)
+                    pending += 1
+                elif kind == "done":
+                    pending -= 1
+                else:
+                    raise value
+        finally:
+            # the consumer may stop early, release any blocked listing threads
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _iter_list_pages(self, s3Path: str) -> Iterator[List[S3DirEntry]]:
+        with tracing.get_tracer().span("s3.list", bucket=self.bucket, key=s3Path):
+            for page in self._list_pages(Prefix=s3Path, Delimiter="/"):
+                entries = [
+                    S3DirEntry(prefix["Prefix"], is_dir=True)
+                    for prefix in page.get("CommonPrefixes", [])
+                ]
+                entries.extend(
+                    S3DirEntry(s3object["Key"], s3object["Size"], s3object["LastModified"])
+                    for s3object in page.get("Contents", [])
+                )
+                yield entries
+
+    def get_object(
+        self, path: str, priority: Priority = Priority.INTERACTIVE
+    ) -> IStreamingBody:
         s3Path = path.removeprefix("/")
-        s3object = self.resource.Object(self.bucket, s3Path)
-        return s3object.get()["Body"]
+        with tracing.get_tracer().span("s3.get_object", bucket=self.bucket, key=s3Path):
+            response = self.governor.call(
+                self.client.get_object,
+                Bucket=self.bucket,
+                Key=s3Path,
+                ChecksumMode="ENABLED",
+                op="get_object",
+            )
+            limiter = bandwidth.get_limiter()
+            if limiter is not None:
+                return limiter.reader(response["Body"], priority)
+            return response["Body"]
 
-    def put_object(self, path: str, reader: IStreamingBody):
+    def get_range(
+        self,
+        path: str,
+        offset: int,
+        length: int,
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> bytes:
+        if length <= 0:
+            return b""
         s3Path = path.removeprefix("/")
-        config = TransferConfig(
-            multipart_threshold=MULTIPART_THRESHOLD,
-            multipart_chunksize=MULTIPART_CHUNKSIZE,
-            max_concurrency=S3_TRANSFER_CONCURRENCY,
+        with tracing.get_tracer().span(
+            "s3.get_range", bucket=self.bucket, key=s3Path, offset=offset, length=length
+        ):
+            response = self.governor.call(
+                self.client.get_object,
+                Bucket=self.bucket,
+                Key=s3Path,
+                Range=f"bytes={offset}-{offset + length - 1}",
+                op="get_range",
+            )
+            data = response["Body"].read()
+        limiter = bandwidth.get_limiter()
+        if limiter is not None:
+            limiter.acquire(len(data), priority)
+        return data
+
+    def put_object(
+        self,
+        path: str,
+        reader: IStreamingBody,
+        sha256: str = None,
+        priority: Priority = Priority.BACKGROUND,
+    ) -> Optional[str]:
+        """
+        Uploads the reader and returns the sha256 of the bytes sent, computed while
+        they are uploaded.  A known sha256 is stored with the object and a
+        ChecksumError is raised if the uploaded bytes do not match it.
+        """
+        s3Path = path.removeprefix("/")
+        with tracing.get_tracer().span("s3.put_object", bucket=self.bucket, key=s3Path):
+            return self._upload(s3Path, reader, sha256, priority, {})
+
+    def _upload(
+        self,
+        s3Path: str,
+        reader: IStreamingBody,
+        sha256: Optional[str],
+        priority: Priority,
+        extra_args: dict,
+    ) -> Optional[str]:
+        config = self._transfer_config()
+        extra_args = dict(extra_args, ChecksumAlgorithm=S3_CHECKSUM_ALGORITHM)
+        if sha256 is not None:
+            extra_args["Metadata"] = {CHECKSUM_METADATA_KEY: sha256}
+        hashing = _HashingReader(reader)
+
+        # botocore retries each request (the whole object or one part) from the bytes
+        # s3transfer has read, so non-seekable readers are retried too
+        self.transfer_client.upload_fileobj(
+            hashing,
+            self.bucket,
+            s3Path,
+            ExtraArgs=extra_args,
+            Callback=_bandwidth_callback(priority),
+            Config=config,
+        )
+        digest = hashing.hexdigest()
+        if sha256 is not None:
+            if digest is not None and digest != sha256:
+                raise ChecksumError(s3Path, sha256, digest)
+        elif digest is not None and hashing.size >= config.multipart_threshold:
+            # the S3 checksum of a multipart upload is not the object sha256
+            self._record_sha256(s3Path, digest)
+        return digest
+
+    def _record_sha256(self, s3Path: str, sha256: str):
+        try:
+            self.governor.call(
+                self.client.put_object_tagging,
+                Bucket=self.bucket,
+                Key=s3Path,
+                Tagging={"TagSet": [{"Key": CHECKSUM_METADATA_KEY, "Value": sha256}]},
+                op="put_object_tagging",
+            )
+        except self.client.exceptions.ClientError as e:
+            logging.warning(
+                f"Could not record the sha256 of s3://{self.bucket}/{s3Path}, "
+                f"downloads of it will not be verified: {e}"
+            )
+
+    def _stored_sha256(self, s3Path: str, response: dict) -> Optional[str]:
+        return stored_sha256(
+            response,
+            lambda: self.governor.call(
+                self.client.get_object_tagging,
+                Bucket=self.bucket,
+                Key=s3Path,
+                op="get_object_tagging",
+            ),
         )
 
-        self.client.upload_fileobj(reader, self.bucket, s3Path, Config=config)
+    def download_file(self, path: str, localpath: str | os.PathLike) -> int:
+        s3Path = path.removeprefix("/")
+        with tracing.get_tracer().span(
+            "s3.download_file", bucket=self.bucket, key=s3Path
+        ):
+            response = self.governor.call(
+                self.client.get_object,
+                Bucket=self.bucket,
+                Key=s3Path,
+                ChecksumMode="ENABLED",
+                op="get_object",
+            )
+            expected = self._stored_sha256(s3Path, response)
+            if expected is None:
+                logging.warning(
+                    f"s3://{self.bucket}/{s3Path} has no recorded sha256, "
+                    "the download is not verified"
+                )
+            digest = hashlib.sha256()
+            body = response["Body"]
+            limiter = bandwidth.get_limiter()
+            if limiter is not None:
+                body = limiter.reader(body, Priority.INTERACTIVE)
+            try:
+                with open(localpath, "wb") as f:
+                    while chunk := body.read(HASH_CHUNKSIZE):
+                        digest.update(chunk)
+                        f.write(chunk)
+                    nbytes = f.tell()
+                if expected is not None and digest.hexdigest() != expected:
+                    raise ChecksumError(path, expected, digest.hexdigest())
+            except BaseException:
+                # never leave a partial or corrupt file behind
+                if os.path.exists(localpath):
+                    os.remove(localpath)
+                raise
+        return nbytes
+
+    def upload_file(
+        self, localpath: str | os.PathLike, path: str, skip_unchanged: bool = False
+    ) -> bool:
+        s3Path = path.removeprefix("/")
+        sha256 = None
+        if skip_unchanged:
+            # the comparison needs the digest before the upload; otherwise it is
+            # computed while the file is uploaded
+            sha256 = file_sha256(localpath)
+            if self._matches_remote(s3Path, os.path.getsize(localpath), sha256):
+                return False
+        with open(localpath, "rb") as f:
+            self.put_object(s3Path, f, sha256=sha256)
+        return True
+
+    def _matches_remote(self, s3Path: str, size: int, sha256: str) -> bool:
+        try:
+            head = self.governor.call(
+                self.client.head_object,
+                Bucket=self.bucket,
+                Key=s3Path,
+                ChecksumMode="ENABLED",
+                op="head",
+            )
+        except self.client.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        return head["ContentLength"] == size and self._stored_sha256(s3Path, head) == sha256
 
     def put_folder(
         self,
@@ -164,7 +638,92 @@ class S3FileStore:
         public_read: bool = False,
         cache_control: Optional[str] = None,
         dry_run: bool = False,
-    ):
+        sync: bool = False,
+        compare: SyncCompare | str = SyncCompare.CHECKSUM,
+        delete_orphans: bool = False,
+    ) -> List[str]:
+        """
+        Uploads the files under local_dir to dest_prefix and returns the uploaded keys.
+        With sync=True the upload is incremental, see sync_folder.
+        """
+        if sync:
+            return self.sync_folder(
+                local_dir,
+                dest_prefix,
+                compare=compare,
+                delete_orphans=delete_orphans,
+                include=include,
+                exclude=exclude,
+                follow_symlinks=follow_symlinks,
+                public_read=public_read,
+                cache_control=cache_control,
+                dry_run=dry_run,
+            ).uploaded
+        return self._upload_folder(
+            local_dir,
+            dest_prefix,
+            include,
+            exclude,
+            follow_symlinks,
+            public_read,
+            cache_control,
+            dry_run,
+        ).uploaded
+
+    def sync_folder(
+        self,
+        local_dir: str | os.PathLike,
+        dest_prefix: str,
+        compare: SyncCompare | str = SyncCompare.CHECKSUM,
+        delete_orphans: bool = False,
+        include: Optional[Iterable[str]] = None,
+        exclude: Optional[Iterable[str]] = None,
+        follow_symlinks: bool = False,
+        public_read: bool = False,
+        cache_control: Optional[str] = None,
+        dry_run: bool = False,
+    ) -> SyncResult:
+        """
+        Incrementally uploads local_dir to dest_prefix.  The destination is listed
+        once and a file is uploaded only if its key is missing or it differs by
+        the compare mode:
+        - size: the sizes differ
+        - mtime: the sizes differ or the local file is newer than the object
+        - checksum: the sizes differ or the sha256 stored with the object differs.
+            objects without a stored sha256 are uploaded again.  S3 listings do
+            not include object metadata, so every file whose size matches is
+            hashed and costs one HEAD request to read the stored sha256
+        With delete_orphans, objects under the prefix that match include/exclude but
+        have no local file are deleted.  Returns a SyncResult of uploaded, skipped
+        and deleted keys.  With dry_run nothing is uploaded or deleted and the
+        SyncResult reports what the sync would do.
+        """
+        return self._upload_folder(
+            local_dir,
+            dest_prefix,
+            include,
+            exclude,
+            follow_symlinks,
+            public_read,
+            cache_control,
+            dry_run,
+            compare=SyncCompare(compare),
+            delete_orphans=delete_orphans,
+        )
+
+    def _upload_folder(
+        self,
+        local_dir: str | os.PathLike,
+        dest_prefix: str,
+        include: Optional[Iterable[str]],
+        exclude: Optional[Iterable[str]],
+        follow_symlinks: bool,
+        public_read: bool,
+        cache_control: Optional[str],
+        dry_run: bool,
+        compare: SyncCompare = None,
+        delete_orphans: bool = False,
+    ) -> SyncResult:
         local_root = Path(local_dir).expanduser().resolve()
         if not local_root.is_dir():
             raise ValueError(f"Not a directory: {local_root}")
@@ -174,96 +733,543 @@ class S3FileStore:
             norm_prefix = norm_prefix + "/"
 
         include = list(include) if include is not None else ["**"]
-        exclude = (
-            list(exclude)
-            if exclude is not None
-            else [
-                "**/__pycache__/**",
-                "**/*.pyc",
-                "**/.DS_Store",
-                "**/.git/**",
-                "**/.pytest_cache/**",
-                "**/.mypy_cache/**",
-            ]
-        )
+        exclude = list(exclude) if exclude is not None else DEFAULT_EXCLUDES
+
+        # a sync lists the destination once and compares sizes and times against the
+        # listing.  only the checksum compare reads each matching object's metadata
+        remote = self._list_objects(norm_prefix) if compare is not None else {}
+        result = SyncResult([], [], [])
+        local_keys = set()
+
+        for abs_file, rel_posix in _iter_local_files(
+            local_root, include, exclude, follow_symlinks
+        ):
+            # Build S3 key
+            key = f"{norm_prefix}{rel_posix}"
+            local_keys.add(key)
+
+            sha256 = None
+            if key in remote:
+                unchanged, sha256 = self._unchanged(key, abs_file, remote[key], compare)
+                if unchanged:
+                    result.skipped.append(key)
+                    continue
+
+            if dry_run:
+                print(f"[DRY-RUN] s3://{self.bucket}/{key}  <=  {abs_file}")
+                result.uploaded.append(key)
+                continue
+
+            # Guess Content-Type
+            ctype, _ = mimetypes.guess_type(abs_file.name)
+            extra_args = {}
+            if ctype:
+                extra_args["ContentType"] = ctype
+            if public_read:
+                extra_args["ACL"] = "public-read"
+            if cache_control:
+                extra_args["CacheControl"] = cache_control
+
+            # files are hashed while they are uploaded unless the compare hashed them
+            with tracing.get_tracer().span(
+                "s3.upload_file", bucket=self.bucket, key=key
+            ), open(abs_file, "rb") as f:
+                self._upload(key, f, sha256, Priority.BACKGROUND, extra_args)
+            result.uploaded.append(key)
+
+        if delete_orphans:
+            for key in remote:
+                rel_posix = key[len(norm_prefix) :]
+                if key in local_keys or not _matches_any(rel_posix, include):
+                    continue
+                if _matches_any(rel_posix, exclude):
+                    continue
+                result.deleted.append(key)
+            if dry_run:
+                for key in result.deleted:
+                    print(f"[DRY-RUN] delete s3://{self.bucket}/{key}")
+            else:
+                self._delete_objects(result.deleted)
+
+        if compare is not None:
+            logging.info(
+                f"Synced {local_root} to s3://{self.bucket}/{norm_prefix}: "
+                f"{len(result.uploaded)} uploaded, {len(result.skipped)} unchanged, "
+                f"{len(result.deleted)} deleted"
+            )
+        return result
+
+    def _list_objects(self, prefix: str) -> dict:
+        objects = {}
+        with tracing.get_tracer().span("s3.list", bucket=self.bucket, key=prefix):
+            for page in self._list_pages(Prefix=prefix):
+                for s3object in page.get("Contents", []):
+                    objects[s3object["Key"]] = s3object
+        return objects
+
+    def _unchanged(
+        self, key: str, local: Path, s3object: dict, compare: SyncCompare
+    ) -> Tuple[bool, Optional[str]]:
+        # returns whether the object matches the local file, and the file sha256 when
+        # the compare needed it.  the file is only read for the checksum compare
+        stat = local.stat()
+        if s3object["Size"] != stat.st_size:
+            return False, None
+        if compare == SyncCompare.SIZE:
+            return True, None
+        if compare == SyncCompare.MTIME:
+            return s3object["LastModified"].timestamp() >= stat.st_mtime, None
+        sha256 = file_sha256(local)
+        return self._matches_remote(key, stat.st_size, sha256), sha256
+
+    def _delete_objects(self, keys: List[str]):
+        # delete_objects accepts at most 1000 keys per request
+        for i in range(0, len(keys), 1000):
+            batch = keys[i : i + 1000]
+            with tracing.get_tracer().span(
+                "s3.delete_objects", bucket=self.bucket, count=len(batch)
+            ):
+                self.governor.call(
+                    self.client.delete_objects,
+                    Bucket=self.bucket,
+                    Delete={"Objects": [{"Key": k} for k in batch], "Quiet": True},
+                    op="delete_objects",
+                )
+
+    def open_writer(
+        self,
+        path: str,
+        part_size: int = MULTIPART_CHUNKSIZE,
+        max_in_flight: int = S3_TRANSFER_CONCURRENCY,
+    ) -> "S3MultipartWriter":
+        return S3MultipartWriter(self, path.removeprefix("/"), part_size, max_in_flight)
+
+    def open_reader(
+        self,
+        path: str,
+        block_size: int = RANGE_BLOCKSIZE,
+        cache_blocks: int = RANGE_CACHE_BLOCKS,
+    ) -> "S3RangeReader":
+        return S3RangeReader(self, path.removeprefix("/"), block_size, cache_blocks)
 
-        config = TransferConfig(
+    def _list_pages(self, **params) -> Iterator[dict]:
+        # list_objects_v2 pagination with each page request under the governor
+        while True:
+            page = self.governor.call(
+                self.client.list_objects_v2, Bucket=self.bucket, op="list", **params
+            )
+            yield page
+            if not page.get("IsTruncated"):
+                return
+            params["ContinuationToken"] = page["NextContinuationToken"]
+
+    def _transfer_config(self) -> TransferConfig:
+        # multipart threads shrink with the governor concurrency while S3 throttles
+        return TransferConfig(
             multipart_threshold=MULTIPART_THRESHOLD,
             multipart_chunksize=MULTIPART_CHUNKSIZE,
-            max_concurrency=S3_TRANSFER_CONCURRENCY,
+            max_concurrency=max(
+                1, min(S3_TRANSFER_CONCURRENCY, self.governor.concurrency)
+            ),
             use_threads=True,
         )
 
-        uploaded_keys: List[str] = []
 
-        def _matches_any(path_rel_posix: str, patterns: Iterable[str]) -> bool:
-            return any(fnmatch.fnmatch(path_rel_posix, pat) for pat in patterns)
+class S3MultipartWriter(io.BufferedIOBase):
+    """
+    Writable file object that streams to an S3 object.  Writes are buffered into
+    part_size parts and each full part is uploaded as a multipart upload part while
+    writing continues.  At most max_in_flight parts are uploading at once; a write
+    that fills another part waits for a slot, so memory use is bounded by about
+    (max_in_flight + 1) * part_size.
+
+    Closing the writer uploads the last part and completes the upload.  Output
+    smaller than one part is sent with a single put_object instead.  Leaving a with
+    block on an exception, calling abort() or a failed part upload aborts the
+    multipart upload so no partial object is created.
+
+    Part uploads go through the store TransferGovernor and the bandwidth limiter as
+    BACKGROUND transfers, and send an S3 SHA256 checksum per part.  The sha256 of
+    everything written is recorded with the object once the upload completes.
+    """
+
+    def __init__(
+        self,
+        store: S3FileStore,
+        key: str,
+        part_size: int = MULTIPART_CHUNKSIZE,
+        max_in_flight: int = S3_TRANSFER_CONCURRENCY,
+    ):
+        if part_size < MIN_MULTIPART_PARTSIZE:
+            raise ValueError(f"part_size must be at least {MIN_MULTIPART_PARTSIZE}")
+        self.store = store
+        self.key = key
+        self.part_size = part_size
+        self.max_in_flight = max_in_flight
+        self.upload_id = None
+        self.bytes_written = 0
+        self._digest = hashlib.sha256()
+        self._buffer = bytearray()
+        self._parts: List[Future] = []
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._executor = None
+        self._aborted = False
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        if self.closed:
+            raise ValueError("write to closed S3MultipartWriter")
+        self._check_parts()
+        n = len(data)
+        self._buffer += data
+        self._digest.update(data)
+        self.bytes_written += n
+        while len(self._buffer) >= self.part_size:
+            part = bytes(self._buffer[: self.part_size])
+            del self._buffer[: self.part_size]
+            self._submit_part(part)
+        return n
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self._aborted:
+                return
+            if self.upload_id is None:
+                # never filled a part: a single request is cheaper
+                self.store.put_object(self.key, io.BytesIO(bytes(self._buffer)))
+            else:
+                if self._buffer:
+                    self._submit_part(bytes(self._buffer))
+                self._buffer = bytearray()
+                self._complete()
+        except BaseException:
+            self.abort()
+            raise
+        finally:
+            super().close()
 
-        for root, dirs, files in os.walk(local_root, followlinks=follow_symlinks):
-            root_path = Path(root)
-            rel_dir = (
-                ""
-                if root_path == local_root
-                else str(root_path.relative_to(local_root).as_posix())
+    def abort(self):
+        """
+        Stops the upload and discards any uploaded parts.
+        """
+        if self._aborted:
+            return
+        self._aborted = True
+        self._buffer = bytearray()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+        if self.upload_id is not None:
+            self.store.governor.call(
+                self.store.client.abort_multipart_upload,
+                Bucket=self.store.bucket,
+                Key=self.key,
+                UploadId=self.upload_id,
+                op="abort_multipart_upload",
             )
+        super().close()
 
-            # Allow exclude rules to prune whole dirs (speed optimization)
-            pruned_dirs = []
-            for d in list(dirs):
-                rel_dir_path = f"{rel_dir}/{d}" if rel_dir else d
-                if _matches_any(rel_dir_path + "/", exclude):
-                    pruned_dirs.append(d)
-            for d in pruned_dirs:
-                dirs.remove(d)
-
-            for fname in files:
-                abs_file = root_path / fname
-                rel_path = f"{rel_dir}/{fname}" if rel_dir else fname
-                rel_posix = rel_path.replace("\\", "/")
-
-                # include first, then exclude
-                if not _matches_any(rel_posix, include):
-                    continue
-                if _matches_any(rel_posix, exclude):
-                    continue
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+        return False
 
-                # Resolve symlinks to actual file content (if present)
-                if abs_file.is_symlink():
-                    try:
-                        abs_file = abs_file.resolve(strict=True)
-                    except FileNotFoundError:
-                        # Broken symlink -> skip
-                        continue
+    def _submit_part(self, part: bytes):
+        if self.upload_id is None:
+            response = self.store.governor.call(
+                self.store.client.create_multipart_upload,
+                Bucket=self.store.bucket,
+                Key=self.key,
+                ChecksumAlgorithm=S3_CHECKSUM_ALGORITHM,
+                op="create_multipart_upload",
+            )
+            self.upload_id = response["UploadId"]
+            self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight)
+        self._slots.acquire()
+        part_number = len(self._parts) + 1
+        try:
+            future = self._executor.submit(self._upload_part, part_number, part)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda f: self._slots.release())
+        self._parts.append(future)
 
-                if not abs_file.is_file():
-                    # Skip non-files (e.g., sockets, FIFOs)
-                    continue
+    def _upload_part(self, part_number: int, part: bytes) -> dict:
+        limiter = bandwidth.get_limiter()
+        if limiter is not None:
+            limiter.acquire(len(part), Priority.BACKGROUND)
+        with tracing.get_tracer().span(
+            "s3.upload_part", bucket=self.store.bucket, key=self.key, part=part_number
+        ):
+            response = self.store.governor.call(
+                self.store.client.upload_part,
+                Bucket=self.store.bucket,
+                Key=self.key,
+                UploadId=self.upload_id,
+                PartNumber=part_number,
+                Body=part,
+                ChecksumAlgorithm=S3_CHECKSUM_ALGORITHM,
+                op="upload_part",
+            )
+        return {
+            "PartNumber": part_number,
+            "ETag": response["ETag"],
+            "ChecksumSHA256": response.get("ChecksumSHA256"),
+        }
+
+    def _check_parts(self):
+        # surface a failed part upload on the next write
+        for future in self._parts:
+            if future.done() and future.exception() is not None:
+                self.abort()
+                raise future.exception()
+
+    def _complete(self):
+        try:
+            parts = [f.result() for f in self._parts]
+        finally:
+            self._executor.shutdown(wait=True)
+        for part in parts:
+            if part["ChecksumSHA256"] is None:
+                del part["ChecksumSHA256"]
+        with tracing.get_tracer().span(
+            "s3.complete_multipart_upload", bucket=self.store.bucket, key=self.key
+        ):
+            self.store.governor.call(
+                self.store.client.complete_multipart_upload,
+                Bucket=self.store.bucket,
+                Key=self.key,
+                UploadId=self.upload_id,
+                MultipartUpload={"Parts": parts},
+                op="complete_multipart_upload",
+            )
+        self.store._record_sha256(self.key, self._digest.hexdigest())
+
+
+class S3RangeReader(io.RawIOBase):
+    """
+    Seekable, read only file object over an S3 object for libraries that read
+    containers such as HDF5 through a file object.  Only the byte ranges that are
+    read are fetched.  The object is read in block_size blocks and the last
+    cache_blocks blocks are kept, so the many small reads of container metadata
+    are served from memory.  Blocks missing from one read are fetched with a
+    single range request per contiguous run.
+
+    Attributes:
+    - size : int
+        The object size in bytes
+    - requests : int
+        The number of range requests made
+    - bytes_fetched : int
+        The number of bytes fetched from S3
+    """
+
+    def __init__(
+        self,
+        store: S3FileStore,
+        key: str,
+        block_size: int = RANGE_BLOCKSIZE,
+        cache_blocks: int = RANGE_CACHE_BLOCKS,
+    ):
+        self.store = store
+        self.key = key
+        self.block_size = block_size
+        self.cache_blocks = cache_blocks
+        head = store.governor.call(
+            store.client.head_object, Bucket=store.bucket, Key=key, op="head"
+        )
+        self.size = head["ContentLength"]
+        self.requests = 0
+        self.bytes_fetched = 0
+        self._pos = 0
+        self._blocks: OrderedDict[int, bytes] = OrderedDict()
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self.size + offset
+        else:
+            raise ValueError(f"invalid whence: {whence}")
+        if pos < 0:
+            raise ValueError(f"negative seek position {pos}")
+        self._pos = pos
+        return pos
 
-                # Build S3 key
-                key = f"{norm_prefix}{rel_posix}"
-
-                # Guess Content-Type
-                ctype, _ = mimetypes.guess_type(abs_file.name)
-                extra_args = {}
-                if ctype:
-                    extra_args["ContentType"] = ctype
-                if public_read:
-                    extra_args["ACL"] = "public-read"
-                if cache_control:
-                    extra_args["CacheControl"] = cache_control
-
-                if dry_run:
-                    print(f"[DRY-RUN] s3://{self.bucket}/{key}  <=  {abs_file}")
-                    uploaded_keys.append(key)
+    def readinto(self, b) -> int:
+        if self.closed:
+            raise ValueError("read from closed S3RangeReader")
+        end = min(self._pos + len(b), self.size)
+        if end <= self._pos:
+            return 0
+        first = self._pos // self.block_size
+        last = (end - 1) // self.block_size
+        blocks = self._get_blocks(first, last)
+        out = memoryview(b)
+        n = 0
+        for index in range(first, last + 1):
+            block = blocks[index]
+            start = max(self._pos, index * self.block_size) - index * self.block_size
+            stop = min(end - index * self.block_size, len(block))
+            out[n : n + stop - start] = block[start:stop]
+            n += stop - start
+        self._pos = end
+        return n
+
+    def _get_blocks(self, first: int, last: int) -> Dict[int, bytes]:
+        blocks = {}
+        missing = []
+        for index in range(first, last + 1):
+            block = self._blocks.get(index)
+            if block is None:
+                missing.append(index)
+            else:
+                self._blocks.move_to_end(index)
+                blocks[index] = block
+        # one range request per run of contiguous missing blocks
+        while missing:
+            run = 1
+            while run < len(missing) and missing[run] == missing[0] + run:
+                run += 1
+            offset = missing[0] * self.block_size
+            length = min(run * self.block_size, self.size - offset)
+            data = self.store.get_range(self.key, offset, length)
+            self.requests += 1
+            self.bytes_fetched += len(data)
+            for i, index in enumerate(missing[:run]):
+                block = data[i * self.block_size : (i + 1) * self.block_size]
+                blocks[index] = block
+                self._blocks[index] = block
+            missing = missing[run:]
+        while len(self._blocks) > self.cache_blocks:
+            self._blocks.popitem(last=False)
+        return blocks
+
+
+def _bandwidth_callback(priority: Priority):
+    # boto3 transfer progress callback charging sent bytes to the bandwidth limiter
+    limiter = bandwidth.get_limiter()
+    return limiter.callback(priority) if limiter is not None else None
+
+
+class _HashingReader:
+    """
+    Wraps a reader passed to upload_fileobj and computes the sha256 of the bytes
+    uploaded.  botocore seeks back to compute request checksums and to retry, so
+    only bytes past the furthest position read so far are hashed.  hexdigest()
+    returns None if the upload skipped part of the reader.
+    """
+
+    def __init__(self, reader):
+        self.reader = reader
+        self._seekable = callable(getattr(reader, "seekable", None)) and reader.seekable()
+        self._start = reader.tell() if self._seekable else 0
+        self._pos = self._start
+        self._hashed = self._start
+        self._gap = False
+        self._digest = hashlib.sha256()
+
+    @property
+    def size(self) -> int:
+        return self._hashed - self._start
+
+    def hexdigest(self) -> Optional[str]:
+        return None if self._gap else self._digest.hexdigest()
+
+    def read(self, *amt) -> bytes:
+        data = self.reader.read(*amt)
+        end = self._pos + len(data)
+        if self._pos > self._hashed:
+            self._gap = True
+        elif end > self._hashed:
+            self._digest.update(memoryview(data)[self._hashed - self._pos :])
+            self._hashed = end
+        self._pos = end
+        return data
+
+    def seek(self, *args) -> int:
+        self._pos = self.reader.seek(*args)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seekable(self) -> bool:
+        return self._seekable
+
+    def close(self):
+        self.reader.close()
+
+
+def _matches_any(path_rel_posix: str, patterns: Iterable[str]) -> bool:
+    return any(fnmatch.fnmatch(path_rel_posix, pat) for pat in patterns)
+
+
+def _iter_local_files(
+    local_root: Path,
+    include: List[str],
+    exclude: List[str],
+    follow_symlinks: bool,
+) -> Iterator[Tuple[Path, str]]:
+    """
+    Walks local_root and yields (file path, relative posix path) for the regular
+    files selected by the include and exclude patterns.
+    """
+    for root, dirs, files in os.walk(local_root, followlinks=follow_symlinks):
+        root_path = Path(root)
+        rel_dir = (
+            ""
+            if root_path == local_root
+            else str(root_path.relative_to(local_root).as_posix())
+        )
+
+        # Allow exclude rules to prune whole dirs (speed optimization)
+        pruned_dirs = []
+        for d in list(dirs):
+            rel_dir_path = f"{rel_dir}/{d}" if rel_dir else d
+            if _matches_any(rel_dir_path + "/", exclude):
+                pruned_dirs.append(d)
+        for d in pruned_dirs:
+            dirs.remove(d)
+
+        for fname in files:
+            abs_file = root_path / fname
+            rel_path = f"{rel_dir}/{fname}" if rel_dir else fname
+            rel_posix = rel_path.replace("\\", "/")
+
+            # include first, then exclude
+            if not _matches_any(rel_posix, include):
+                continue
+            if _matches_any(rel_posix, exclude):
+                continue
+
+            # Resolve symlinks to actual file content (if present)
+            if abs_file.is_symlink():
+                try:
+                    abs_file = abs_file.resolve(strict=True)
+                except FileNotFoundError:
+                    # Broken symlink -> skip
                     continue
 
-                self.client.upload_file(
-                    Filename=str(abs_file),
-                    Bucket=self.bucket,
-                    Key=key,
-                    ExtraArgs=extra_args or None,
-                    Config=config,
-                )
-                uploaded_keys.append(key)
+            if not abs_file.is_file():
+                # Skip non-files (e.g., sockets, FIFOs)
+                continue
 
-        return uploaded_keys
+            yield abs_file, rel_posix
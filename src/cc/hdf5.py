@@ -0,0 +1,47 @@
+import numpy as np
+from cc import tracing
+from cc.filesapi import S3FileStore, RANGE_BLOCKSIZE, RANGE_CACHE_BLOCKS
+
+
+def read_dataset(
+    store: S3FileStore,
+    key: str,
+    datapath: str,
+    selection=None,
+    block_size: int = RANGE_BLOCKSIZE,
+    cache_blocks: int = RANGE_CACHE_BLOCKS,
+) -> np.ndarray:
+    """
+    Reads one dataset of a remote HDF5 file (or an HDF5 based container such as
+    netCDF4) without downloading the file.  The file is opened through an
+    S3RangeReader, so only the file metadata and the chunks covering the
+    selection are fetched.
+
+    datapath is the dataset path within the file, e.g. "/results/depth".
+    selection is any h5py index expression, e.g. np.s_[0:100, 5]; the whole
+    dataset is read when it is None.  Requires the h5py package.
+    """
+    h5py = _h5py()
+    with tracing.get_tracer().span(
+        "hdf5.read_dataset", bucket=store.bucket, key=key, datapath=datapath
+    ) as span:
+        with store.open_reader(key, block_size, cache_blocks) as reader:
+            with h5py.File(reader, "r") as f:
+                try:
+                    dataset = f[datapath]
+                except KeyError:
+                    raise KeyError(f"{datapath} is not a dataset in {key}") from None
+                data = dataset[()] if selection is None else dataset[selection]
+            span.set_attribute("requests", reader.requests)
+            span.set_attribute("bytes", reader.bytes_fetched)
+    return data
+
+
+def _h5py():
+    try:
+        import h5py
+    except ImportError:
+        raise ImportError(
+            "HDF5 datasets require the h5py package: pip install cc_py_sdk[hdf5]"
+        ) from None
+    return h5py
@@ -0,0 +1,184 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from typing import Dict, List
+
+CcInstrumentation = "CC_INSTRUMENTATION"
+CcInstrumentationFile = "CC_INSTRUMENTATION_FILE"
+CcInstrumentationUpload = "CC_INSTRUMENTATION_UPLOAD"
+INSTRUMENTATION_FILE_NAME = "instrumentation.json"
+
+
+@dataclass
+class IoStats:
+    """
+    Aggregate statistics for one I/O operation type against one store.
+
+    Attributes:
+    - calls : int
+        The number of calls
+    - bytes : int
+        Bytes read or written
+    - objects : int
+        Objects read or written (put_folder counts every uploaded file)
+    - latency : float
+        Total seconds spent in the calls.  For readers this is the time to open the object
+    - max_latency : float
+        The slowest single call in seconds
+    """
+
+    calls: int = 0
+    bytes: int = 0
+    objects: int = 0
+    latency: float = 0.0
+    max_latency: float = 0.0
+
+
+@dataclass
+class ActionStats:
+    name: str
+    index: int
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+
+
+class Instrumentation:
+    """
+    Collects per-action timing and per-store I/O statistics.  A single process-wide
+    instance is returned by get_instrumentation and is enabled by setting the
+    CC_INSTRUMENTATION environment variable to "true".  When disabled the record
+    methods are never called by the SDK, so the overhead is a single attribute check.
+
+    Methods:
+    - action(name, index): context manager recording wall and cpu time for an action
+    - record_io(store, op, nbytes, objects, latency): records a completed I/O call
+    - record_bytes(store, op, nbytes): adds bytes to an I/O operation, used by streaming readers
+    - counting_reader(reader, store, op): wraps a reader so the bytes read are recorded
+    - merge(stats): adds the stats exported by another process
+    - to_json_serializable()->dict: the collected stats
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.actions: List[ActionStats] = []
+            self.io: Dict[str, Dict[str, IoStats]] = {}
+
+    @contextmanager
+    def action(self, name: str, index: int):
+        stats = ActionStats(name, index)
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            yield stats
+        finally:
+            stats.wall_time = time.perf_counter() - wall
+            stats.cpu_time = time.thread_time() - cpu
+            with self._lock:
+                self.actions.append(stats)
+
+    def _io_stats(self, store: str, op: str) -> IoStats:
+        ops = self.io.setdefault(store, {})
+        stats = ops.get(op)
+        if stats is None:
+            stats = ops[op] = IoStats()
+        return stats
+
+    def record_io(
+        self, store: str, op: str, nbytes: int = 0, objects: int = 1, latency: float = 0.0
+    ):
+        with self._lock:
+            stats = self._io_stats(store, op)
+            stats.calls += 1
+            stats.bytes += nbytes
+            stats.objects += objects
+            stats.latency += latency
+            stats.max_latency = max(stats.max_latency, latency)
+
+    def record_bytes(self, store: str, op: str, nbytes: int):
+        with self._lock:
+            self._io_stats(store, op).bytes += nbytes
+
+    def counting_reader(self, reader: any, store: str, op: str) -> "CountingReader":
+        return CountingReader(reader, self, store, op)
+
+    def merge(self, stats: dict):
+        with self._lock:
+            for action in stats["actions"]:
+                self.actions.append(ActionStats(**action))
+            for store, ops in stats["io"].items():
+                for op, io in ops.items():
+                    current = self._io_stats(store, op)
+                    current.calls += io["calls"]
+                    current.bytes += io["bytes"]
+                    current.objects += io["objects"]
+                    current.latency += io["latency"]
+                    current.max_latency = max(current.max_latency, io["max_latency"])
+
+    def to_json_serializable(self) -> dict:
+        with self._lock:
+            return {
+                "actions": [asdict(a) for a in sorted(self.actions, key=lambda a: a.index)],
+                "io": {
+                    store: {op: asdict(stats) for op, stats in ops.items()}
+                    for store, ops in self.io.items()
+                },
+            }
+
+    def to_json(self, **context) -> str:
+        """
+        Returns the stats as a JSON document.  Keyword arguments (e.g. manifest_id,
+        payload_id) are added to the top level of the document.
+        """
+        return json.dumps(context | self.to_json_serializable(), indent=2)
+
+
+class CountingReader:
+    """
+    Wraps a reader and records the number of bytes read from it.  All other
+    attributes are passed through to the wrapped reader.
+    """
+
+    def __init__(self, reader: any, instrumentation: Instrumentation, store: str, op: str):
+        self._reader = reader
+        self._instrumentation = instrumentation
+        self._store = store
+        self._op = op
+
+    def read(self, *amt: int) -> bytes:
+        data = self._reader.read(*amt)
+        self._instrumentation.record_bytes(self._store, self._op, len(data))
+        return data
+
+    def readinto(self, b) -> int:
+        n = self._reader.readinto(b)
+        self._instrumentation.record_bytes(self._store, self._op, n)
+        return n
+
+    def __iter__(self):
+        return iter(lambda: self.read(1024 * 1024), b"")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __getattr__(self, name: str):
+        return getattr(self._reader, name)
+
+
+_instrumentation = Instrumentation(
+    os.environ.get(CcInstrumentation, "false").lower() == "true"
+)
+
+
+def get_instrumentation() -> Instrumentation:
+    return _instrumentation
@@ -1,8 +1,15 @@
+import atexit
+import contextvars
+import json
 import logging
+import logging.handlers
+import queue
 import sys
 import os
+from contextlib import contextmanager
 
 CcLoggingLevel = "CC_LOGGING_LEVEL"
+CcLogFormat = "CC_LOG_FORMAT"
 
 CcLoggingLevels = {
     "NOTSET": logging.NOTSET,
@@ -13,23 +20,176 @@ CcLoggingLevels = {
     "CRITICAL": logging.CRITICAL,
 }
 
+TEXT_FORMAT = "%(levelname)s | %(asctime)s | %(cc_fields)s%(message)s"
 
-def initLogger():
+# context fields shared by every thread (manifest_id, payload_id, event_number)
+_globalContext: dict = {}
+# context fields for the current thread or task (action)
+_localContext: contextvars.ContextVar[dict] = contextvars.ContextVar(
+    "cc_log_context", default={}
+)
+_listener: logging.handlers.QueueListener = None
+_listenerPid: int = None
+
+
+def initLogger(force: bool = False, **context):
+    """
+    Configures the root logger.  Records are put on a queue by the calling thread
+    and written to stdout by a background QueueListener so logging never blocks on
+    the stream.  CC_LOG_FORMAT=json writes one JSON object per line including the
+    context fields; any other value writes the plain text format with the context
+    fields before the message.  Keyword arguments (e.g. manifest_id, payload_id,
+    event_number) are added to every record.
+
+    Like logging.basicConfig, the handler is only added when the root logger has no
+    handlers, so a host application's logging configuration is left alone.
+    force=True removes the existing root handlers first.
+    """
+    global _listener, _listenerPid
+    set_log_context(**context)
     cc_log_level = os.environ.get(CcLoggingLevel, "INFO")
-    logging.basicConfig(
-        stream=sys.stdout,
-        format="%(levelname)s | %(asctime)s | %(message)s",
-        level=CcLoggingLevels[cc_log_level],
+    root = logging.getLogger()
+    if force:
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+            handler.close()
+        if _listener is not None:
+            atexit.unregister(_listener.stop)
+            _listener.stop()
+            _listener = None
+    elif _listener is None and root.handlers:
+        # configured by the host application
+        root.setLevel(CcLoggingLevels[cc_log_level])
+        return
+    if _listener is not None:
+        root.setLevel(CcLoggingLevels[cc_log_level])
+        if _listenerPid != os.getpid():
+            # forked process: the listener thread was not copied, start a new one
+            _listener = logging.handlers.QueueListener(
+                _listener.queue, *_listener.handlers, respect_handler_level=True
+            )
+            _listenerPid = os.getpid()
+            _listener.start()
+            atexit.register(_listener.stop)
+        return
+
+    stream_handler = logging.StreamHandler(stream=sys.stdout)
+    if os.environ.get(CcLogFormat, "text").lower() == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(TextFormatter())
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = ContextQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    _listener = logging.handlers.QueueListener(
+        log_queue, stream_handler, respect_handler_level=True
     )
-    # file_handler = logging.FileHandler(filename="tmp.log")
-    # stdout_handler = logging.StreamHandler(stream=sys.stdout)
-    # handlers = [file_handler, stdout_handler]
+    _listenerPid = os.getpid()
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    root.addHandler(queue_handler)
+    root.setLevel(CcLoggingLevels[cc_log_level])
+
+
+def set_log_context(**fields):
+    """
+    Sets context fields added to records from every thread.  None values remove a field.
+    """
+    for key, val in fields.items():
+        if val is None:
+            _globalContext.pop(key, None)
+        else:
+            _globalContext[key] = val
+
+
+@contextmanager
+def log_context(**fields):
+    """
+    Adds context fields to records logged by the current thread inside the block.
+    """
+    token = _localContext.set(_localContext.get() | fields)
+    try:
+        yield
+    finally:
+        _localContext.reset(token)
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler for an in-process queue.  The message is rendered in the calling
+    thread but formatting, including exceptions, is left to the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class ContextFilter(logging.Filter):
+    """
+    Copies the log context fields onto each record in the logging thread, before
+    the record is handed to the queue.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.cc_context = _globalContext | _localContext.get()
+        return True
+
+
+class TextFormatter(logging.Formatter):
+    """
+    TEXT_FORMAT formatter that writes the log context fields before the message.
+    """
+
+    def __init__(self):
+        super().__init__(TEXT_FORMAT)
+
+    def format(self, record: logging.LogRecord) -> str:
+        context = getattr(record, "cc_context", {})
+        record.cc_fields = (
+            " ".join(f"{k}={v}" for k, v in context.items()) + " | " if context else ""
+        )
+        return super().format(record)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        doc = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        doc.update(getattr(record, "cc_context", {}))
+        if record.exc_info:
+            doc["exception"] = self.formatException(record.exc_info)
+        return json.dumps(doc, default=str)
+
+
+class Lazy:
+    """
+    Defers building a log message argument until the record is formatted, e.g.
+    logging.debug("summary: %s", Lazy(summarize, result)).  summarize is only
+    called when debug logging is enabled.
+    """
+
+    __slots__ = ("fn", "args")
+
+    def __init__(self, fn, *args):
+        self.fn = fn
+        self.args = args
 
-    # rec_factory = logging.getLogRecordFactory()
+    def __str__(self) -> str:
+        return str(self.fn(*self.args))
 
-    # def record_factory(*args, **kwargs):
-    #     record = rec_factory(*args, **kwargs)
-    #     record.custom_attribute = "manifest"
-    #     return record
 
-    # logging.setLogRecordFactory(record_factory)
+def log_lazy(level: int, fn, *args, logger: logging.Logger = None):
+    """
+    Logs the message returned by fn(*args) only when the level is enabled.
+    """
+    logger = logger or logging.getLogger()
+    if logger.isEnabledFor(level):
+        logger.log(level, fn(*args))
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+from collections import namedtuple
+from typing import Dict, Optional
+
+CcPayloadCacheDir = "CC_PAYLOAD_CACHE_DIR"
+
+PAYLOAD_CONTENT_FILE = "payload"
+
+# names of the environment variables referenced by {ENV::name} templates
+ENV_REFERENCE = re.compile(r"\{ENV::([A-Za-z_]\w*)")
+
+CachedPayload = namedtuple("CachedPayload", ["content", "payload"])
+
+
+class PayloadCache:
+    """
+    Local cache of downloaded payloads and their substituted form, shared by every
+    PluginManager on a host that uses the same cache directory.
+
+    Entries are stored under {cache_dir}/{payload_id}/{sha256(etag)}/.  The raw
+    payload is kept as "payload" and each substituted payload is kept as
+    {sha256(env)}.json, where env is the value of every environment variable the
+    raw payload references with {ENV::name}.  Runs of the same payload with a
+    different event number therefore get their own snapshot but share the
+    download.  Files are written to a temporary file and renamed so concurrent
+    processes never read a partial entry.
+
+    Methods:
+    - load(payload_id, etag)->CachedPayload: returns the cached raw content and
+        substituted payload dict.  Either may be None if it is not cached
+    - save(payload_id, etag, content, payload): stores the raw content and the
+        substituted payload dict
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+
+    def load(self, payload_id: str, etag: str) -> CachedPayload:
+        entry = self._entry_dir(payload_id, etag)
+        try:
+            with open(os.path.join(entry, PAYLOAD_CONTENT_FILE), "rb") as f:
+                content = f.read()
+        except FileNotFoundError:
+            return CachedPayload(None, None)
+        try:
+            with open(os.path.join(entry, _snapshot_name(content)), "r") as f:
+                doc = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return CachedPayload(content, None)
+        if doc.get("sha256") != _sha256(content):
+            return CachedPayload(None, None)
+        return CachedPayload(content, doc["payload"])
+
+    def save(self, payload_id: str, etag: str, content: bytes, payload: dict):
+        entry = self._entry_dir(payload_id, etag)
+        os.makedirs(entry, exist_ok=True)
+        _write_atomic(os.path.join(entry, PAYLOAD_CONTENT_FILE), content)
+        doc = {
+            "payload_id": payload_id,
+            "etag": etag,
+            "sha256": _sha256(content),
+            "env": _referenced_env(content),
+            "payload": payload,
+        }
+        _write_atomic(
+            os.path.join(entry, _snapshot_name(content)), json.dumps(doc).encode()
+        )
+
+    def _entry_dir(self, payload_id: str, etag: str) -> str:
+        return os.path.join(self.cache_dir, payload_id, _sha256(etag.encode()))
+
+
+def get_payload_cache() -> Optional[PayloadCache]:
+    """
+    Returns a PayloadCache for the CC_PAYLOAD_CACHE_DIR directory, or None when
+    payload caching is not enabled.
+    """
+    cache_dir = os.environ.get(CcPayloadCacheDir)
+    if not cache_dir:
+        return None
+    return PayloadCache(cache_dir)
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _referenced_env(content: bytes) -> Dict[str, Optional[str]]:
+    names = sorted(set(ENV_REFERENCE.findall(content.decode("utf-8"))))
+    return {name: os.environ.get(name) for name in names}
+
+
+def _snapshot_name(content: bytes) -> str:
+    env = json.dumps(_referenced_env(content), sort_keys=True)
+    return f"{_sha256(env.encode())}.json"
+
+
+def _write_atomic(path: str, data: bytes):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
@@ -1,9 +1,12 @@
 import os
 import re
 import shutil
+import functools
+import time
+import io
 import logging
 from collections import namedtuple
-from typing import Any, Dict, Optional, List
+from typing import Any, Dict, Iterable, Iterator, Optional, List
 from enum import Enum
 from dataclasses import dataclass, field
 from dataclasses_json import dataclass_json
@@ -13,14 +16,30 @@ from cc.filesapi import *
 from cc import filesapi
 from cc import logger
 from cc import action_runner
+from cc import arrays
+from cc import instrumentation
+from cc import tracing
+from cc import payload_cache
+from cc import prefetch
+from cc import transfer_governor
+from cc.action_scheduler import (
+    ActionScheduler,
+    ActionResult,
+    ActionStatus,
+    ActionExecutionError,
+    ExecutorType,
+)
 from cc.template_substitution import template_substitute
 
 CcPayloadId = "CC_PAYLOAD_ID"
 CcManifestId = "CC_MANIFEST_ID"
 CcEventNumber = "CC_EVENT_NUMBER"
 CcEventIdentifier = "CC_EVENT_IDENTIFIER"
+CcEventNumbers = "CC_EVENT_NUMBERS"
 CcProfile = "CC"
 CcRootPath = "CC_ROOT"
+CcActionWorkers = "CC_ACTION_WORKERS"
+CcActionExecutor = "CC_ACTION_EXECUTOR"
 DEFAULT_CC_ROOT = "/cc_store"
 PAYLOAD_FILE_NAME = "payload"
 substitutionPattern = "{([^{}]*)}"
@@ -102,6 +121,9 @@ class Action:
         The list of input DataSources private to the action. readonly
     - outputs : List[DataSource]
         the list of output DataSources private to the action. readonly
+    - depends_on : List[str]
+        The names of actions that must succeed before this action runs. Actions
+        sharing an input or output path are also run in payload order. readonly
     """
 
     name: str = ""
@@ -111,6 +133,7 @@ class Action:
     stores: Optional[List["DataStore"]] = field(default_factory=list)
     inputs: Optional[List["DataSource"]] = field(default_factory=list)
     outputs: Optional[List["DataSource"]] = field(default_factory=list)
+    depends_on: Optional[List[str]] = field(default_factory=list)
 
     def to_json_serializable(self):
         return {
@@ -118,6 +141,7 @@ class Action:
             "type": self.type,
             "description": self.description,
             "attributes": self.attributes,
+            "depends_on": self.depends_on if self.depends_on is not None else [],
             "stores": (
                 [d.to_json_serializable() for d in self.stores]
                 if self.stores is not None
@@ -171,17 +195,71 @@ class Action:
     ):
         return self._iomgr.put(reader, data_source_name, pathkey, datapathkey)
 
+    def open_writer(self, data_source_name: str, pathkey: str, datapathkey: str = None):
+        return self._iomgr.open_writer(data_source_name, pathkey, datapathkey)
+
     def copy(self, ds1: DataSourceOpInput, ds2: DataSourceOpInput):
         return self._iomgr.copy(ds1, ds2)
 
     def copy_file_to_local(self, ds: DataSourceOpInput, localpath: str):
         return self._iomgr.copy_file_to_local(ds, localpath)
 
-    def copy_file_to_remote(self, ds: DataSourceOpInput, localpath: str):
-        return self._iomgr.copy_file_to_remote(ds, localpath)
+    def copy_file_to_remote(
+        self, ds: DataSourceOpInput, localpath: str, skip_unchanged: bool = False
+    ):
+        return self._iomgr.copy_file_to_remote(ds, localpath, skip_unchanged)
+
+    def copy_folder_to_remote(
+        self, ds: DataSourceOpInput, localpath: str, skip_unchanged: bool = False
+    ):
+        return self._iomgr.copy_folder_to_remote(ds, localpath, skip_unchanged)
+
+    def copy_folder_to_remote_archive(
+        self,
+        ds: DataSourceOpInput,
+        localpath: str,
+        compression: str = None,
+        index: bool = False,
+    ) -> dict:
+        return self._iomgr.copy_folder_to_remote_archive(
+            ds, localpath, compression, index
+        )
 
-    def copy_folder_to_remote(self, ds: DataSourceOpInput, localpath: str):
-        return self._iomgr.copy_folder_to_remote(ds, localpath)
+    def copy_archive_to_local(
+        self, ds: DataSourceOpInput, localpath: str, compression: str = None
+    ) -> List[str]:
+        return self._iomgr.copy_archive_to_local(ds, localpath, compression)
+
+    def get_archive_member(self, ds: DataSourceOpInput, member: str) -> bytes:
+        return self._iomgr.get_archive_member(ds, member)
+
+    def get_dataset(self, ds: DataSourceOpInput, selection=None):
+        return self._iomgr.get_dataset(ds, selection)
+
+    def get_array(
+        self,
+        data_source_name: str,
+        pathkey: str,
+        dtype=None,
+        shape=None,
+        out=None,
+        npy: bool = None,
+    ):
+        return self._iomgr.get_array(data_source_name, pathkey, dtype, shape, out, npy)
+
+    def put_array(self, arr, data_source_name: str, pathkey: str, npy: bool = None):
+        return self._iomgr.put_array(arr, data_source_name, pathkey, npy)
+
+    def sync_folder_to_remote(
+        self,
+        ds: DataSourceOpInput,
+        localpath: str,
+        compare: SyncCompare | str = SyncCompare.CHECKSUM,
+        delete_orphans: bool = False,
+    ) -> SyncResult:
+        return self._iomgr.sync_folder_to_remote(
+            ds, localpath, compare, delete_orphans
+        )
 
 
 @dataclass_json
@@ -204,15 +282,30 @@ class Payload:
     def get_store(self, name: str) -> DataStore:
         return self._iomgr.get_store(name)
 
+    def to_json_serializable(self):
+        return {
+            "attributes": self.attributes,
+            "stores": [d.to_json_serializable() for d in self.stores],
+            "inputs": [d.to_json_serializable() for d in self.inputs],
+            "outputs": [d.to_json_serializable() for d in self.outputs],
+            "actions": [d.to_json_serializable() for d in self.actions],
+        }
+
 
 class PluginManager:
     def __init__(self):
         self.manifestId = os.environ[CcManifestId]
         self.payloadId = os.environ[CcPayloadId]
+        self.eventNumber = os.environ.get(CcEventNumber)
 
         # initialize logging configuration
-        logger.initLogger()
+        logger.initLogger(
+            manifest_id=self.manifestId,
+            payload_id=self.payloadId,
+            event_number=self.eventNumber,
+        )
         logging.info(f"Running: Manifest {self.manifestId}, Payload {self.payloadId}")
+        self._set_trace_resource()
 
         self.ccroot = os.environ[CcRootPath]
         if self.ccroot == "":
@@ -224,11 +317,174 @@ class PluginManager:
         )
 
         # grab the payload
-
         path = f"{self.ccroot}/{self.payloadId}/{PAYLOAD_FILE_NAME}"
-        reader = self.store.get_object(path)
-        content = reader.read()
-        self.payload = Payload.from_json(content)
+        cache = payload_cache.get_payload_cache()
+        content = None
+        if cache is not None:
+            # the cache is only trusted while the remote payload ETag is unchanged
+            etag = self.store.get_object_info(path).etag()
+            content, payload = cache.load(self.payloadId, etag)
+            self._payload_content = content
+            if payload is not None:
+                logging.debug(f"Using cached payload {self.payloadId} ({etag})")
+                self._set_payload(Payload.from_dict(payload))
+                self._connect_stores()
+                self._start_prefetch()
+                return
+
+        with tracing.get_tracer().span("payload.fetch", path=path):
+            if content is None:
+                reader = self.store.get_object(path)
+                content = reader.read()
+            self._payload_content = content
+            self._set_payload(Payload.from_json(content))
+
+        self._substitute_templates()
+
+        if cache is not None:
+            cache.save(
+                self.payloadId, etag, content, self.payload.to_json_serializable()
+            )
+        self._connect_stores()
+        self._start_prefetch()
+
+    @classmethod
+    def from_snapshot(cls, snapshot: dict) -> "PluginManager":
+        """
+        Creates a PluginManager from a snapshot() of another PluginManager.  The
+        payload is not downloaded and templates are not substituted again, only the
+        store connections are re-created.
+        """
+        pm = cls.__new__(cls)
+        pm.manifestId = snapshot["manifest_id"]
+        pm.payloadId = snapshot["payload_id"]
+        pm.ccroot = snapshot["ccroot"]
+        pm.eventNumber = os.environ.get(CcEventNumber)
+        pm._payload_content = None
+
+        logger.initLogger(
+            manifest_id=pm.manifestId,
+            payload_id=pm.payloadId,
+            event_number=pm.eventNumber,
+        )
+        pm._set_trace_resource()
+        pm.store = filesapi.NewS3FileStore(
+            CcProfile, bucket=os.environ[f"{CcProfile}_{AwsS3Bucket}"]
+        )
+        pm._set_payload(Payload.from_dict(snapshot["payload"]))
+        pm._connect_stores()
+        return pm
+
+    def for_event(self, event_number: int | str) -> "PluginManager":
+        """
+        Returns a PluginManager for another event of the same payload, setting
+        CC_EVENT_NUMBER to event_number.  The payload is not downloaded again and
+        templates are only substituted again when the payload references
+        {ENV::CC_EVENT_NUMBER}.  Stores whose substituted definition is unchanged
+        share this PluginManager's connections, and inputs are prefetched with the
+        same Prefetcher.
+        """
+        os.environ[CcEventNumber] = str(event_number)
+        pm = self.__class__.__new__(self.__class__)
+        pm.manifestId = self.manifestId
+        pm.payloadId = self.payloadId
+        pm.ccroot = self.ccroot
+        pm.store = self.store
+        pm.eventNumber = str(event_number)
+        pm._payload_content = self._payload_content
+        pm._set_event_context()
+
+        if pm._payload_content is None:
+            path = f"{pm.ccroot}/{pm.payloadId}/{PAYLOAD_FILE_NAME}"
+            with tracing.get_tracer().span("payload.fetch", path=path):
+                pm._payload_content = pm.store.get_object(path).read()
+        referenced = payload_cache.ENV_REFERENCE.findall(
+            pm._payload_content.decode("utf-8")
+        )
+        if CcEventNumber in referenced:
+            pm._set_payload(Payload.from_json(pm._payload_content))
+            pm._substitute_templates()
+        else:
+            pm._set_payload(Payload.from_dict(self.payload.to_json_serializable()))
+        pm._connect_stores(reuse=self.payload.stores)
+        pm._start_prefetch(self._iomgr._prefetcher)
+        return pm
+
+    @classmethod
+    def iter_events(
+        cls, events: Iterable[int | str] = None, prefetch_next: bool = False
+    ) -> Iterator["PluginManager"]:
+        """
+        Batch mode: yields a PluginManager for each event number so one process can
+        run many events, e.g.
+
+            for pm in PluginManager.iter_events(range(1, 101)):
+                pm.run_actions()
+
+        events defaults to the CC_EVENT_NUMBERS environment variable, a list of
+        numbers and inclusive ranges such as "1-100,250".  The payload is
+        downloaded and the stores connected once, later events are created with
+        for_event.  With prefetch_next the inputs of the next event are downloaded
+        in the background while the current event runs, and staged inputs the next
+        event does not use are removed once the current event is done.
+        CC_EVENT_NUMBER is restored when the iteration ends or is closed early.
+        """
+        if events is None:
+            events = parse_event_numbers(os.environ[CcEventNumbers])
+        events = iter(events)
+        first = next(events, None)
+        if first is None:
+            return
+        original = os.environ.get(CcEventNumber)
+        os.environ[CcEventNumber] = str(first)
+        try:
+            pm = cls()
+            prefetcher = pm._iomgr._prefetcher
+            owns_prefetcher = prefetch_next and prefetcher is None
+            if owns_prefetcher:
+                prefetcher = prefetch.Prefetcher()
+                pm._start_prefetch(prefetcher)
+            try:
+                for event in events:
+                    upcoming = None
+                    if prefetch_next:
+                        upcoming = pm.for_event(event)
+                        pm._set_event_context()
+                    yield pm
+                    if upcoming is None:
+                        upcoming = pm.for_event(event)
+                    else:
+                        upcoming._set_event_context()
+                    if prefetcher is not None:
+                        for key in pm._prefetch_keys - upcoming._prefetch_keys:
+                            prefetcher.discard(*key)
+                    pm = upcoming
+                yield pm
+            finally:
+                if owns_prefetcher:
+                    prefetcher.close()
+                else:
+                    pm.discard_prefetched()
+        finally:
+            if original is None:
+                os.environ.pop(CcEventNumber, None)
+            else:
+                os.environ[CcEventNumber] = original
+
+    def snapshot(self) -> dict:
+        """
+        Returns a picklable and json serializable copy of the substituted payload
+        and run identifiers that can be passed to PluginManager.from_snapshot.
+        """
+        return {
+            "manifest_id": self.manifestId,
+            "payload_id": self.payloadId,
+            "ccroot": self.ccroot,
+            "payload": self.payload.to_json_serializable(),
+        }
+
+    def _set_payload(self, payload: Payload):
+        self.payload = payload
 
         # set the payload IO Manager
         self._iomgr = Iomgr(
@@ -238,29 +494,173 @@ class PluginManager:
             self.payload.outputs,
         )
 
-        self._substituteAttributeTemplates()
-        self._substituteStoreTemplates()
-        self._substituteInputTemplates()
-        self._substituteOutputTemplates()
-        self._substituteActionTemplates()
+    def _set_trace_resource(self):
+        tracing.get_tracer().set_resource(
+            manifest_id=self.manifestId,
+            payload_id=self.payloadId,
+            event_number=os.environ.get(CcEventNumber),
+        )
 
-        # enumerate stores and connect to ones that implement IConnectionDataStore
+    def _set_event_context(self):
+        os.environ[CcEventNumber] = self.eventNumber
+        logger.initLogger(
+            manifest_id=self.manifestId,
+            payload_id=self.payloadId,
+            event_number=self.eventNumber,
+        )
+        self._set_trace_resource()
+
+    def _substitute_templates(self):
+        with tracing.get_tracer().span("payload.substitute"):
+            self._substituteAttributeTemplates()
+            self._substituteStoreTemplates()
+            self._substituteInputTemplates()
+            self._substituteOutputTemplates()
+            self._substituteActionTemplates()
+
+    def _connect_stores(self, reuse: List[DataStore] = None):
+        # enumerate stores and connect to ones that implement IConnectionDataStore.
+        # stores in reuse with the same definition share their connection
+        connected = {s.name: s for s in reuse or [] if getattr(s, "_session", None)}
         for store in self.payload.stores:
+            prior = connected.get(store.name)
+            if prior is not None and prior.to_json_serializable() == store.to_json_serializable():
+                store._session = prior._session
+                continue
             classType = storeTypeToClassMap.get(store.store_type, None)
             if classType != None:
                 instance = getNewClassInstance(classType)
                 if isinstance(instance, IConnectionDataStore):
-                    instance.connect(store)
+                    with tracing.get_tracer().span(
+                        "store.connect", store=store.name, store_type=store.store_type
+                    ):
+                        instance.connect(store)
                     store._session = instance
 
-    def run_actions(self):
-        for action in self.payload.actions:
-            runner_class = action_runner.get_action_runner(action.name)
-            if hasattr(runner_class, "run") and callable(getattr(runner_class, "run")):
-                runner = runner_class()
-                runner.pm = self
-                runner.action = action
-                runner.run()
+    def _start_prefetch(self, prefetcher: prefetch.Prefetcher = None):
+        # download payload and action inputs in the background while the plugin
+        # starts up; readers block only on the input they need
+        self._prefetch_keys = set()
+        if prefetcher is None:
+            prefetcher = prefetch.get_prefetcher()
+            if prefetcher is None:
+                return
+        iomgrs = [self._iomgr] + [action._iomgr for action in self.payload.actions]
+        for iomgr in iomgrs:
+            iomgr._prefetcher = prefetcher
+            for input in iomgr.inputs:
+                store = iomgr.get_store(input.store_name) or self._iomgr.get_store(
+                    input.store_name
+                )
+                if store is None or getattr(store, "_session", None) is None:
+                    continue
+                for path in (input.paths or {}).values():
+                    prefetcher.start(store, store.full_path(path))
+                    self._prefetch_keys.add((store.name, store.full_path(path)))
+
+    def discard_prefetched(self):
+        """
+        Removes the inputs this PluginManager staged in the Prefetcher.  Call it once
+        the event is done so a long lived process does not keep them, and so a later
+        PluginManager downloads the current version of the same objects.
+        """
+        prefetcher = self._iomgr._prefetcher
+        if prefetcher is None:
+            return
+        for key in self._prefetch_keys:
+            prefetcher.discard(*key)
+        self._prefetch_keys = set()
+
+    def run_actions(
+        self,
+        max_workers: int = None,
+        fail_fast: bool = True,
+        executor_type: ExecutorType = None,
+    ) -> List[ActionResult]:
+        """
+        Runs the payload actions and returns an ActionResult for each.  Actions run
+        one at a time in payload order unless max_workers (or the CC_ACTION_WORKERS
+        environment variable) is greater than one, in which case independent actions
+        run in parallel.  See action_scheduler.action_dependencies for how
+        dependencies are determined.  Raises ActionExecutionError if an action fails.
+
+        executor_type (or the CC_ACTION_EXECUTOR environment variable) selects
+        "thread" or "process" workers.  Process workers receive a snapshot of this
+        PluginManager and re-create it with PluginManager.from_snapshot, so runners
+        see the same payload without downloading it again.  Runner return values
+        must be picklable in process mode.
+        """
+        if max_workers is None:
+            max_workers = int(os.environ.get(CcActionWorkers, "1"))
+        if executor_type is None:
+            executor_type = os.environ.get(CcActionExecutor, ExecutorType.THREAD.value)
+        scheduler = ActionScheduler(
+            max_workers=max_workers, fail_fast=fail_fast, executor_type=executor_type
+        )
+        processes = scheduler.executor_type == ExecutorType.PROCESS
+        if processes:
+            run_action = functools.partial(_run_snapshot_action, self.snapshot())
+        else:
+            run_action = self._run_action
+
+        results = []
+        try:
+            results = scheduler.run(self.payload.actions, run_action)
+        except ActionExecutionError as e:
+            results = e.results
+            raise
+        finally:
+            if processes:
+                # process workers return their instrumentation with the runner value
+                instr = instrumentation.get_instrumentation()
+                for result in results:
+                    if result.status == ActionStatus.SUCCEEDED:
+                        result.value, stats = result.value
+                        if stats is not None:
+                            instr.merge(stats)
+            self.export_instrumentation()
+        return results
+
+    def _run_action(self, index: int) -> any:
+        action = self.payload.actions[index]
+        runner_class = action_runner.get_action_runner(action.name)
+        if hasattr(runner_class, "run") and callable(getattr(runner_class, "run")):
+            runner = runner_class()
+            runner.pm = self
+            runner.action = action
+            instr = instrumentation.get_instrumentation()
+            with tracing.get_tracer().span(
+                "action.run", action=action.name, index=index
+            ), logger.log_context(action=action.name):
+                if not instr.enabled:
+                    return runner.run()
+                with instr.action(action.name, index):
+                    return runner.run()
+
+    def export_instrumentation(self):
+        """
+        Writes the collected instrumentation as JSON when instrumentation is enabled.
+        The document includes the S3 transfer governor counters (throttles, retries
+        and concurrency).  It is written to the CC_INSTRUMENTATION_FILE path if set, and
+        uploaded next to the payload as {ccroot}/{payloadId}/instrumentation.json
+        when CC_INSTRUMENTATION_UPLOAD is "true".
+        """
+        instr = instrumentation.get_instrumentation()
+        if not instr.enabled:
+            return
+        doc = instr.to_json(
+            manifest_id=self.manifestId,
+            payload_id=self.payloadId,
+            event_number=os.environ.get(CcEventNumber),
+            s3_governor=transfer_governor.get_governor().stats(),
+        )
+        localpath = os.environ.get(instrumentation.CcInstrumentationFile)
+        if localpath:
+            with open(localpath, "w") as f:
+                f.write(doc)
+        if os.environ.get(instrumentation.CcInstrumentationUpload, "").lower() == "true":
+            path = f"{self.ccroot}/{self.payloadId}/{instrumentation.INSTRUMENTATION_FILE_NAME}"
+            self.store.put_object(path, io.BytesIO(doc.encode()))
 
     def get_payload(self) -> Payload:
         return self.payload
@@ -304,17 +704,71 @@ class PluginManager:
     ):
         return self._iomgr.put(reader, data_source_name, pathkey, datapathkey)
 
+    def open_writer(self, data_source_name: str, pathkey: str, datapathkey: str = None):
+        return self._iomgr.open_writer(data_source_name, pathkey, datapathkey)
+
     def copy(self, ds1: DataSourceOpInput, ds2: DataSourceOpInput):
         return self._iomgr.copy(ds1, ds2)
 
     def copy_file_to_local(self, ds: DataSourceOpInput, localpath: str):
         return self._iomgr.copy_file_to_local(ds, localpath)
 
-    def copy_file_to_remote(self, ds: DataSourceOpInput, localpath: str):
-        return self._iomgr.copy_file_to_remote(ds, localpath)
+    def copy_file_to_remote(
+        self, ds: DataSourceOpInput, localpath: str, skip_unchanged: bool = False
+    ):
+        return self._iomgr.copy_file_to_remote(ds, localpath, skip_unchanged)
+
+    def copy_folder_to_remote(
+        self, ds: DataSourceOpInput, localpath: str, skip_unchanged: bool = False
+    ):
+        return self._iomgr.copy_folder_to_remote(ds, localpath, skip_unchanged)
+
+    def copy_folder_to_remote_archive(
+        self,
+        ds: DataSourceOpInput,
+        localpath: str,
+        compression: str = None,
+        index: bool = False,
+    ) -> dict:
+        return self._iomgr.copy_folder_to_remote_archive(
+            ds, localpath, compression, index
+        )
+
+    def copy_archive_to_local(
+        self, ds: DataSourceOpInput, localpath: str, compression: str = None
+    ) -> List[str]:
+        return self._iomgr.copy_archive_to_local(ds, localpath, compression)
+
+    def get_archive_member(self, ds: DataSourceOpInput, member: str) -> bytes:
+        return self._iomgr.get_archive_member(ds, member)
 
-    def copy_folder_to_remote(self, ds: DataSourceOpInput, localpath: str):
-        return self._iomgr.copy_folder_to_remote(ds, localpath)
+    def get_dataset(self, ds: DataSourceOpInput, selection=None):
+        return self._iomgr.get_dataset(ds, selection)
+
+    def get_array(
+        self,
+        data_source_name: str,
+        pathkey: str,
+        dtype=None,
+        shape=None,
+        out=None,
+        npy: bool = None,
+    ):
+        return self._iomgr.get_array(data_source_name, pathkey, dtype, shape, out, npy)
+
+    def put_array(self, arr, data_source_name: str, pathkey: str, npy: bool = None):
+        return self._iomgr.put_array(arr, data_source_name, pathkey, npy)
+
+    def sync_folder_to_remote(
+        self,
+        ds: DataSourceOpInput,
+        localpath: str,
+        compare: SyncCompare | str = SyncCompare.CHECKSUM,
+        delete_orphans: bool = False,
+    ) -> SyncResult:
+        return self._iomgr.sync_folder_to_remote(
+            ds, localpath, compare, delete_orphans
+        )
 
     def _substituteAttributeTemplates(self):
         _handle_template_substitution(self._iomgr.attributes, self._iomgr.attributes)
@@ -368,6 +822,21 @@ class PluginManager:
                 _handle_template_substitution(output.data_paths, combined_attrs)
 
 
+_snapshotPluginManager: tuple[dict, PluginManager] = None
+
+
+def _run_snapshot_action(snapshot: dict, index: int) -> any:
+    # runs in a process pool worker.  the PluginManager is re-created once per
+    # worker process and reused for the remaining actions of the same payload
+    global _snapshotPluginManager
+    if _snapshotPluginManager is None or _snapshotPluginManager[0] != snapshot:
+        _snapshotPluginManager = (snapshot, PluginManager.from_snapshot(snapshot))
+    instr = instrumentation.get_instrumentation()
+    instr.reset()
+    value = _snapshotPluginManager[1]._run_action(index)
+    return value, instr.to_json_serializable() if instr.enabled else None
+
+
 class Iomgr:
     def __init__(self, attrs, stores, inputs, outputs):
         if attrs == None:
@@ -390,11 +859,19 @@ class Iomgr:
         else:
             self.outputs = outputs
 
+        # set by the PluginManager when CC_PREFETCH is enabled
+        self._prefetcher = None
+
     def get_store(self, name: str) -> DataStore:
         for ds in self.stores:
             if ds.name == name:
                 return ds
 
+    def _prefetched(self, store_name: str, path: str) -> Optional[str]:
+        if self._prefetcher is None:
+            return None
+        return self._prefetcher.wait(store_name, path)
+
     def get_data_source(self, name: str, iotype: DsIoType) -> DataSource:
         sources = []
 
@@ -421,8 +898,20 @@ class Iomgr:
         data_store = self.get_store(data_source.store_name)
         # path=data_store.params["root"]+"/"+data_source.paths[pathkey]
         path = data_store.full_path(data_source.paths[pathkey])
-        streamingBody = data_store._session.get(path, None)
-        return streamingBody
+        instr = instrumentation.get_instrumentation()
+        start = time.perf_counter()
+        with tracing.get_tracer().span("io.get_reader", store=data_store.name, path=path):
+            localpath = self._prefetched(data_store.name, path)
+            if localpath is not None:
+                streamingBody = open(localpath, "rb")
+            else:
+                streamingBody = data_store._session.get(path, None)
+        if not instr.enabled:
+            return streamingBody
+        instr.record_io(
+            data_store.name, "get_reader", latency=time.perf_counter() - start
+        )
+        return instr.counting_reader(streamingBody, data_store.name, "get_reader")
 
     def put(
         self, reader: IStreamingBody, data_source_name: str, pathkey: str, datakey: str
@@ -431,7 +920,71 @@ class Iomgr:
         data_store = self.get_store(data_source.store_name)
         # path=data_store.params["root"]+"/"+data_source.paths[pathkey]
         path = data_store.full_path(data_source.paths[pathkey])
-        data_store._session.put(reader, path, datakey)
+        instr = instrumentation.get_instrumentation()
+        if instr.enabled:
+            reader = instr.counting_reader(reader, data_store.name, "put")
+        start = time.perf_counter()
+        with tracing.get_tracer().span("io.put", store=data_store.name, path=path):
+            data_store._session.put(reader, path, datakey)
+        if instr.enabled:
+            instr.record_io(data_store.name, "put", latency=time.perf_counter() - start)
+
+    def get_array(
+        self,
+        data_source_name: str,
+        pathkey: str,
+        dtype=None,
+        shape=None,
+        out=None,
+        npy: bool = None,
+    ):
+        """
+        Reads a numpy array from an input data source path into out, or into a new
+        array, without an intermediate bytes copy, e.g.
+
+            depth = pm.get_array("depth", "default", np.float32, (1000, 1000))
+
+        Paths ending in .npy (or npy=True) are read as .npy files and take their
+        dtype and shape from the header, otherwise the object holds the raw array
+        bytes in C order.  See arrays.read_array.
+        """
+        path = self.get_input_data_source(data_source_name).paths[pathkey]
+        if npy is None:
+            npy = path.endswith(arrays.NPY_SUFFIX)
+        reader = self.get_reader(data_source_name, pathkey, None)
+        try:
+            return arrays.read_array(reader, dtype, shape, out, npy)
+        finally:
+            reader.close()
+
+    def put_array(self, arr, data_source_name: str, pathkey: str, npy: bool = None):
+        """
+        Uploads a numpy array to an output data source path straight from the array
+        memory.  Paths ending in .npy (or npy=True) are written as .npy files,
+        otherwise the raw array bytes are written in C order.
+        """
+        path = self.get_output_data_source(data_source_name).paths[pathkey]
+        if npy is None:
+            npy = path.endswith(arrays.NPY_SUFFIX)
+        self.put(arrays.array_reader(arr, npy), data_source_name, pathkey, None)
+
+    def open_writer(self, data_source_name: str, pathkey: str, datakey: str = None):
+        """
+        Returns a writable, context managed file object for an output data source
+        path.  Data is streamed to the store as it is written, e.g.
+
+            with pm.open_writer("results", "default") as w:
+                for chunk in generate():
+                    w.write(chunk)
+
+        The object is only created when the block exits normally.  An exception in
+        the block aborts the upload.
+        """
+        data_source = self.get_output_data_source(data_source_name)
+        data_store = self.get_store(data_source.store_name)
+        path = data_store.full_path(data_source.paths[pathkey])
+        with tracing.get_tracer().span("io.open_writer", store=data_store.name, path=path):
+            return data_store._session.open_writer(path, datakey)
 
     def copy(self, src: DataSourceOpInput, dest: DataSourceOpInput):
         src_ds = self.get_input_data_source(src.name)
@@ -441,29 +994,278 @@ class Iomgr:
         ##check that src is a storereader and dest is a storewriter!
         srcpath = srcstore.full_path(src_ds.paths[src.pathkey])
         destpath = deststore.full_path(dest_ds.paths[dest.pathkey])
-        reader = srcstore._session.get(srcpath, None)
-        deststore._session.put(reader, destpath, None)
+        instr = instrumentation.get_instrumentation()
+        start = time.perf_counter()
+        with tracing.get_tracer().span(
+            "io.copy", store=deststore.name, src_path=srcpath, path=destpath
+        ):
+            reader = srcstore._session.get(srcpath, None)
+            if instr.enabled:
+                reader = instr.counting_reader(reader, deststore.name, "copy")
+            deststore._session.put(reader, destpath, None)
+        if instr.enabled:
+            instr.record_io(deststore.name, "copy", latency=time.perf_counter() - start)
 
     def copy_file_to_local(self, src: DataSourceOpInput, localpath: str):
         src_ds = self.get_input_data_source(src.name)
         srcstore = self.get_store(src_ds.store_name)
         srcpath = srcstore.full_path(src_ds.paths[src.pathkey])
-        reader = srcstore._session.get(srcpath, None)
-        with open(localpath, "wb") as f:
-            shutil.copyfileobj(reader, f)
+        start = time.perf_counter()
+        with tracing.get_tracer().span(
+            "io.copy_file_to_local", store=srcstore.name, path=srcpath
+        ):
+            prefetched = self._prefetched(srcstore.name, srcpath)
+            if prefetched is not None:
+                shutil.copyfile(prefetched, localpath)
+                nbytes = os.path.getsize(localpath)
+            elif hasattr(srcstore._session, "get_file"):
+                # stores that can verify the download checksum
+                nbytes = srcstore._session.get_file(srcpath, localpath)
+            else:
+                reader = srcstore._session.get(srcpath, None)
+                with open(localpath, "wb") as f:
+                    shutil.copyfileobj(reader, f)
+                    nbytes = f.tell()
+        instr = instrumentation.get_instrumentation()
+        if instr.enabled:
+            instr.record_io(
+                srcstore.name,
+                "copy_file_to_local",
+                nbytes=nbytes,
+                latency=time.perf_counter() - start,
+            )
 
-    def copy_file_to_remote(self, dest: DataSourceOpInput, localpath: str):
+    def copy_file_to_remote(
+        self, dest: DataSourceOpInput, localpath: str, skip_unchanged: bool = False
+    ) -> bool:
+        """
+        Uploads a local file to the output data source.  With skip_unchanged the
+        upload is skipped when the store already holds identical content (compared
+        by size and sha256).  Returns False if the upload was skipped.
+        """
+        dest_ds = self.get_output_data_source(dest.name)
+        deststore = self.get_store(dest_ds.store_name)
+        destpath = deststore.full_path(dest_ds.paths[dest.pathkey])
+        start = time.perf_counter()
+        with tracing.get_tracer().span(
+            "io.copy_file_to_remote", store=deststore.name, path=destpath
+        ) as span:
+            if hasattr(deststore._session, "put_file"):
+                uploaded = deststore._session.put_file(
+                    localpath, destpath, skip_unchanged
+                )
+                nbytes = os.path.getsize(localpath) if uploaded else 0
+            else:
+                with open(localpath, "rb") as f:
+                    deststore._session.put(f, destpath, None)
+                    nbytes = f.tell()
+                uploaded = True
+            span.set_attribute("skipped", not uploaded)
+        instr = instrumentation.get_instrumentation()
+        if instr.enabled:
+            instr.record_io(
+                deststore.name,
+                "copy_file_to_remote",
+                nbytes=nbytes,
+                latency=time.perf_counter() - start,
+            )
+        return uploaded
+
+    def copy_folder_to_remote(
+        self, dest: DataSourceOpInput, localpath: str, skip_unchanged: bool = False
+    ) -> List[str]:
+        """
+        Uploads a local directory to the output data source and returns the uploaded
+        keys.  With skip_unchanged, files whose content already exists at the
+        destination are not uploaded and are not included in the result.
+        """
         dest_ds = self.get_output_data_source(dest.name)
         deststore = self.get_store(dest_ds.store_name)
         destpath = deststore.full_path(dest_ds.paths[dest.pathkey])
-        with open(localpath, "rb") as f:
-            deststore._session.put(f, destpath, None)
+        start = time.perf_counter()
+        with tracing.get_tracer().span(
+            "io.put_folder", store=deststore.name, path=destpath
+        ):
+            if skip_unchanged:
+                keys = deststore._session.put_folder(
+                    localpath, destpath, skip_unchanged=True
+                )
+            else:
+                keys = deststore._session.put_folder(localpath, destpath)
+        self._record_folder_upload(deststore, destpath, localpath, keys, start)
+        return keys
 
-    def copy_folder_to_remote(self, dest: DataSourceOpInput, localpath: str):
+    def sync_folder_to_remote(
+        self,
+        dest: DataSourceOpInput,
+        localpath: str,
+        compare: SyncCompare | str = SyncCompare.CHECKSUM,
+        delete_orphans: bool = False,
+    ) -> SyncResult:
+        """
+        Uploads only the new or changed files of a local directory to the output
+        data source, optionally deleting remote files that no longer exist locally.
+        compare is "size", "mtime" or "checksum".  Returns a SyncResult of the
+        uploaded, skipped and deleted keys.
+        """
         dest_ds = self.get_output_data_source(dest.name)
         deststore = self.get_store(dest_ds.store_name)
         destpath = deststore.full_path(dest_ds.paths[dest.pathkey])
-        deststore._session.put_folder(localpath, destpath)
+        start = time.perf_counter()
+        with tracing.get_tracer().span(
+            "io.sync_folder", store=deststore.name, path=destpath
+        ) as span:
+            result = deststore._session.sync_folder(
+                localpath, destpath, compare=compare, delete_orphans=delete_orphans
+            )
+            span.set_attribute("uploaded", len(result.uploaded))
+            span.set_attribute("skipped", len(result.skipped))
+            span.set_attribute("deleted", len(result.deleted))
+        self._record_folder_upload(
+            deststore, destpath, localpath, result.uploaded, start
+        )
+        return result
+
+    def copy_folder_to_remote_archive(
+        self,
+        dest: DataSourceOpInput,
+        localpath: str,
+        compression: str = None,
+        index: bool = False,
+    ) -> dict:
+        """
+        Uploads a local directory to the output data source as a single tar archive
+        (zstd compressed with compression="zstd"), streamed without a local archive
+        file.  With index=True an index of member offsets is stored next to the
+        archive for get_archive_member.  Returns the archive index.
+        """
+        dest_ds = self.get_output_data_source(dest.name)
+        deststore = self.get_store(dest_ds.store_name)
+        destpath = deststore.full_path(dest_ds.paths[dest.pathkey])
+        start = time.perf_counter()
+        with tracing.get_tracer().span(
+            "io.put_folder_archive", store=deststore.name, path=destpath
+        ):
+            doc = deststore._session.put_folder_archive(
+                localpath, destpath, compression, index
+            )
+        instr = instrumentation.get_instrumentation()
+        if instr.enabled:
+            instr.record_io(
+                deststore.name,
+                "put_folder_archive",
+                nbytes=sum(m["size"] for m in doc["members"].values()),
+                objects=len(doc["members"]),
+                latency=time.perf_counter() - start,
+            )
+        return doc
+
+    def copy_archive_to_local(
+        self, src: DataSourceOpInput, localpath: str, compression: str = None
+    ) -> List[str]:
+        """
+        Extracts a tar archive input into a local directory while it downloads.
+        Returns the extracted member names.
+        """
+        src_ds = self.get_input_data_source(src.name)
+        srcstore = self.get_store(src_ds.store_name)
+        srcpath = srcstore.full_path(src_ds.paths[src.pathkey])
+        start = time.perf_counter()
+        with tracing.get_tracer().span(
+            "io.extract_archive", store=srcstore.name, path=srcpath
+        ):
+            names = srcstore._session.extract_archive(srcpath, localpath, compression)
+        instr = instrumentation.get_instrumentation()
+        if instr.enabled:
+            instr.record_io(
+                srcstore.name,
+                "extract_archive",
+                objects=len(names),
+                latency=time.perf_counter() - start,
+            )
+        return names
+
+    def get_archive_member(self, src: DataSourceOpInput, member: str) -> bytes:
+        """
+        Reads one member of an indexed tar archive input with a range request.
+        """
+        src_ds = self.get_input_data_source(src.name)
+        srcstore = self.get_store(src_ds.store_name)
+        srcpath = srcstore.full_path(src_ds.paths[src.pathkey])
+        with tracing.get_tracer().span(
+            "io.get_archive_member", store=srcstore.name, path=srcpath, member=member
+        ):
+            return srcstore._session.get_archive_member(srcpath, member)
+
+    def get_dataset(self, src: DataSourceOpInput, selection=None):
+        """
+        Reads the dataset named by the input data path src.datakey, or a selection of
+        it (e.g. np.s_[0:100]), from a remote HDF5 file as a numpy array.  Only the
+        chunks covering the selection are downloaded.
+        """
+        src_ds = self.get_input_data_source(src.name)
+        srcstore = self.get_store(src_ds.store_name)
+        srcpath = srcstore.full_path(src_ds.paths[src.pathkey])
+        datapath = src_ds.data_paths[src.datakey]
+        start = time.perf_counter()
+        with tracing.get_tracer().span(
+            "io.get_dataset", store=srcstore.name, path=srcpath, datapath=datapath
+        ):
+            data = srcstore._session.get_dataset(srcpath, datapath, selection)
+        instr = instrumentation.get_instrumentation()
+        if instr.enabled:
+            instr.record_io(
+                srcstore.name,
+                "get_dataset",
+                nbytes=data.nbytes,
+                latency=time.perf_counter() - start,
+            )
+        return data
+
+    def _record_folder_upload(
+        self,
+        deststore: DataStore,
+        destpath: str,
+        localpath: str,
+        keys: List[str],
+        start: float,
+    ):
+        instr = instrumentation.get_instrumentation()
+        if instr.enabled:
+            prefix = destpath.strip("/") + "/"
+            nbytes = sum(
+                os.path.getsize(
+                    os.path.join(os.path.expanduser(localpath), k.removeprefix(prefix))
+                )
+                for k in keys or []
+            )
+            instr.record_io(
+                deststore.name,
+                "put_folder",
+                nbytes=nbytes,
+                objects=len(keys or []),
+                latency=time.perf_counter() - start,
+            )
+
+
+def parse_event_numbers(spec: str) -> List[int]:
+    """
+    Parses a list of event numbers and inclusive ranges, e.g. "1-3,7" -> [1, 2, 3, 7].
+    """
+    events = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, sep, last = part.partition("-")
+        try:
+            if sep:
+                events.extend(range(int(first), int(last) + 1))
+            else:
+                events.append(int(first))
+        except ValueError:
+            raise ValueError(f"Invalid event numbers: {spec}") from None
+    return events
 
 
 def _handle_template_substitution(
@@ -0,0 +1,128 @@
+import atexit
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+from cc import tracing
+
+CcPrefetch = "CC_PREFETCH"
+CcPrefetchDir = "CC_PREFETCH_DIR"
+CcPrefetchWorkers = "CC_PREFETCH_WORKERS"
+DEFAULT_PREFETCH_WORKERS = 4
+
+
+class Prefetcher:
+    """
+    Downloads input objects in the background into a local staging directory.
+
+    Methods:
+    - start(store, path): queues a download of path from the connected DataStore.
+        Repeated requests for the same store and path are ignored
+    - wait(store_name, path)->str: blocks until the object is downloaded and returns
+        the local file.  Returns None if the object was not prefetched or the
+        download failed, in which case the caller reads it from the store directly
+    - discard(store_name, path): forgets a download and removes its local file
+    - close(): stops pending downloads and removes the staging directory if it was
+        created by the Prefetcher
+    """
+
+    def __init__(self, staging_dir: str = None, max_workers: int = DEFAULT_PREFETCH_WORKERS):
+        self._owns_dir = staging_dir is None
+        self.staging_dir = staging_dir or tempfile.mkdtemp(prefix="cc-prefetch-")
+        os.makedirs(self.staging_dir, exist_ok=True)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="cc-prefetch"
+        )
+        self._downloads: Dict[Tuple[str, str], Future] = {}
+        self._lock = threading.Lock()
+
+    def start(self, store, path: str):
+        key = (store.name, path)
+        with self._lock:
+            if key in self._downloads:
+                return
+            self._downloads[key] = self._executor.submit(self._download, store, path)
+
+    def wait(self, store_name: str, path: str) -> Optional[str]:
+        with self._lock:
+            future = self._downloads.get((store_name, path))
+        if future is None:
+            return None
+        try:
+            return future.result()
+        except Exception as e:
+            logging.warning(f"Prefetch of {store_name}:{path} failed, reading directly: {e}")
+            return None
+
+    def discard(self, store_name: str, path: str):
+        with self._lock:
+            future = self._downloads.pop((store_name, path), None)
+        if future is None or future.cancel():
+            return
+        # removed once a running download finishes
+        future.add_done_callback(_remove_staged)
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        if self._owns_dir:
+            shutil.rmtree(self.staging_dir, ignore_errors=True)
+
+    def _download(self, store, path: str) -> str:
+        digest = hashlib.sha1(f"{store.name}:{path}".encode()).hexdigest()[:16]
+        localdir = os.path.join(self.staging_dir, digest)
+        os.makedirs(localdir, exist_ok=True)
+        localpath = os.path.join(localdir, os.path.basename(path) or "object")
+        with tracing.get_tracer().span("prefetch.download", store=store.name, path=path):
+            if hasattr(store._session, "get_file"):
+                store._session.get_file(path, localpath)
+            else:
+                reader = store._session.get(path, None)
+                with open(localpath, "wb") as f:
+                    shutil.copyfileobj(reader, f)
+        return localpath
+
+
+def _remove_staged(future: Future):
+    if future.exception() is None:
+        shutil.rmtree(os.path.dirname(future.result()), ignore_errors=True)
+
+
+_prefetcher: Optional[Prefetcher] = None
+_prefetcherLock = threading.Lock()
+
+
+def get_prefetcher() -> Optional[Prefetcher]:
+    """
+    Returns the process Prefetcher, configured from CC_PREFETCH_DIR and
+    CC_PREFETCH_WORKERS when it is first needed, or None when CC_PREFETCH is not
+    "true".  Every PluginManager in the process shares it, so batch runs and long
+    lived workers keep one download pool and staging directory; each PluginManager
+    discards the inputs it staged when it is done with them.
+    """
+    global _prefetcher
+    if os.environ.get(CcPrefetch, "").lower() != "true":
+        return None
+    with _prefetcherLock:
+        if _prefetcher is None:
+            _prefetcher = Prefetcher(
+                staging_dir=os.environ.get(CcPrefetchDir) or None,
+                max_workers=int(
+                    os.environ.get(CcPrefetchWorkers, DEFAULT_PREFETCH_WORKERS)
+                ),
+            )
+        return _prefetcher
+
+
+def set_prefetcher(prefetcher: Optional[Prefetcher]):
+    global _prefetcher
+    _prefetcher = prefetcher
+
+
+@atexit.register
+def _close_prefetcher():
+    if _prefetcher is not None:
+        _prefetcher.close()
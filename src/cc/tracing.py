@@ -0,0 +1,167 @@
+import atexit
+import contextvars
+import json
+import os
+import secrets
+import threading
+import time
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Optional
+
+CcTraceFile = "CC_TRACE_FILE"
+
+
+@dataclass
+class Span:
+    """
+    A timed operation in the style of an OpenTelemetry span.  Times are unix epoch
+    nanoseconds.  Spans created in the same thread while another span is open are
+    its children.  Every span in a process shares the tracer trace_id.
+    """
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = field(default=None)
+    start_time: int = field(default=0)
+    end_time: int = field(default=0)
+    attributes: Dict[str, any] = field(default_factory=dict)
+    status: str = field(default="OK")
+    error: Optional[str] = field(default=None)
+
+    def set_attribute(self, key: str, value: any):
+        self.attributes[key] = value
+
+
+class _NoopSpan:
+    def set_attribute(self, key: str, value: any):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_noopSpan = _NoopSpan()
+
+
+class NoopTracer:
+    """
+    The default tracer.  Spans are not recorded.
+    """
+
+    enabled = False
+
+    def set_resource(self, **attributes):
+        pass
+
+    def span(self, name: str, **attributes) -> _NoopSpan:
+        return _noopSpan
+
+
+class FileSpanExporter:
+    """
+    Appends finished spans to a local file as JSON lines.  The file is held open
+    until shutdown(), which also runs at interpreter exit.  Spans exported after
+    shutdown are dropped.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a")
+        atexit.register(self.shutdown)
+
+    def export(self, span: Span):
+        line = json.dumps(asdict(span), default=str) + "\n"
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line)
+            self._file.flush()
+
+    def shutdown(self):
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.close()
+            self._file = None
+        atexit.unregister(self.shutdown)
+
+
+_currentSpan: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar(
+    "cc_current_span", default=None
+)
+
+
+class Tracer:
+    """
+    Records spans and hands them to an exporter when they end.  Resource attributes
+    (e.g. manifest_id, payload_id, event_number) are added to every span.
+
+    Methods:
+    - set_resource(**attributes): sets the attributes added to every span
+    - span(name, **attributes): context manager that times an operation. Exceptions
+        raised in the block mark the span as an error and are re-raised
+    """
+
+    enabled = True
+
+    def __init__(self, exporter: FileSpanExporter):
+        self.exporter = exporter
+        self.trace_id = secrets.token_hex(16)
+        self.resource: Dict[str, any] = {}
+
+    def set_resource(self, **attributes):
+        self.resource = {k: v for k, v in attributes.items() if v is not None}
+
+    def span(self, name: str, **attributes) -> "_SpanContext":
+        return _SpanContext(self, name, attributes)
+
+
+class _SpanContext:
+    def __init__(self, tracer: Tracer, name: str, attributes: dict):
+        parent = _currentSpan.get()
+        self.tracer = tracer
+        self.span = Span(
+            name=name,
+            trace_id=tracer.trace_id,
+            span_id=secrets.token_hex(8),
+            parent_id=parent.span_id if parent is not None else None,
+            attributes=tracer.resource | attributes,
+        )
+
+    def __enter__(self) -> Span:
+        self.token = _currentSpan.set(self.span)
+        self.span.start_time = time.time_ns()
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        self.span.end_time = time.time_ns()
+        _currentSpan.reset(self.token)
+        if exc is not None:
+            self.span.status = "ERROR"
+            self.span.error = f"{exc_type.__name__}: {exc}"
+        self.tracer.exporter.export(self.span)
+        return False
+
+
+def _default_tracer():
+    path = os.environ.get(CcTraceFile)
+    if path:
+        return Tracer(FileSpanExporter(path))
+    return NoopTracer()
+
+
+_tracer = _default_tracer()
+
+
+def get_tracer() -> Tracer | NoopTracer:
+    return _tracer
+
+
+def set_tracer(tracer: Tracer | NoopTracer):
+    global _tracer
+    _tracer = tracer
@@ -0,0 +1,198 @@
+import random
+import threading
+import time
+from dataclasses import dataclass, asdict, field
+from typing import Dict
+from botocore.exceptions import ClientError, ConnectionError as BotoConnectionError
+
+# S3 error codes returned when a bucket prefix is being throttled
+THROTTLE_ERROR_CODES = {
+    "SlowDown",
+    "Throttling",
+    "ThrottlingException",
+    "ThrottledException",
+    "RequestLimitExceeded",
+    "RequestThrottled",
+    "TooManyRequestsException",
+    "503",
+    "ServiceUnavailable",
+}
+# transient errors that are retried without reducing concurrency
+TRANSIENT_ERROR_CODES = {"500", "502", "504", "InternalError", "RequestTimeout"}
+
+DEFAULT_MAX_CONCURRENCY = 16
+DEFAULT_MAX_ATTEMPTS = 8
+DEFAULT_BASE_DELAY = 0.1  # seconds
+DEFAULT_MAX_DELAY = 20.0  # seconds
+
+
+@dataclass
+class GovernorStats:
+    requests: int = 0
+    throttles: int = 0
+    transient_errors: int = 0
+    retries: int = 0
+    failures: int = 0
+    concurrency: int = 0
+    min_concurrency_seen: int = 0
+    throttles_by_op: Dict[str, int] = field(default_factory=dict)
+
+
+class TransferGovernor:
+    """
+    Shared retry and concurrency policy for S3 requests made by the sdk.
+
+    Calls are retried with full-jitter exponential backoff when S3 throttles
+    (SlowDown, 503) or returns a transient error.  The number of calls allowed in
+    flight follows AIMD: it is halved on every throttle and grows by one after a
+    full window (the current limit) of successful calls.  The current limit is also
+    used as the part concurrency for boto3 multipart transfers.
+
+    Methods:
+    - call(fn, *args, op, retry, **kwargs): runs fn under the policy.  retry=False
+        runs it once but still takes a slot and adjusts the concurrency on throttling
+    - observe(kind, op): records a throttle or transient error that was retried
+        outside the governor (botocore retries the requests of boto3 transfers)
+    - concurrency: the current concurrency limit
+    - stats()->dict: counters of requests, throttles (also per op), transient errors,
+        retries, failures and the current concurrency
+    """
+
+    def __init__(
+        self,
+        min_concurrency: int = 1,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        initial_concurrency: int = None,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        base_delay: float = DEFAULT_BASE_DELAY,
+        max_delay: float = DEFAULT_MAX_DELAY,
+    ):
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._limit = initial_concurrency or max_concurrency
+        self._in_flight = 0
+        self._successes = 0
+        self._cond = threading.Condition()
+        self._stats = GovernorStats(
+            concurrency=self._limit, min_concurrency_seen=self._limit
+        )
+
+    @property
+    def concurrency(self) -> int:
+        return self._limit
+
+    def stats(self) -> dict:
+        with self._cond:
+            return asdict(self._stats)
+
+    def reset_stats(self):
+        with self._cond:
+            self._stats = GovernorStats(
+                concurrency=self._limit, min_concurrency_seen=self._limit
+            )
+
+    def call(self, fn, *args, op: str = None, retry: bool = True, **kwargs):
+        attempt = 0
+        while True:
+            self._acquire()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                kind = classify_error(e)
+                self._release(kind, op)
+                attempt += 1
+                if kind is None or not retry or attempt >= self.max_attempts:
+                    with self._cond:
+                        self._stats.failures += 1
+                    raise
+                with self._cond:
+                    self._stats.retries += 1
+                time.sleep(self._backoff(attempt))
+                continue
+            self._release("ok", op)
+            return result
+
+    def observe(self, kind: str, op: str):
+        with self._cond:
+            self._record(kind, op)
+            self._cond.notify_all()
+
+    def _backoff(self, attempt: int) -> float:
+        # full jitter: uniform over [0, min(max_delay, base * 2^attempt)]
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    def _acquire(self):
+        with self._cond:
+            while self._in_flight >= self._limit:
+                self._cond.wait()
+            self._in_flight += 1
+            self._stats.requests += 1
+
+    def _release(self, kind: str, op: str):
+        with self._cond:
+            self._in_flight -= 1
+            self._record(kind, op)
+            self._cond.notify_all()
+
+    def _record(self, kind: str, op: str):
+        if kind == "throttle":
+            self._stats.throttles += 1
+            ops = self._stats.throttles_by_op
+            ops[op] = ops.get(op, 0) + 1
+            self._successes = 0
+            self._limit = max(self.min_concurrency, self._limit // 2)
+        elif kind == "transient":
+            self._stats.transient_errors += 1
+        elif kind == "ok":
+            self._successes += 1
+            if self._successes >= self._limit and self._limit < self.max_concurrency:
+                self._limit += 1
+                self._successes = 0
+        self._stats.concurrency = self._limit
+        self._stats.min_concurrency_seen = min(
+            self._stats.min_concurrency_seen, self._limit
+        )
+
+
+def classify_error(e: BaseException) -> str:
+    """
+    Returns "throttle", "transient" or None for an exception raised by boto3.  boto3
+    transfer errors (e.g. S3UploadFailedError) wrap the ClientError as their context.
+    """
+    seen = set()
+    while e is not None and id(e) not in seen:
+        seen.add(id(e))
+        if isinstance(e, ClientError):
+            return classify_response(e.response)
+        if isinstance(e, BotoConnectionError):
+            return "transient"
+        e = e.__cause__ or e.__context__
+    return None
+
+
+def classify_response(response: dict) -> str:
+    """
+    Returns "throttle", "transient" or None for a parsed S3 error response.
+    """
+    code = str(response.get("Error", {}).get("Code", ""))
+    status = str(response.get("ResponseMetadata", {}).get("HTTPStatusCode", ""))
+    if code in THROTTLE_ERROR_CODES or status in ("429", "503"):
+        return "throttle"
+    if code in TRANSIENT_ERROR_CODES or status in TRANSIENT_ERROR_CODES:
+        return "transient"
+    return None
+
+
+_governor = TransferGovernor()
+
+
+def get_governor() -> TransferGovernor:
+    return _governor
+
+
+def set_governor(governor: TransferGovernor):
+    global _governor
+    _governor = governor
@@ -0,0 +1,218 @@
+import argparse
+import importlib
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import threading
+import time
+from typing import Callable
+from cc import filesapi
+from cc import tracing
+from cc.plugin_manager import (
+    PluginManager,
+    CcPayloadId,
+    CcManifestId,
+    CcEventNumber,
+)
+
+CcWorkerSocket = "CC_WORKER_SOCKET"
+DEFAULT_WORKER_SOCKET = "/tmp/cc-worker.sock"
+
+
+class Worker:
+    """
+    Long lived plugin process that runs payloads sent to it over a local Unix
+    socket.  The interpreter, imported modules, boto3 clients (see
+    filesapi.set_filestore_cache), TileDB contexts and caches stay warm between
+    jobs, so a job only pays for its payload fetch and its own work.
+
+    Each request is one line, either a payload id or a JSON object:
+
+        {"payload_id": "...", "manifest_id": "...", "event_number": "7",
+         "env": {"NAME": "value"}}
+
+    manifest_id and event_number set CC_MANIFEST_ID and CC_EVENT_NUMBER and env sets
+    any other environment variables for the job; all of them are restored
+    afterwards.  Each request gets a one line JSON reply:
+
+        {"payload_id": "...", "status": "ok" | "error", "error": "...", "seconds": 0.1}
+
+    Requests are run one at a time, in the order they are received.  Inputs
+    prefetched for a job (CC_PREFETCH) are removed when the job ends.
+
+    Methods:
+    - run(request:dict)->dict: runs one request in this process and returns the reply
+    - serve_forever(): listens on socket_path until shutdown() is called
+    - shutdown(): stops serve_forever from another thread or a signal handler
+    - close(): removes the socket and disables the S3FileStore cache
+    """
+
+    def __init__(
+        self, handler: Callable[[PluginManager], any] = None, socket_path: str = None
+    ):
+        self.handler = handler or _run_actions
+        self.socket_path = socket_path or os.environ.get(
+            CcWorkerSocket, DEFAULT_WORKER_SOCKET
+        )
+        self._server = None
+        self._ready = threading.Event()
+        filesapi.set_filestore_cache(True)
+
+    def run(self, request: dict) -> dict:
+        payload_id = request.get("payload_id")
+        env = dict(request.get("env") or {})
+        env[CcPayloadId] = payload_id
+        if request.get("manifest_id") is not None:
+            env[CcManifestId] = request["manifest_id"]
+        if request.get("event_number") is not None:
+            env[CcEventNumber] = str(request["event_number"])
+
+        saved = {name: os.environ.get(name) for name in env}
+        reply = {"payload_id": payload_id, "status": "ok"}
+        start = time.perf_counter()
+        pm = None
+        try:
+            if not payload_id:
+                raise ValueError("request has no payload_id")
+            os.environ.update({name: str(value) for name, value in env.items()})
+            with tracing.get_tracer().span("worker.job", payload_id=payload_id):
+                pm = PluginManager()
+                self.handler(pm)
+        except Exception as e:
+            logging.exception(f"Payload {payload_id} failed")
+            reply["status"] = "error"
+            reply["error"] = f"{type(e).__name__}: {e}"
+        finally:
+            if pm is not None:
+                # jobs share the process Prefetcher, see prefetch.get_prefetcher
+                pm.discard_prefetched()
+            for name, value in saved.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+        reply["seconds"] = time.perf_counter() - start
+        return reply
+
+    def serve_forever(self):
+        if os.path.exists(self.socket_path):
+            # left behind by a worker that did not shut down cleanly
+            os.unlink(self.socket_path)
+        self._server = socketserver.UnixStreamServer(self.socket_path, _RequestHandler)
+        self._server.worker = self
+        logging.info(f"cc worker listening on {self.socket_path}")
+        self._ready.set()
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def wait_ready(self, timeout: float = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def shutdown(self):
+        if self._server is not None:
+            # serve_forever blocks until shutdown, so it must not run on the
+            # serving thread
+            threading.Thread(target=self._server.shutdown, daemon=True).start()
+
+    def close(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        filesapi.set_filestore_cache(False)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = parse_request(line.decode("utf-8"))
+            except ValueError as e:
+                reply = {"payload_id": None, "status": "error", "error": str(e)}
+            else:
+                reply = self.server.worker.run(request)
+            self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+def parse_request(line: str) -> dict:
+    """
+    Parses a worker request line: a JSON object or a bare payload id.
+    """
+    if line.startswith("{"):
+        try:
+            return json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid worker request: {e}") from None
+    return {"payload_id": line}
+
+
+def submit(payload_id: str, socket_path: str = None, **fields) -> dict:
+    """
+    Sends one request to a running worker and returns its reply.  fields are
+    added to the request, e.g. event_number=7 or env={"NAME": "value"}.
+    """
+    socket_path = socket_path or os.environ.get(CcWorkerSocket, DEFAULT_WORKER_SOCKET)
+    request = json.dumps({"payload_id": payload_id, **fields}).encode("utf-8")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(request + b"\n")
+        with sock.makefile("rb") as reader:
+            return json.loads(reader.readline())
+
+
+def _run_actions(pm: PluginManager):
+    pm.run_actions()
+
+
+def _load_handler(spec: str) -> Callable[[PluginManager], any]:
+    module, _, name = spec.partition(":")
+    if not name:
+        raise ValueError(f"handler must be module:function, got {spec}")
+    return getattr(importlib.import_module(module), name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="cc-worker",
+        description="Runs cc payloads sent to a local socket in one long lived process",
+    )
+    parser.add_argument(
+        "--socket",
+        default=None,
+        help=f"socket path (default ${CcWorkerSocket} or {DEFAULT_WORKER_SOCKET})",
+    )
+    parser.add_argument(
+        "--handler",
+        default=None,
+        help="module:function called with each PluginManager (default runs the payload actions)",
+    )
+    parser.add_argument(
+        "--import",
+        dest="imports",
+        action="append",
+        default=[],
+        help="module to import at startup, e.g. one that registers action runners",
+    )
+    args = parser.parse_args(argv)
+
+    for module in args.imports:
+        importlib.import_module(module)
+    handler = _load_handler(args.handler) if args.handler else None
+    worker = Worker(handler, args.socket)
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: worker.shutdown())
+    try:
+        worker.serve_forever()
+    finally:
+        worker.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Shared fixtures.  S3 is provided by moto, in process, so the tests run offline.
+"""
+
+import json
+import pytest
+
+BUCKET = "cc-test"
+PROFILES = ["CC", "FFRD"]
+CC_ROOT = "cc_store"
+PAYLOAD_ID = "payload"
+
+
+def aws_env(bucket: str = BUCKET, endpoint: str = None, key: str = "test") -> dict:
+    """
+    Returns the environment for the CC and FFRD profiles and the CC run identifiers.
+    The profiles share one bucket.
+    """
+    env = {}
+    for profile in PROFILES:
+        env[f"{profile}_AWS_ACCESS_KEY_ID"] = key
+        env[f"{profile}_AWS_SECRET_ACCESS_KEY"] = key
+        env[f"{profile}_AWS_DEFAULT_REGION"] = "us-east-1"
+        env[f"{profile}_AWS_S3_BUCKET"] = bucket
+        if endpoint is not None:
+            env[f"{profile}_AWS_ENDPOINT"] = endpoint
+    env["CC_MANIFEST_ID"] = "manifest"
+    env["CC_PAYLOAD_ID"] = PAYLOAD_ID
+    env["CC_ROOT"] = CC_ROOT
+    return env
+
+
+class MotoS3:
+    """
+    The moto S3 bucket used by a test, with helpers to seed and read objects.
+    """
+
+    def __init__(self, client, bucket: str):
+        self.client = client
+        self.bucket = bucket
+
+    def put(self, key: str, body: bytes, **kwargs):
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=body, **kwargs)
+
+    def get(self, key: str) -> bytes:
+        return self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+
+    def put_payload(self, payload: dict, payload_id: str = PAYLOAD_ID):
+        self.put(f"{CC_ROOT}/{payload_id}/payload", json.dumps(payload).encode())
+
+
+@pytest.fixture
+def moto_env(monkeypatch):
+    """
+    Sets the aws_env environment and yields a MotoS3 for its bucket while moto
+    intercepts every S3 call.
+    """
+    moto = pytest.importorskip("moto")
+    import boto3
+
+    for name, value in aws_env().items():
+        monkeypatch.setenv(name, value)
+    for profile in PROFILES:
+        monkeypatch.delenv(f"{profile}_AWS_ENDPOINT", raising=False)
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield MotoS3(client, BUCKET)
+
+
+@pytest.fixture
+def s3_store(moto_env):
+    from cc import filesapi
+
+    return filesapi.NewS3FileStore("CC", moto_env.bucket)
+
+
+@pytest.fixture
+def object_fetches(monkeypatch):
+    """
+    Records the keys read with S3FileStore.get_object.
+    """
+    from cc import filesapi
+
+    fetches = []
+    get_object = filesapi.S3FileStore.get_object
+
+    def spy(self, path, *args, **kwargs):
+        fetches.append(path)
+        return get_object(self, path, *args, **kwargs)
+
+    monkeypatch.setattr(filesapi.S3FileStore, "get_object", spy)
+    return fetches
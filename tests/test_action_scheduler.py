@@ -0,0 +1,117 @@
+import threading
+import time
+import pytest
+
+
+def _payload(actions):
+    from cc.plugin_manager import Payload
+
+    return Payload.from_dict({"attributes": {}, "stores": [], "inputs": [], "outputs": [], "actions": actions})
+
+
+def _action(name, inputs=None, outputs=None, depends_on=None):
+    return {"name": name, "attributes": {}, "stores": None, "inputs": inputs, "outputs": outputs, "depends_on": depends_on}
+
+
+def _source(name, path):
+    return {"name": name, "paths": {"default": path}, "store_name": "FFRD", "data_paths": {}}
+
+
+def test_action_dependencies():
+    from cc.action_scheduler import action_dependencies
+
+    pl = _payload(
+        [
+            _action("copy", outputs=[_source("copied", "inputs/model.hdf")]),
+            _action("modelA", inputs=[_source("model", "inputs/model.hdf")]),
+            _action("modelB", depends_on=["copy"]),
+            _action("report"),
+        ]
+    )
+    assert action_dependencies(pl.actions) == [set(), {0}, {0}, set()]
+
+    with pytest.raises(ValueError):
+        action_dependencies(_payload([_action("a", depends_on=["b"]), _action("b", depends_on=["a"])]).actions)
+
+
+def test_parallel_actions():
+    from cc.action_scheduler import ActionScheduler, ActionStatus
+
+    pl = _payload([_action("copy"), _action("modelA", depends_on=["copy"]), _action("modelB", depends_on=["copy"])])
+    barrier = threading.Barrier(2, timeout=5)
+    order = []
+
+    def run_action(index):
+        action = pl.actions[index]
+        order.append(action.name)
+        if action.name != "copy":
+            barrier.wait()  # both models must be running at the same time
+        return action.name
+
+    results = ActionScheduler(max_workers=2).run(pl.actions, run_action)
+    assert order[0] == "copy"
+    assert [r.status for r in results] == [ActionStatus.SUCCEEDED] * 3
+    assert [r.value for r in results] == ["copy", "modelA", "modelB"]
+
+
+def test_failed_actions():
+    from cc.action_scheduler import ActionScheduler, ActionStatus, ActionExecutionError
+
+    pl = _payload([_action("copy"), _action("modelA", depends_on=["copy"]), _action("report")])
+
+    def run_action(index):
+        if pl.actions[index].name == "copy":
+            raise RuntimeError("copy failed")
+        time.sleep(0.01)
+
+    with pytest.raises(ActionExecutionError) as e:
+        ActionScheduler(max_workers=2, fail_fast=False).run(pl.actions, run_action)
+    assert [r.status for r in e.value.results] == [
+        ActionStatus.FAILED,
+        ActionStatus.SKIPPED,
+        ActionStatus.SUCCEEDED,
+    ]
+    assert "copy failed" in e.value.results[0].error
+
+    with pytest.raises(ActionExecutionError) as e:
+        ActionScheduler(max_workers=1).run(pl.actions, run_action)
+    assert [r.status for r in e.value.results] == [
+        ActionStatus.FAILED,
+        ActionStatus.SKIPPED,
+        ActionStatus.SKIPPED,
+    ]
+
+
+class PidRunner:
+    def run(self):
+        import os
+
+        return os.getpid(), self.pm.get_payload().attributes["model"], self.action.attributes["n"]
+
+
+def test_process_actions(monkeypatch):
+    import os
+    from cc import action_runner
+    from cc.plugin_manager import PluginManager
+    from cc.action_scheduler import ActionStatus
+
+    for name in ["AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_DEFAULT_REGION", "AWS_S3_BUCKET"]:
+        monkeypatch.setenv(f"CC_{name}", "test")
+    action_runner.register_action_runner("pid", PidRunner)
+
+    actions = [_action("pid") for _ in range(3)]
+    for n, action in enumerate(actions):
+        action["attributes"] = {"n": str(n)}
+    snapshot = {
+        "manifest_id": "manifest",
+        "payload_id": "payload",
+        "ccroot": "/cc_store",
+        "payload": {"attributes": {"model": "ras"}, "stores": [], "inputs": [], "outputs": [], "actions": actions},
+    }
+    pm = PluginManager.from_snapshot(snapshot)
+    assert pm.snapshot() == PluginManager.from_snapshot(pm.snapshot()).snapshot()
+
+    results = pm.run_actions(max_workers=2, executor_type="process")
+    assert all(r.status == ActionStatus.SUCCEEDED for r in results)
+    assert all(r.value[0] != os.getpid() for r in results)
+    assert [r.value[1:] for r in results] == [("ras", "0"), ("ras", "1"), ("ras", "2")]
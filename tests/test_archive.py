@@ -0,0 +1,43 @@
+import os
+import pytest
+
+
+@pytest.fixture
+def output_dir(tmp_path):
+    out = tmp_path / "out"
+    for i in range(200):
+        d = out / f"cells/{i % 7}"
+        d.mkdir(parents=True, exist_ok=True)
+        (d / f"cell_{i}.txt").write_bytes(os.urandom(i * 13))
+    (out / ("n" * 150 + ".txt")).write_text("long name")
+    return out
+
+
+def test_archive_round_trip(s3_store, output_dir, tmp_path):
+    from cc import archive
+
+    doc = archive.put_folder_archive(s3_store, output_dir, "results/out.tar", index=True)
+    assert len(doc["members"]) == 201
+    assert s3_store.client.list_objects_v2(Bucket=s3_store.bucket, Prefix="results/")["KeyCount"] == 2
+
+    for name in ["cells/3/cell_199.txt", "cells/0/cell_0.txt", "n" * 150 + ".txt"]:
+        assert archive.get_archive_member(s3_store, "results/out.tar", name) == (output_dir / name).read_bytes()
+    with pytest.raises(KeyError):
+        archive.get_archive_member(s3_store, "results/out.tar", "missing.txt")
+
+    dest = tmp_path / "extracted"
+    names = archive.extract_archive(s3_store, "results/out.tar", dest)
+    assert len(names) == 201
+    assert (dest / "cells/5/cell_5.txt").read_bytes() == (output_dir / "cells/5/cell_5.txt").read_bytes()
+
+
+def test_zstd_archive(s3_store, output_dir, tmp_path):
+    pytest.importorskip("zstandard")
+    from cc import archive
+
+    with pytest.raises(ValueError):
+        archive.put_folder_archive(s3_store, output_dir, "results/out.tar.zst", index=True)
+    doc = archive.put_folder_archive(s3_store, output_dir, "results/out.tar.zst")
+    assert doc["compression"] == "zstd"
+    names = archive.extract_archive(s3_store, "results/out.tar.zst", tmp_path / "zst")
+    assert sorted(names) == sorted(doc["members"])
@@ -0,0 +1,71 @@
+import io
+import numpy as np
+import pytest
+
+
+class _ReadOnly:
+    # a reader without readinto
+    def __init__(self, data):
+        self._f = io.BytesIO(data)
+
+    def read(self, *amt):
+        return self._f.read(*amt)
+
+
+def test_npy_round_trip():
+    from cc import arrays
+
+    for arr in [np.arange(12, dtype=np.int16).reshape(3, 4), np.asfortranarray(np.random.rand(5, 7)), np.arange(20.0)[::2], np.array(3.5)]:
+        data = arrays.array_reader(arr, npy=True).read()
+        assert np.array_equal(np.load(io.BytesIO(data)), arr)
+        for reader in [io.BytesIO(data), _ReadOnly(data)]:
+            result = arrays.read_array(reader, npy=True)
+            assert np.array_equal(result, arr)
+            assert result.flags.c_contiguous == (arr.ndim < 2 or not arr.flags.f_contiguous)
+
+
+def test_raw_array():
+    from cc import arrays
+
+    arr = np.arange(6, dtype=np.float32).reshape(2, 3)
+    reader = arrays.array_reader(arr)
+    assert reader.read() == arr.tobytes()
+    reader.seek(4)
+    assert reader.read(4) == arr.tobytes()[4:8]
+
+    out = np.empty((2, 3), dtype=np.float32)
+    assert arrays.read_array(io.BytesIO(arr.tobytes()), out=out) is out
+    assert np.array_equal(out, arr)
+    with pytest.raises(ValueError):
+        arrays.read_array(io.BytesIO(arr.tobytes()), np.float32)
+    with pytest.raises(ValueError):
+        arrays.read_array(io.BytesIO(arr.tobytes()), np.float32, (4, 3))
+    with pytest.raises(ValueError):
+        arrays.read_array(io.BytesIO(arr.tobytes()), np.float32, (1, 3))
+    with pytest.raises(ValueError):
+        arrays.read_array(io.BytesIO(np.save.__doc__.encode()), np.float32, (2, 3), npy=True)
+
+
+def test_plugin_manager_arrays(moto_env):
+    from cc.plugin_manager import PluginManager
+
+    source = {"name": "grid", "paths": {"npy": "grid.npy", "raw": "grid.bin"}, "store_name": "FFRD", "data_paths": {}}
+    moto_env.put_payload(
+        {
+            "attributes": {},
+            "stores": [{"name": "FFRD", "store_type": "S3", "profile": "FFRD", "params": {"root": "model-library"}}],
+            "inputs": [source],
+            "outputs": [source],
+            "actions": [],
+        }
+    )
+    pm = PluginManager()
+
+    grid = np.random.rand(300, 200).astype(np.float32)
+    pm.put_array(grid, "grid", "npy")
+    pm.put_array(grid, "grid", "raw")
+    assert np.array_equal(pm.get_array("grid", "npy"), grid)
+    out = np.empty_like(grid)
+    assert pm.get_array("grid", "raw", np.float32, grid.shape, out=out) is out
+    assert np.array_equal(out, grid)
+    assert np.array_equal(np.load(io.BytesIO(moto_env.get("model-library/grid.npy"))), grid)
@@ -0,0 +1,76 @@
+import io
+import threading
+import time
+import pytest
+
+
+def test_parse_rate():
+    from cc.bandwidth import parse_rate
+
+    assert parse_rate("50MB") == 50_000_000
+    assert parse_rate("40MiB/s") == 40 * 2**20
+    assert parse_rate("1.5G") == 1_500_000_000
+    assert parse_rate(1000) == 1000
+    with pytest.raises(ValueError):
+        parse_rate("fast")
+
+
+def test_bandwidth_limit():
+    from cc.bandwidth import BandwidthLimiter, Priority
+
+    limiter = BandwidthLimiter(rate=4_000_000)
+    reader = limiter.reader(io.BytesIO(b"x" * 2_000_000), Priority.BACKGROUND)
+    start = time.monotonic()
+    while reader.read(100_000):
+        pass
+    # 2MB at 4MB/s less the initial 0.25s burst
+    assert 0.2 < time.monotonic() - start < 1.0
+
+
+def test_bandwidth_fair_share():
+    from cc.bandwidth import BandwidthLimiter, Priority
+
+    limiter = BandwidthLimiter(rate=2_000_000, interactive_share=0.8)
+    sent = {Priority.INTERACTIVE: 0, Priority.BACKGROUND: 0}
+    stop = time.monotonic() + 1.0
+
+    def transfer(priority):
+        while time.monotonic() < stop:
+            limiter.acquire(20_000, priority)
+            sent[priority] += 20_000
+
+    threads = [threading.Thread(target=transfer, args=(p,)) for p in sent]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    total = sum(sent.values())
+    assert total < 3_500_000
+    assert sent[Priority.INTERACTIVE] > 2 * sent[Priority.BACKGROUND] > 0
+
+
+def test_store_bandwidth_param(monkeypatch):
+    from cc import bandwidth
+
+    monkeypatch.delenv(bandwidth.CcBandwidthLimit, raising=False)
+    monkeypatch.setattr(bandwidth, "_limiter", None)
+    bandwidth.configure_from_params({"root": "data"})
+    assert bandwidth.get_limiter() is None
+    bandwidth.configure_from_params({"bandwidth_limit": "100MB"})
+    bandwidth.configure_from_params({"bandwidth_limit": "10MB"})
+    bandwidth.configure_from_params({"bandwidth_limit": "50MB"})
+    assert bandwidth.get_limiter().rate == 10_000_000
+
+
+@pytest.mark.parametrize("share", ["0", "1.0", "1.5", "-0.2", "half"])
+def test_invalid_interactive_share(monkeypatch, share):
+    from cc import bandwidth
+
+    if share != "half":
+        with pytest.raises(ValueError):
+            bandwidth.BandwidthLimiter(1_000_000, float(share))
+    monkeypatch.delenv(bandwidth.CcBandwidthLimit, raising=False)
+    monkeypatch.setenv(bandwidth.CcBandwidthInteractiveShare, share)
+    monkeypatch.setattr(bandwidth, "_limiter", None)
+    with pytest.raises(ValueError, match=bandwidth.CcBandwidthInteractiveShare):
+        bandwidth.configure_from_params({"bandwidth_limit": "10MB"})
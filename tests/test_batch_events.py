@@ -0,0 +1,97 @@
+import os
+import pytest
+
+PAYLOAD = {
+    "attributes": {"event": "{ENV::CC_EVENT_NUMBER}"},
+    "stores": [{"name": "FFRD", "store_type": "S3", "profile": "FFRD", "params": {"root": "model-library"}}],
+    "inputs": [{"name": "in", "paths": {"default": "sims/{ENV::CC_EVENT_NUMBER}/in.bin"}, "store_name": "FFRD", "data_paths": {}}],
+    "outputs": [],
+    "actions": [],
+}
+
+
+def test_parse_event_numbers():
+    from cc.plugin_manager import parse_event_numbers
+
+    assert parse_event_numbers("1-3, 7,") == [1, 2, 3, 7]
+    with pytest.raises(ValueError):
+        parse_event_numbers("1-x")
+
+
+@pytest.mark.parametrize("prefetch_next", [False, True])
+def test_iter_events(monkeypatch, moto_env, object_fetches, prefetch_next):
+    from cc.plugin_manager import PluginManager, CcEventNumbers
+
+    monkeypatch.setenv("CC_EVENT_NUMBER", "0")
+    monkeypatch.setenv(CcEventNumbers, "1-3")
+    moto_env.put_payload(PAYLOAD)
+    for event in range(1, 4):
+        moto_env.put(f"model-library/sims/{event}/in.bin", f"event {event}".encode())
+
+    sessions = set()
+    seen = []
+    for pm in PluginManager.iter_events(prefetch_next=prefetch_next):
+        event = pm.get_payload().attributes["event"]
+        assert pm.eventNumber == event
+        with pm.get_reader("in", "default", None) as reader:
+            seen.append(reader.read().decode())
+        sessions.add(id(pm.get_store("FFRD")._session))
+
+    assert seen == ["event 1", "event 2", "event 3"]
+    # one payload download and one store connection for the batch
+    assert object_fetches.count("cc_store/payload/payload") == 1
+    assert len(sessions) == 1
+    assert os.environ["CC_EVENT_NUMBER"] == "0"
+
+
+def test_iter_events_restores_event_number(monkeypatch, moto_env):
+    from cc.plugin_manager import PluginManager
+
+    moto_env.put_payload(PAYLOAD)
+    monkeypatch.delenv("CC_EVENT_NUMBER", raising=False)
+    for pm in PluginManager.iter_events(range(1, 3)):
+        assert os.environ["CC_EVENT_NUMBER"] == pm.eventNumber
+    assert "CC_EVENT_NUMBER" not in os.environ
+
+    monkeypatch.setenv("CC_EVENT_NUMBER", "0")
+    events = PluginManager.iter_events(range(1, 4), prefetch_next=True)
+    assert next(events).eventNumber == "1"
+    events.close()
+    assert os.environ["CC_EVENT_NUMBER"] == "0"
+
+
+def test_events_share_prefetcher(tmp_path, monkeypatch, moto_env):
+    import tempfile
+    import threading
+    from cc import prefetch
+    from cc.plugin_manager import PluginManager
+
+    monkeypatch.setenv(prefetch.CcPrefetch, "true")
+    monkeypatch.setenv(prefetch.CcPrefetchWorkers, "2")
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    monkeypatch.setattr(prefetch, "_prefetcher", None)
+    moto_env.put_payload(PAYLOAD)
+    for event in range(1, 7):
+        moto_env.put(f"model-library/sims/{event}/in.bin", f"event {event}".encode())
+
+    # separate managers, as a worker creates one per job, and two batches
+    for event in range(1, 4):
+        monkeypatch.setenv("CC_EVENT_NUMBER", str(event))
+        pm = PluginManager()
+        with pm.get_reader("in", "default", None) as reader:
+            assert reader.read() == f"event {event}".encode()
+        pm.discard_prefetched()
+    for _ in range(2):
+        for pm in PluginManager.iter_events(range(4, 7), prefetch_next=True):
+            with pm.get_reader("in", "default", None) as reader:
+                assert reader.read() == f"event {pm.eventNumber}".encode()
+
+    prefetcher = prefetch.get_prefetcher()
+    threads = [t for t in threading.enumerate() if t.name.startswith("cc-prefetch")]
+    assert len(threads) <= 2
+    staging = list(tmp_path.glob("cc-prefetch-*"))
+    assert staging == [tmp_path / os.path.basename(prefetcher.staging_dir)]
+    # the staged inputs are removed once each event is done
+    assert os.listdir(prefetcher.staging_dir) == []
+    prefetcher.close()
+    assert not os.path.exists(prefetcher.staging_dir)
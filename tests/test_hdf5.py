@@ -0,0 +1,49 @@
+import io
+import os
+import numpy as np
+import pytest
+
+
+def test_range_reader(s3_store):
+    data = os.urandom(10_000)
+    s3_store.put_object("blob.bin", io.BytesIO(data))
+
+    reader = s3_store.open_reader("blob.bin", block_size=1024, cache_blocks=4)
+    assert reader.size == len(data)
+    reader.seek(1000)
+    assert reader.read(100) == data[1000:1100]
+    assert reader.read(2000) == data[1100:3100]
+    assert reader.requests == 2
+    # served from the cached blocks
+    reader.seek(1500)
+    assert reader.read(10) == data[1500:1510]
+    assert reader.requests == 2
+    reader.seek(-5, io.SEEK_END)
+    assert reader.read() == data[-5:]
+    assert reader.read(10) == b""
+    buffered = io.BufferedReader(s3_store.open_reader("blob.bin", block_size=4096))
+    assert buffered.read() == data
+
+
+def test_read_dataset(s3_store, tmp_path):
+    h5py = pytest.importorskip("h5py")
+    from cc import hdf5
+
+    depth = np.arange(1000 * 1000, dtype=np.float64).reshape(1000, 1000)
+    local = tmp_path / "results.h5"
+    with h5py.File(local, "w") as f:
+        f.create_dataset("results/depth", data=depth, chunks=(100, 100))
+        f.create_dataset("results/max", data=np.ones(10))
+    s3_store.upload_file(str(local), "sims/results.h5")
+
+    part = hdf5.read_dataset(s3_store, "sims/results.h5", "/results/depth", np.s_[200:300, 0:100], block_size=64 * 1024)
+    assert np.array_equal(part, depth[200:300, 0:100])
+    assert np.array_equal(hdf5.read_dataset(s3_store, "sims/results.h5", "results/max"), np.ones(10))
+    with pytest.raises(KeyError):
+        hdf5.read_dataset(s3_store, "sims/results.h5", "results/missing")
+
+    # only the metadata and the chunk covering the selection are fetched
+    with s3_store.open_reader("sims/results.h5", block_size=64 * 1024) as reader:
+        with h5py.File(reader, "r") as f:
+            f["results/depth"][200:300, 0:100]
+        assert reader.bytes_fetched < os.path.getsize(local) / 20
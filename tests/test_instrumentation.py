@@ -0,0 +1,82 @@
+import io
+import json
+import os
+
+
+class MemorySession:
+    def __init__(self):
+        self.objects = {}
+
+    def get(self, path, datapath):
+        return io.BytesIO(self.objects[path])
+
+    def put(self, reader, destpath, datapath):
+        self.objects[destpath] = reader.read()
+
+    def put_folder(self, path, dest_prefix):
+        keys = []
+        for name in os.listdir(path):
+            with open(os.path.join(path, name), "rb") as f:
+                key = f"{dest_prefix.strip('/')}/{name}"
+                self.objects[key] = f.read()
+                keys.append(key)
+        return keys
+
+
+def test_instrumentation(tmp_path, monkeypatch):
+    from cc import instrumentation
+    from cc import action_runner
+    from cc.plugin_manager import PluginManager, DataSourceOpInput
+
+    instr = instrumentation.get_instrumentation()
+    monkeypatch.setattr(instr, "enabled", True)
+    instr.reset()
+    for name in ["AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_DEFAULT_REGION", "AWS_S3_BUCKET"]:
+        monkeypatch.setenv(f"CC_{name}", "test")
+    monkeypatch.setenv(instrumentation.CcInstrumentationFile, str(tmp_path / "instrumentation.json"))
+
+    source = lambda name, path: {"name": name, "paths": {"default": path}, "store_name": "MEM", "data_paths": {}}
+    pm = PluginManager.from_snapshot(
+        {
+            "manifest_id": "manifest",
+            "payload_id": "payload",
+            "ccroot": "/cc_store",
+            "payload": {
+                "attributes": {},
+                "stores": [{"name": "MEM", "store_type": "MEMORY", "profile": "CC", "params": {"root": "root"}}],
+                "inputs": [source("in", "in.bin")],
+                "outputs": [source("out", "out.bin"), source("folder", "folder")],
+                "actions": [
+                    {"name": "io", "attributes": {}, "stores": None, "inputs": None, "outputs": None, "depends_on": None}
+                ],
+            },
+        }
+    )
+    session = MemorySession()
+    session.objects["root/in.bin"] = b"x" * 1000
+    pm.get_store("MEM")._session = session
+
+    folder = tmp_path / "folder"
+    folder.mkdir()
+    for i in range(3):
+        (folder / f"{i}.txt").write_bytes(b"y" * 10)
+
+    class IoRunner:
+        def run(self):
+            self.pm.get("in", "default", None)
+            self.pm.put(io.BytesIO(b"z" * 500), "out", "default", None)
+            self.pm.copy_file_to_local(DataSourceOpInput("in", "default", None), str(tmp_path / "local.bin"))
+            self.pm.copy_folder_to_remote(DataSourceOpInput("folder", "default", None), str(folder))
+
+    action_runner.register_action_runner("io", IoRunner)
+    pm.run_actions()
+
+    doc = json.loads((tmp_path / "instrumentation.json").read_text())
+    assert doc["payload_id"] == "payload"
+    assert [a["name"] for a in doc["actions"]] == ["io"]
+    stats = doc["io"]["MEM"]
+    assert stats["get_reader"]["bytes"] == 1000
+    assert stats["put"]["bytes"] == 500
+    assert stats["copy_file_to_local"]["bytes"] == 1000
+    assert stats["put_folder"]["objects"] == 3
+    assert stats["put_folder"]["bytes"] == 30
@@ -0,0 +1,104 @@
+import atexit
+import json
+import logging
+
+
+def test_json_logging():
+    from cc import logger
+
+    logger.set_log_context(manifest_id="manifest", payload_id="payload", event_number="3")
+    formatter = logger.JsonFormatter()
+    context_filter = logger.ContextFilter()
+
+    def render(msg, *args):
+        record = logging.LogRecord("cc", logging.INFO, __file__, 1, msg, args, None)
+        context_filter.filter(record)
+        return json.loads(formatter.format(record))
+
+    with logger.log_context(action="modelA"):
+        doc = render("wrote %d bytes", 42)
+    assert doc["message"] == "wrote 42 bytes"
+    assert doc["level"] == "INFO"
+    assert doc["manifest_id"] == "manifest"
+    assert doc["payload_id"] == "payload"
+    assert doc["event_number"] == "3"
+    assert doc["action"] == "modelA"
+    assert "action" not in render("outside")
+
+    logger.set_log_context(event_number=None)
+    assert "event_number" not in render("no event")
+
+
+def test_lazy_logging():
+    from cc import logger
+
+    calls = []
+
+    def summary():
+        calls.append(1)
+        return "summary"
+
+    log = logging.getLogger("cc.test_lazy")
+    log.setLevel(logging.INFO)
+    log.debug("%s", logger.Lazy(summary))
+    logger.log_lazy(logging.DEBUG, summary, logger=log)
+    assert calls == []
+    assert str(logger.Lazy(summary)) == "summary"
+
+
+def test_queued_json_logging(monkeypatch, capsys):
+    from cc import logger
+
+    root = logging.getLogger()
+    saved = root.handlers[:], root.level
+    monkeypatch.setenv(logger.CcLogFormat, "json")
+    monkeypatch.setenv(logger.CcLoggingLevel, "INFO")
+    monkeypatch.setattr(logger, "_listener", None)
+    records = []
+    existing = logging.Handler()
+    existing.emit = records.append
+    # the test runner's own handlers are put back afterwards
+    root.handlers = [existing]
+    try:
+        # a host application's handlers are left alone and records are not doubled
+        logger.initLogger(manifest_id="manifest", payload_id="queued")
+        assert root.handlers == [existing]
+        logging.info("host")
+        assert [r.getMessage() for r in records] == ["host"]
+
+        logger.initLogger(force=True, manifest_id="manifest", payload_id="queued")
+        assert [type(h) for h in root.handlers] == [logger.ContextQueueHandler]
+        with logger.log_context(action="modelB"):
+            logging.info("queued %s", "record")
+        logging.debug("filtered")
+        # flush the queue now instead of at exit
+        atexit.unregister(logger._listener.stop)
+        logger._listener.stop()
+    finally:
+        root.handlers[:] = saved[0]
+        root.setLevel(saved[1])
+        logger.set_log_context(manifest_id=None, payload_id=None)
+
+    assert [r.getMessage() for r in records] == ["host"]
+    docs = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [d["message"] for d in docs] == ["queued record"]
+    assert docs[0]["payload_id"] == "queued"
+    assert docs[0]["action"] == "modelB"
+
+
+def test_text_logging_context():
+    from cc import logger
+
+    formatter = logger.TextFormatter()
+    record = logging.LogRecord("cc", logging.INFO, __file__, 1, "wrote %d bytes", (42,), None)
+    assert formatter.format(record).endswith("| wrote 42 bytes")
+
+    logger.set_log_context(manifest_id="manifest", payload_id="payload", event_number="3")
+    try:
+        with logger.log_context(action="modelA"):
+            logger.ContextFilter().filter(record)
+        line = formatter.format(record)
+    finally:
+        logger.set_log_context(manifest_id=None, payload_id=None, event_number=None)
+    assert line.startswith("INFO | ")
+    assert line.endswith(" | manifest_id=manifest payload_id=payload event_number=3 action=modelA | wrote 42 bytes")
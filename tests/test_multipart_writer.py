@@ -0,0 +1,37 @@
+import os
+import pytest
+
+MB = 1024 * 1024
+
+
+def test_multipart_writer(s3_store):
+    data = os.urandom(12 * MB + 123)
+    with s3_store.open_writer("/outputs/big.bin", part_size=5 * MB, max_in_flight=2) as w:
+        for i in range(0, len(data), 1000 * 1000):
+            w.write(data[i : i + 1000 * 1000])
+        assert w.upload_id is not None
+        # bounded: at most max_in_flight parts queued plus the part being filled
+        assert len(w._buffer) < 5 * MB
+    assert w.closed
+    assert s3_store.get_object("outputs/big.bin").read() == data
+    assert s3_store.client.head_object(Bucket=s3_store.bucket, Key="outputs/big.bin")["ETag"].endswith('-3"')
+
+
+def test_small_writer_uses_put(s3_store):
+    with s3_store.open_writer("outputs/small.txt") as w:
+        w.write(b"hello ")
+        w.write(b"world")
+        assert w.upload_id is None
+    assert s3_store.get_object("outputs/small.txt").read() == b"hello world"
+
+
+def test_writer_aborts_on_exception(s3_store):
+    with pytest.raises(RuntimeError):
+        with s3_store.open_writer("outputs/failed.bin", part_size=5 * MB) as w:
+            w.write(os.urandom(6 * MB))
+            raise RuntimeError("model crashed")
+    uploads = s3_store.client.list_multipart_uploads(Bucket=s3_store.bucket).get("Uploads", [])
+    assert uploads == []
+    assert "Contents" not in s3_store.client.list_objects_v2(Bucket=s3_store.bucket, Prefix="outputs/failed.bin")
+    with pytest.raises(ValueError):
+        w.write(b"more")
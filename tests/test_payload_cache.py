@@ -0,0 +1,50 @@
+import json
+
+PAYLOAD = {
+    "attributes": {"event": "{ENV::CC_EVENT_NUMBER}"},
+    "stores": [{"name": "FFRD", "store_type": "S3", "profile": "FFRD", "params": {"root": "model-library"}}],
+    "inputs": [{"name": "in", "paths": {"default": "sims/{ENV::CC_EVENT_NUMBER}/in.bin"}, "store_name": "FFRD", "data_paths": {}}],
+    "outputs": [],
+    "actions": [],
+}
+
+
+def test_payload_cache(tmp_path, monkeypatch):
+    from cc import payload_cache
+
+    cache = payload_cache.PayloadCache(str(tmp_path))
+    content = json.dumps(PAYLOAD).encode()
+    assert cache.load("payload", '"etag1"') == (None, None)
+
+    monkeypatch.setenv("CC_EVENT_NUMBER", "1")
+    cache.save("payload", '"etag1"', content, {"attributes": {"event": "1"}})
+    assert cache.load("payload", '"etag1"') == (content, {"attributes": {"event": "1"}})
+    assert cache.load("payload", '"etag2"') == (None, None)
+
+    # a different event shares the download but not the substituted payload
+    monkeypatch.setenv("CC_EVENT_NUMBER", "2")
+    assert cache.load("payload", '"etag1"') == (content, None)
+
+
+def test_plugin_manager_payload_cache(tmp_path, monkeypatch, moto_env, object_fetches):
+    from cc import payload_cache
+    from cc.plugin_manager import PluginManager
+
+    monkeypatch.setenv("CC_EVENT_NUMBER", "7")
+    monkeypatch.setenv(payload_cache.CcPayloadCacheDir, str(tmp_path))
+    moto_env.put_payload(PAYLOAD)
+
+    pm = PluginManager()
+    assert pm.get_input_data_source("in").paths["default"] == "sims/7/in.bin"
+    assert object_fetches == ["cc_store/payload/payload"]
+
+    cached = PluginManager()
+    assert object_fetches == ["cc_store/payload/payload"]
+    assert cached.get_payload().attributes["event"] == "7"
+    assert cached.get_input_data_source("in").paths["default"] == "sims/7/in.bin"
+    assert cached.get_store("FFRD")._session is not None
+
+    # a new upload changes the ETag and invalidates the cache
+    moto_env.put_payload(dict(PAYLOAD, attributes={"event": "v2-{ENV::CC_EVENT_NUMBER}"}))
+    assert PluginManager().get_payload().attributes["event"] == "v2-7"
+    assert object_fetches == ["cc_store/payload/payload"] * 2
@@ -0,0 +1,76 @@
+import threading
+
+PAYLOAD = {
+    "attributes": {},
+    "stores": [{"name": "FFRD", "store_type": "S3", "profile": "FFRD", "params": {"root": "model-library"}}],
+    "inputs": [{"name": "in", "paths": {"default": "sims/in.bin", "other": "sims/other.bin"}, "store_name": "FFRD", "data_paths": {}}],
+    "outputs": [],
+    "actions": [],
+}
+
+
+class _Store:
+    name = "FFRD"
+
+    def __init__(self, objects, gate=None):
+        self._session = self
+        self.objects = objects
+        self.gate = gate
+        self.gets = []
+
+    def get(self, path, datapath):
+        import io
+
+        if self.gate is not None:
+            self.gate.wait()
+        self.gets.append(path)
+        return io.BytesIO(self.objects[path])
+
+
+def test_prefetcher_waits_for_download(tmp_path):
+    from cc.prefetch import Prefetcher
+
+    gate = threading.Event()
+    store = _Store({"a/in.bin": b"data"}, gate)
+    prefetcher = Prefetcher(str(tmp_path), max_workers=2)
+    prefetcher.start(store, "a/in.bin")
+    prefetcher.start(store, "a/in.bin")
+    assert prefetcher.wait("FFRD", "b/in.bin") is None
+
+    threading.Timer(0.05, gate.set).start()
+    local = prefetcher.wait("FFRD", "a/in.bin")
+    with open(local, "rb") as f:
+        assert f.read() == b"data"
+    assert store.gets == ["a/in.bin"]
+
+    # failed downloads fall back to reading from the store
+    prefetcher.start(store, "missing.bin")
+    assert prefetcher.wait("FFRD", "missing.bin") is None
+    prefetcher.close()
+    assert tmp_path.exists()
+
+
+def test_plugin_manager_prefetch(tmp_path, monkeypatch, moto_env, object_fetches):
+    from cc import prefetch
+    from cc.plugin_manager import PluginManager, DataSourceOpInput
+
+    monkeypatch.setenv(prefetch.CcPrefetch, "true")
+    monkeypatch.setenv(prefetch.CcPrefetchDir, str(tmp_path / "staging"))
+    monkeypatch.setattr(prefetch, "_prefetcher", None)
+    moto_env.put_payload(PAYLOAD)
+    moto_env.put("model-library/sims/in.bin", b"input")
+    moto_env.put("model-library/sims/other.bin", b"other")
+
+    pm = PluginManager()
+    prefetcher = pm._iomgr._prefetcher
+    assert prefetcher.wait("FFRD", "model-library/sims/in.bin") is not None
+    assert prefetcher.wait("FFRD", "model-library/sims/other.bin") is not None
+
+    # reads are served from the staging area
+    with pm.get_reader("in", "default", None) as reader:
+        assert reader.read() == b"input"
+    local = tmp_path / "other.bin"
+    pm.copy_file_to_local(DataSourceOpInput("in", "other", None), str(local))
+    assert local.read_bytes() == b"other"
+    assert object_fetches == ["cc_store/payload/payload"]
+    prefetcher.close()
@@ -0,0 +1,147 @@
+import os
+import pytest
+
+
+def test_checksum_round_trip(s3_store, tmp_path):
+    from cc import filesapi
+
+    src = tmp_path / "out.bin"
+    src.write_bytes(os.urandom(100000))
+    assert s3_store.upload_file(src, "/outputs/out.bin")
+    assert s3_store.get_object_info("outputs/out.bin").sha256() == filesapi.file_sha256(src)
+    assert not s3_store.upload_file(src, "/outputs/out.bin", skip_unchanged=True)
+
+    src.write_bytes(os.urandom(100000))
+    assert s3_store.upload_file(src, "/outputs/out.bin", skip_unchanged=True)
+
+    dest = tmp_path / "in.bin"
+    assert s3_store.download_file("/outputs/out.bin", dest) == 100000
+    assert dest.read_bytes() == src.read_bytes()
+
+
+def test_checksum_mismatch(s3_store, tmp_path):
+    from cc import filesapi
+
+    s3_store.client.put_object(
+        Bucket=s3_store.bucket,
+        Key="outputs/corrupt.bin",
+        Body=b"corrupt",
+        Metadata={filesapi.CHECKSUM_METADATA_KEY: "0" * 64},
+    )
+    dest = tmp_path / "corrupt.bin"
+    with pytest.raises(filesapi.ChecksumError):
+        s3_store.download_file("outputs/corrupt.bin", dest)
+    assert not dest.exists()
+
+
+def test_put_folder_skip_unchanged(s3_store, tmp_path):
+    for i in range(5):
+        (tmp_path / f"{i}.txt").write_text(f"file {i}")
+    assert len(s3_store.put_folder(tmp_path, "results")) == 5
+    assert s3_store.put_folder(tmp_path, "results", sync=True) == []
+
+    (tmp_path / "2.txt").write_text("file 2 changed")
+    (tmp_path / "5.txt").write_text("file 5")
+    assert sorted(s3_store.put_folder(tmp_path, "results", sync=True)) == ["results/2.txt", "results/5.txt"]
+
+
+def test_sync_folder(s3_store, tmp_path):
+    for i in range(3):
+        (tmp_path / f"{i}.txt").write_text(f"file {i}")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "a.txt").write_text("a")
+    first = s3_store.sync_folder(tmp_path, "synced", compare="size")
+    assert len(first.uploaded) == 4 and first.skipped == [] and first.deleted == []
+
+    (tmp_path / "1.txt").write_text("file 1 changed")
+    (tmp_path / "sub" / "a.txt").unlink()
+    result = s3_store.sync_folder(tmp_path, "synced", compare="size", delete_orphans=True)
+    assert result.uploaded == ["synced/1.txt"]
+    assert sorted(result.skipped) == ["synced/0.txt", "synced/2.txt"]
+    assert result.deleted == ["synced/sub/a.txt"]
+    assert sorted(s3_store._list_objects("synced/")) == ["synced/0.txt", "synced/1.txt", "synced/2.txt"]
+
+    # same size, different content is only caught by the checksum compare
+    (tmp_path / "2.txt").write_text("file X")
+    assert s3_store.sync_folder(tmp_path, "synced", compare="size").uploaded == []
+    assert s3_store.sync_folder(tmp_path, "synced", compare="checksum").uploaded == ["synced/2.txt"]
+
+
+def test_sync_folder_hashes_only_when_needed(s3_store, tmp_path, monkeypatch):
+    from cc import filesapi
+
+    for i in range(3):
+        (tmp_path / f"{i}.txt").write_text(f"file {i}")
+    s3_store.sync_folder(tmp_path, "hashed", compare="size")
+
+    hashed = []
+    file_sha256 = filesapi.file_sha256
+
+    def spy(path):
+        hashed.append(os.path.basename(path))
+        return file_sha256(path)
+
+    monkeypatch.setattr(filesapi, "file_sha256", spy)
+    (tmp_path / "1.txt").write_text("file 1 changed")
+    assert s3_store.sync_folder(tmp_path, "hashed", compare="size").uploaded == ["hashed/1.txt"]
+    # unchanged files are not read and the uploaded one is hashed while it is sent
+    assert hashed == []
+    assert s3_store.get_object_info("hashed/1.txt").sha256() == file_sha256(tmp_path / "1.txt")
+
+
+def test_upload_records_streamed_sha256(s3_store, tmp_path, monkeypatch, caplog):
+    import hashlib
+    import io
+    from cc import filesapi
+
+    # one request: the S3 SHA256 checksum is the object sha256
+    small = os.urandom(1000)
+    assert s3_store.put_object("streamed/small.bin", io.BytesIO(small)) == hashlib.sha256(small).hexdigest()
+    assert s3_store.get_object_info("streamed/small.bin").sha256() == hashlib.sha256(small).hexdigest()
+
+    # multipart: the digest computed while uploading is recorded separately
+    part = 5 * 1024 * 1024
+    monkeypatch.setattr(filesapi, "MULTIPART_THRESHOLD", part)
+    monkeypatch.setattr(filesapi, "MULTIPART_CHUNKSIZE", part)
+    large = os.urandom(part * 2 + 10)
+    assert s3_store.put_object("streamed/large.bin", io.BytesIO(large)) == hashlib.sha256(large).hexdigest()
+    assert s3_store.get_object_info("streamed/large.bin").sha256() == hashlib.sha256(large).hexdigest()
+    with s3_store.open_writer("streamed/written.bin", part_size=part) as writer:
+        writer.write(large)
+    assert s3_store.get_object_info("streamed/written.bin").sha256() == hashlib.sha256(large).hexdigest()
+
+    for key in ["streamed/small.bin", "streamed/large.bin", "streamed/written.bin"]:
+        assert s3_store.download_file(key, tmp_path / "out.bin") == os.path.getsize(tmp_path / "out.bin")
+    assert "not verified" not in caplog.text
+
+    s3_store.client.put_object_tagging(
+        Bucket=s3_store.bucket,
+        Key="streamed/large.bin",
+        Tagging={"TagSet": [{"Key": filesapi.CHECKSUM_METADATA_KEY, "Value": "0" * 64}]},
+    )
+    with pytest.raises(filesapi.ChecksumError):
+        s3_store.download_file("streamed/large.bin", tmp_path / "out.bin")
+
+    # objects without any recorded sha256 are downloaded with a warning
+    s3_store.client.put_object(Bucket=s3_store.bucket, Key="streamed/plain.bin", Body=b"plain")
+    assert s3_store.download_file("streamed/plain.bin", tmp_path / "plain.bin") == 5
+    assert "not verified" in caplog.text
+
+
+def test_sync_folder_dry_run(s3_store, tmp_path):
+    for i in range(3):
+        (tmp_path / f"{i}.txt").write_text(f"file {i}")
+    s3_store.sync_folder(tmp_path, "dry")
+    (tmp_path / "1.txt").write_text("file 1 changed")
+    (tmp_path / "3.txt").write_text("file 3")
+    (tmp_path / "2.txt").unlink()
+
+    dry = s3_store.sync_folder(tmp_path, "dry", delete_orphans=True, dry_run=True)
+    assert sorted(dry.uploaded) == ["dry/1.txt", "dry/3.txt"]
+    assert dry.skipped == ["dry/0.txt"]
+    assert dry.deleted == ["dry/2.txt"]
+    assert sorted(s3_store.put_folder(tmp_path, "dry", sync=True, dry_run=True)) == ["dry/1.txt", "dry/3.txt"]
+
+    # the dry run reports what the real sync does
+    real = s3_store.sync_folder(tmp_path, "dry", delete_orphans=True)
+    assert (sorted(real.uploaded), real.skipped, real.deleted) == (sorted(dry.uploaded), dry.skipped, dry.deleted)
@@ -0,0 +1,35 @@
+import pytest
+
+@pytest.fixture
+def listed_store(s3_store, moto_env):
+    for event in range(1, 4):
+        for name in ["depth.tif", "wse.tif"]:
+            moto_env.put(f"sims/events/{event}/{name}", b"x" * event)
+        moto_env.put(f"sims/events/{event}/logs/run.log", b"log")
+    moto_env.put("sims/manifest.json", b"{}")
+    return s3_store
+
+
+def test_iter_dir(listed_store):
+    entries = list(listed_store.iter_dir("/sims"))
+    assert [(e.key, e.is_dir) for e in entries] == [("sims/events/", True), ("sims/manifest.json", False)]
+    assert entries[1].name == "manifest.json" and entries[1].size == 2
+
+    # a prefix without sub directories has no CommonPrefixes in the response
+    files = list(listed_store.iter_dir("sims/events/1/logs"))
+    assert [e.key for e in files] == ["sims/events/1/logs/run.log"]
+    assert [f.Name for f in listed_store.get_dir("sims/events/1/logs")] == ["run.log"]
+
+
+def test_iter_dir_recursive(listed_store):
+    entries = list(listed_store.iter_dir("sims/", recursive=True, max_workers=2))
+    files = sorted(e.key for e in entries if not e.is_dir)
+    assert len(files) == 10
+    assert "sims/events/3/logs/run.log" in files
+    assert sorted(e.key for e in entries if e.is_dir)[:2] == ["sims/events/", "sims/events/1/"]
+    assert sum(e.size for e in entries) == 2 + 3 * 3 + 2 * (1 + 2 + 3)
+
+    # stopping early does not hang
+    iterator = listed_store.iter_dir("sims/", recursive=True, max_workers=2)
+    next(iterator)
+    iterator.close()
@@ -92,3 +92,345 @@ def test_metadata_tiledb_event_store():
     a = tdb.get_metadata("TEST1")
     print(a)
     tdb.del_metadata("TEST1")
+
+
+def test_consolidate_tiledb_event_store(tmp_path):
+    from cc import event_store_tiledb
+    from cc import event_store
+    from cc.datastore import DataStore
+
+    estore = DataStore(name="EVENT_STORE", store_type="TILEDB", profile="FFRD", params={"root": f"file://{tmp_path}"})
+    tdb = event_store_tiledb.TileDbEventStore()
+    tdb.connect(estore)
+
+    array_path = "/simulations/test_consolidate"
+    tdb.create_array(
+        event_store.CreateArrayInput(
+            attributes={"A1": np.int32},
+            dimensions=[
+                event_store.ArrayDimension(name="d1", domain=[1, 64], tile_extent=16, dimension_type=np.int32),
+                event_store.ArrayDimension(name="d2", domain=[1, 64], tile_extent=16, dimension_type=np.int32),
+            ],
+            array_path=array_path,
+            array_type=event_store.ArrayType.DENSE.value,
+            cell_layout=event_store.LayoutOrder.ROWMAJOR,
+            tile_layout=event_store.LayoutOrder.ROWMAJOR,
+        )
+    )
+
+    for i in range(10):
+        data = np.full((64, 64), i, dtype=np.int32)
+        tdb.put_array(
+            event_store.PutArrayInput(
+                buffers=[event_store.PutArrayBuffers(attr_name="A1", buffer=data, offsets=None)],
+                buffer_range=[1, 64, 1, 64],
+                array_path=array_path,
+                array_type=event_store.ArrayType.DENSE,
+                put_layout=event_store.LayoutOrder.ROWMAJOR.value,
+                coords=None,
+            )
+        )
+    frag_dir = tmp_path / "event_store" / "simulations" / "test_consolidate" / "__fragments"
+    assert tdb.fragment_count(array_path) == 10
+
+    tdb.consolidate(array_path, steps=1, buffer_size=16 * 1024 * 1024)
+    assert tdb.fragment_count(array_path) == 1
+    # the consolidated fragments stay on disk for open readers until the vacuum
+    assert len(list(frag_dir.iterdir())) == 11
+    tdb.vacuum(array_path)
+    assert len(list(frag_dir.iterdir())) == 1
+
+    tdb.consolidate(array_path, event_store.ConsolidationMode.FRAGMENT_META)
+    tdb.vacuum(array_path, event_store.ConsolidationMode.FRAGMENT_META)
+
+    getInput = event_store.GetArrayInput(attrs=["A1"], array_path=array_path, buffer_range=[1, 65, 1, 65])
+    assert np.all(tdb.get_array(getInput)["A1"] == 9)
+
+
+def test_local_tiledb_event_store(tmp_path):
+    from cc import event_store_tiledb
+    from cc.datastore import DataStore
+
+    estore = DataStore(
+        name="EVENT_STORE",
+        store_type="TILEDB",
+        profile="FFRD",
+        params={
+            "root": f"file://{tmp_path}",
+            "max_parallel_ops": "8",
+            "memory_budget": str(512 * 1024 * 1024),
+            "tiledb.sm.mem.total_budget": str(2 * 1024 * 1024 * 1024),
+        },
+    )
+    tdb = event_store_tiledb.TileDbEventStore()
+    tdb.connect(estore)
+
+    config = tdb.context.config()
+    assert config["vfs.s3.max_parallel_ops"] == "8"
+    assert config["sm.memory_budget"] == str(512 * 1024 * 1024)
+    assert config["sm.mem.total_budget"] == str(2 * 1024 * 1024 * 1024)
+
+    tdb.put_metadata("TEST1", "ABCDEFG")
+    assert tdb.get_metadata("TEST1") == "ABCDEFG"
+    tdb.del_metadata("TEST1")
+
+    # reconnecting in the same process must not collide with the first context
+    tdb2 = event_store_tiledb.TileDbEventStore()
+    tdb2.connect(estore)
+    assert tdb2.context is tdb.context
+
+
+def test_ignored_tiledb_config_param(tmp_path, caplog):
+    from cc import event_store_tiledb
+    from cc.datastore import DataStore
+
+    estore = DataStore(
+        name="EVENT_STORE", store_type="TILEDB", profile="FFRD", params={"root": f"file://{tmp_path}", "tile_cache_size": "1024"}
+    )
+    config = event_store_tiledb.tiledb_config(estore)
+    assert "sm.tile_cache_size" not in config.dict()
+    assert "Ignoring event store param tile_cache_size" in caplog.text
+
+
+def test_filtered_tiledb_event_store(tmp_path):
+    from cc import event_store_tiledb
+    from cc import event_store
+    from cc.datastore import DataStore
+
+    estore = DataStore(name="EVENT_STORE", store_type="TILEDB", profile="FFRD", params={"root": f"file://{tmp_path}"})
+    tdb = event_store_tiledb.TileDbEventStore()
+    tdb.connect(estore)
+
+    def dir_size(array_path):
+        return sum(f.stat().st_size for f in (tmp_path / "event_store" / array_path).rglob("*") if f.is_file())
+
+    depth = np.zeros((256, 256), dtype=np.float32)
+    depth[64:192, 64:192] = np.linspace(0, 4, 128 * 128, dtype=np.float32).reshape(128, 128)
+
+    for array_path, filters in [
+        ("raw", {}),
+        (
+            "filtered",
+            {
+                "depth": [
+                    event_store.ArrayFilter(event_store.FilterType.BITSHUFFLE),
+                    event_store.ArrayFilter(event_store.FilterType.ZSTD, level=7),
+                ]
+            },
+        ),
+    ]:
+        tdb.create_array(
+            event_store.CreateArrayInput(
+                attributes={"depth": np.float32},
+                dimensions=[
+                    event_store.ArrayDimension(
+                        name="row",
+                        domain=[1, 256],
+                        tile_extent=64,
+                        dimension_type=np.int32,
+                        filters=[event_store.ArrayFilter(event_store.FilterType.DOUBLE_DELTA)],
+                    ),
+                    event_store.ArrayDimension(name="col", domain=[1, 256], tile_extent=64, dimension_type=np.int32),
+                ],
+                array_path=array_path,
+                array_type=event_store.ArrayType.DENSE.value,
+                cell_layout=event_store.LayoutOrder.ROWMAJOR,
+                tile_layout=event_store.LayoutOrder.ROWMAJOR,
+                attribute_filters=filters,
+            )
+        )
+        tdb.put_array(
+            event_store.PutArrayInput(
+                buffers=[event_store.PutArrayBuffers(attr_name="depth", buffer=depth, offsets=None)],
+                buffer_range=None,
+                array_path=array_path,
+                array_type=event_store.ArrayType.DENSE,
+                put_layout=event_store.LayoutOrder.ROWMAJOR.value,
+                coords=None,
+            )
+        )
+
+    result = tdb.get_array(event_store.GetArrayInput(attrs=["depth"], array_path="filtered", buffer_range=[1, 257, 1, 257]))
+    assert np.array_equal(result["depth"], depth)
+    assert dir_size("filtered") * 4 < dir_size("raw")
+
+
+def test_get_arrays_tiledb_event_store(tmp_path):
+    from cc import event_store_tiledb
+    from cc import event_store
+    from cc.datastore import DataStore
+
+    estore = DataStore(name="EVENT_STORE", store_type="TILEDB", profile="FFRD", params={"root": f"file://{tmp_path}"})
+    tdb = event_store_tiledb.TileDbEventStore()
+    tdb.connect(estore)
+
+    paths = [f"/events/{event}/depth" for event in range(1, 13)]
+    for event, array_path in enumerate(paths, start=1):
+        tdb.create_array(
+            event_store.CreateArrayInput(
+                attributes={"A1": np.int32},
+                dimensions=[
+                    event_store.ArrayDimension(name="d1", domain=[1, 4], tile_extent=2, dimension_type=np.int32),
+                    event_store.ArrayDimension(name="d2", domain=[1, 4], tile_extent=2, dimension_type=np.int32),
+                ],
+                array_path=array_path,
+                array_type=event_store.ArrayType.DENSE.value,
+                cell_layout=event_store.LayoutOrder.ROWMAJOR,
+                tile_layout=event_store.LayoutOrder.ROWMAJOR,
+            )
+        )
+        tdb.put_array(
+            event_store.PutArrayInput(
+                buffers=[event_store.PutArrayBuffers(attr_name="A1", buffer=np.full((4, 4), event, dtype=np.int32), offsets=None)],
+                buffer_range=None,
+                array_path=array_path,
+                array_type=event_store.ArrayType.DENSE,
+                put_layout=event_store.LayoutOrder.ROWMAJOR.value,
+                coords=None,
+            )
+        )
+
+    getInput = event_store.GetArraysInput(attrs=["A1"], array_paths=paths, buffer_range=[1, 5, 1, 5], max_workers=4)
+
+    stacked = tdb.get_arrays(getInput)
+    assert stacked["A1"].shape == (12, 4, 4)
+    assert np.array_equal(stacked["A1"][:, 0, 0], np.arange(1, 13))
+
+    streamed = dict(tdb.iter_arrays(getInput))
+    assert sorted(streamed) == sorted(paths)
+
+    getInput.array_paths = paths + paths[:1]
+    with pytest.raises(ValueError, match="more than once"):
+        tdb.get_arrays(getInput)
+    getInput.array_paths = paths
+
+    getInput.reduce = event_store.ArrayReduction.SUM
+    assert np.all(tdb.get_arrays(getInput)["A1"] == sum(range(1, 13)))
+    getInput.reduce = event_store.ArrayReduction.MAX
+    assert np.all(tdb.get_arrays(getInput)["A1"] == 12)
+    getInput.reduce = event_store.ArrayReduction.MEAN
+    assert np.allclose(tdb.get_arrays(getInput)["A1"], 6.5)
+
+    # DataFrame queries use inclusive ranges
+    getInput.reduce = None
+    getInput.df = True
+    getInput.buffer_range = [1, 4, 1, 4]
+    frame = tdb.get_arrays(getInput)
+    assert len(frame) == 12 * 16
+
+
+def test_iter_array_tiledb_event_store(tmp_path):
+    import tiledb
+    from cc import event_store_tiledb
+    from cc import event_store
+    from cc.datastore import DataStore
+
+    estore = DataStore(name="EVENT_STORE", store_type="TILEDB", profile="FFRD", params={"root": f"file://{tmp_path}"})
+    tdb = event_store_tiledb.TileDbEventStore()
+    tdb.connect(estore)
+
+    data = np.arange(1000 * 100, dtype=np.float64).reshape(1000, 100)
+    for array_type in [event_store.ArrayType.DENSE, event_store.ArrayType.SPARSE]:
+        tdb.create_array(
+            event_store.CreateArrayInput(
+                attributes={"A1": np.float64},
+                dimensions=[
+                    event_store.ArrayDimension(name="d1", domain=[1, 1000], tile_extent=100, dimension_type=np.int32),
+                    event_store.ArrayDimension(name="d2", domain=[1, 100], tile_extent=100, dimension_type=np.int32),
+                ],
+                array_path=array_type.name,
+                array_type=array_type.value,
+                cell_layout=event_store.LayoutOrder.ROWMAJOR,
+                tile_layout=event_store.LayoutOrder.ROWMAJOR,
+            )
+        )
+    tdb.put_array(
+        event_store.PutArrayInput(
+            buffers=[event_store.PutArrayBuffers(attr_name="A1", buffer=data, offsets=None)],
+            buffer_range=None,
+            array_path="DENSE",
+            array_type=event_store.ArrayType.DENSE,
+            put_layout=event_store.LayoutOrder.ROWMAJOR.value,
+            coords=None,
+        )
+    )
+    rows, cols = np.meshgrid(np.arange(1, 1001), np.arange(1, 101), indexing="ij")
+    with tiledb.open(tdb._array_uri("SPARSE"), "w", ctx=tdb.context) as array:
+        array[rows.ravel(), cols.ravel()] = {"A1": data.ravel()}
+
+    budget = 64 * 1024
+    for array_path in ["DENSE", "SPARSE"]:
+        getInput = event_store.GetArrayInput(
+            attrs=["A1"], array_path=array_path, buffer_range=[1, 1001, 1, 101], batch_size=budget
+        )
+        batches = list(tdb.iter_array(getInput))
+        assert len(batches) > 1
+        assert all(b["A1"].nbytes <= budget for b in batches)
+        assert np.array_equal(np.sort(np.concatenate([b["A1"].ravel() for b in batches])), data.ravel())
+
+        getInput.df = True
+        getInput.buffer_range = [1, 1000, 1, 100]
+        frames = list(tdb.iter_array(getInput))
+        assert len(frames) > 1
+        assert sum(len(f) for f in frames) == data.size
+
+    # batch reads share the process contexts
+    tdb2 = event_store_tiledb.TileDbEventStore()
+    tdb2.connect(estore)
+    ctx = tdb._batch_context(budget // 3)
+    assert tdb2._batch_context(budget // 3) is ctx
+    assert tdb._batch_context(budget // 3 + 1) is ctx
+    assert ctx.config()["py.init_buffer_bytes"] == str(16 * 1024)
+
+
+def test_arrow_tiledb_event_store(tmp_path):
+    import pyarrow as pa
+    from cc import event_store_tiledb
+    from cc import event_store
+    from cc.datastore import DataStore
+
+    estore = DataStore(name="EVENT_STORE", store_type="TILEDB", profile="FFRD", params={"root": f"file://{tmp_path}"})
+    tdb = event_store_tiledb.TileDbEventStore()
+    tdb.connect(estore)
+
+    rows, cols = 2000, 500
+    for array_type in [event_store.ArrayType.DENSE, event_store.ArrayType.SPARSE]:
+        tdb.create_array(
+            event_store.CreateArrayInput(
+                attributes={"depth": np.float64},
+                dimensions=[
+                    event_store.ArrayDimension(name="row", domain=[1, rows], tile_extent=100, dimension_type=np.int32),
+                    event_store.ArrayDimension(name="col", domain=[1, cols], tile_extent=100, dimension_type=np.int32),
+                ],
+                array_path=array_type.name,
+                array_type=array_type.value,
+                cell_layout=event_store.LayoutOrder.ROWMAJOR,
+                tile_layout=event_store.LayoutOrder.ROWMAJOR,
+            )
+        )
+
+    depth = np.random.default_rng(0).random(rows * cols)
+    row, col = np.meshgrid(np.arange(1, rows + 1, dtype=np.int32), np.arange(1, cols + 1, dtype=np.int32), indexing="ij")
+    table = pa.table({"row": row.ravel(), "col": col.ravel(), "depth": depth})
+
+    for array_path in ["DENSE", "SPARSE"]:
+        tdb.put_table(table, array_path)
+
+        getInput = event_store.GetArrayInput(
+            attrs=["depth"], array_path=array_path, buffer_range=[1, rows, 1, cols], format="arrow"
+        )
+        result = tdb.get_array(getInput)
+        assert isinstance(result, pa.Table)
+        assert np.allclose(np.sort(result.column("depth").to_numpy()), np.sort(depth))
+
+        getInput.format = event_store.ResultFormat.DATAFRAME
+        frame = tdb.get_array(getInput)
+        assert len(frame) == rows * cols
+        assert np.allclose(np.sort(frame["depth"].to_numpy()), np.sort(depth))
+
+    getInput = event_store.GetArrayInput(
+        attrs=["depth"], array_path="DENSE", buffer_range=[1, rows, 1, cols], format="arrow", batch_size=1024 * 1024
+    )
+    batches = list(tdb.iter_array(getInput))
+    assert len(batches) > 1
+    assert sum(b.num_rows for b in batches) == rows * cols
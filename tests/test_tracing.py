@@ -0,0 +1,55 @@
+import json
+import numpy as np
+import pytest
+
+
+def test_tracing(tmp_path, monkeypatch):
+    from cc import tracing
+    from cc import event_store_tiledb
+    from cc import event_store
+    from cc.datastore import DataStore
+
+    trace_file = tmp_path / "trace.jsonl"
+    tracer = tracing.Tracer(tracing.FileSpanExporter(str(trace_file)))
+    tracer.set_resource(manifest_id="manifest", payload_id="payload", event_number="7")
+    monkeypatch.setattr(tracing, "_tracer", tracer)
+
+    estore = DataStore(name="EVENT_STORE", store_type="TILEDB", profile="FFRD", params={"root": f"file://{tmp_path}"})
+    tdb = event_store_tiledb.TileDbEventStore()
+    tdb.connect(estore)
+
+    with tracer.span("action.run", action="summarize"):
+        tdb.create_array(
+            event_store.CreateArrayInput(
+                attributes={"A1": np.int32},
+                dimensions=[event_store.ArrayDimension(name="d1", domain=[1, 4], tile_extent=2, dimension_type=np.int32)],
+                array_path="/events/7",
+                array_type=event_store.ArrayType.DENSE.value,
+                cell_layout=event_store.LayoutOrder.ROWMAJOR,
+                tile_layout=event_store.LayoutOrder.ROWMAJOR,
+            )
+        )
+        with pytest.raises(Exception):
+            tdb.get_array(event_store.GetArrayInput(attrs=["missing"], array_path="/events/7", buffer_range=[1, 5]))
+
+    tracer.exporter.shutdown()
+    with tracer.span("after.shutdown"):
+        pass
+
+    spans = {s["name"]: s for s in map(json.loads, trace_file.read_text().splitlines())}
+    assert "after.shutdown" not in spans
+    action = spans["action.run"]
+    assert action["attributes"] == {"manifest_id": "manifest", "payload_id": "payload", "event_number": "7", "action": "summarize"}
+    assert spans["tiledb.create_array"]["parent_id"] == action["span_id"]
+    assert spans["tiledb.create_array"]["attributes"]["array"].endswith("/event_store/events/7")
+    assert spans["tiledb.get_array"]["status"] == "ERROR"
+    assert {s["trace_id"] for s in spans.values()} == {tracer.trace_id}
+    assert all(s["end_time"] >= s["start_time"] > 0 for s in spans.values())
+
+
+def test_noop_tracing():
+    from cc import tracing
+
+    tracer = tracing.NoopTracer()
+    with tracer.span("io.get_reader", store="FFRD") as span:
+        span.set_attribute("bytes", 10)
@@ -0,0 +1,131 @@
+import io
+import pytest
+
+class _RawBody:
+    def __init__(self, body: bytes):
+        self.body = body
+
+    def stream(self, **kwargs):
+        yield self.body
+
+
+class FaultInjector:
+    """
+    Fails the first `count` requests for an S3 operation with a throttling response
+    before they are sent to the (moto) S3 backend.
+    """
+
+    def __init__(self, client, operation: str, count: int, code: str = "SlowDown", status: int = 503):
+        self.remaining = count
+        self.code = code
+        self.status = status
+        client.meta.events.register(f"before-send.s3.{operation}", self)
+
+    def __call__(self, request, **kwargs):
+        from botocore.awsrequest import AWSResponse
+
+        if self.remaining <= 0:
+            return None
+        self.remaining -= 1
+        body = f"<Error><Code>{self.code}</Code><Message>injected</Message></Error>".encode()
+        return AWSResponse(request.url, self.status, {}, _RawBody(body))
+
+
+@pytest.fixture
+def governed_store(s3_store):
+    from cc.transfer_governor import TransferGovernor
+
+    s3_store.governor = TransferGovernor(max_concurrency=8, base_delay=0.001)
+    return s3_store
+
+
+def test_governor_retries_throttles(governed_store):
+    store = governed_store
+    store.put_object("data/a.bin", io.BytesIO(b"abc"))
+
+    FaultInjector(store.client, "GetObject", 3)
+    assert store.get_object("data/a.bin").read() == b"abc"
+    FaultInjector(store.client, "ListObjectsV2", 2, code="503")
+    assert [e.key for e in store.iter_dir("data")] == ["data/a.bin"]
+    # uploads are retried by botocore, the governor only sees the errors
+    FaultInjector(store.transfer_client, "PutObject", 1, code="InternalError", status=500)
+    store.put_object("data/b.bin", io.BytesIO(b"def"))
+    assert store.get_object("data/b.bin").read() == b"def"
+
+    stats = store.governor.stats()
+    assert stats["throttles"] == 5
+    assert stats["throttles_by_op"] == {"get_object": 3, "list": 2}
+    assert stats["transient_errors"] == 1
+    assert stats["retries"] == 5
+    assert stats["failures"] == 0
+    # halved on every throttle, then grows back while requests succeed
+    assert stats["min_concurrency_seen"] == 1
+    assert stats["concurrency"] < 8
+
+
+def test_governor_gives_up(governed_store):
+    from botocore.exceptions import ClientError
+
+    store = governed_store
+    store.governor.max_attempts = 3
+    FaultInjector(store.client, "PutObject", 10)
+    with pytest.raises(ClientError):
+        store.governor.call(store.client.put_object, Bucket=store.bucket, Key="data/d.bin", Body=b"x")
+    stats = store.governor.stats()
+    assert stats["retries"] == 2
+    assert stats["failures"] == 1
+
+
+def test_non_seekable_upload_is_retried(governed_store):
+    store = governed_store
+    FaultInjector(store.transfer_client, "PutObject", 2)
+    store.put_object("data/c.bin", _Unseekable(b"xyz"))
+    assert store.get_object("data/c.bin").read() == b"xyz"
+    assert store.governor.stats()["throttles_by_op"] == {"put_object": 2}
+
+
+def test_multipart_upload_retries_parts(governed_store, monkeypatch):
+    from cc import filesapi
+
+    store = governed_store
+    part = 5 * 1024 * 1024
+    monkeypatch.setattr(filesapi, "MULTIPART_THRESHOLD", part)
+    monkeypatch.setattr(filesapi, "MULTIPART_CHUNKSIZE", part)
+    data = bytes(range(256)) * (part * 2 // 256) + b"tail"
+
+    parts = []
+    store.transfer_client.meta.events.register(
+        "before-send.s3.UploadPart", lambda request, **kw: parts.append(request.url)
+    )
+    FaultInjector(store.transfer_client, "UploadPart", 2)
+    store.put_object("data/large.bin", _Unseekable(data))
+    assert store.get_object("data/large.bin").read() == data
+    # only the failed parts are sent again, not the whole object
+    assert len(parts) == 3 + 2
+    assert store.governor.stats()["throttles_by_op"] == {"upload_part": 2}
+
+
+def test_aimd():
+    from cc.transfer_governor import TransferGovernor
+
+    governor = TransferGovernor(min_concurrency=2, max_concurrency=4, initial_concurrency=4)
+    governor._release("throttle", "get_object")
+    governor._release("throttle", "get_object")
+    assert governor.concurrency == 2
+    for _ in range(2):
+        governor._release("ok", "get_object")
+    assert governor.concurrency == 3
+    for _ in range(3):
+        governor._release("ok", "get_object")
+    assert governor.concurrency == 4
+
+
+class _Unseekable:
+    def __init__(self, data: bytes):
+        self.reader = io.BytesIO(data)
+
+    def read(self, *amt):
+        return self.reader.read(*amt)
+
+    def seekable(self):
+        return False
@@ -0,0 +1,90 @@
+import os
+import threading
+import pytest
+
+PAYLOAD = {
+    "attributes": {"event": "{ENV::CC_EVENT_NUMBER}"},
+    "stores": [{"name": "FFRD", "store_type": "S3", "profile": "FFRD", "params": {"root": "model-library"}}],
+    "inputs": [],
+    "outputs": [],
+    "actions": [],
+}
+
+
+def test_parse_request():
+    from cc.worker import parse_request
+
+    assert parse_request("payload-1") == {"payload_id": "payload-1"}
+    assert parse_request('{"payload_id": "p", "event_number": 3}') == {"payload_id": "p", "event_number": 3}
+    with pytest.raises(ValueError):
+        parse_request("{bad")
+
+
+def test_worker(tmp_path, monkeypatch, moto_env):
+    from cc import filesapi
+    from cc.worker import Worker, submit
+
+    monkeypatch.delenv("CC_PAYLOAD_ID")
+    for payload_id in ["p1", "p2"]:
+        moto_env.put_payload(PAYLOAD, payload_id)
+
+    jobs = []
+
+    def handler(pm):
+        jobs.append((pm.payloadId, pm.get_payload().attributes["event"], pm.store, pm.get_store("FFRD")._session.filestore))
+
+    socket_path = str(tmp_path / "worker.sock")
+    worker = Worker(handler, socket_path)
+    thread = threading.Thread(target=worker.serve_forever)
+    thread.start()
+    try:
+        assert worker.wait_ready(5)
+        assert submit("p1", socket_path, event_number=1)["status"] == "ok"
+        assert submit("p2", socket_path, event_number=2)["status"] == "ok"
+        failed = submit("missing", socket_path, event_number=3)
+        assert failed["status"] == "error"
+        assert "NoSuchKey" in failed["error"] or "404" in failed["error"]
+    finally:
+        worker.shutdown()
+        thread.join(5)
+        worker.close()
+
+    assert [(p, e) for p, e, _, _ in jobs] == [("p1", "1"), ("p2", "2")]
+    # boto3 clients are shared between jobs
+    assert jobs[0][2] is jobs[1][2]
+    assert jobs[0][3] is jobs[1][3]
+    assert filesapi._fileStoreCache is None
+    assert "CC_PAYLOAD_ID" not in os.environ
+
+
+def test_worker_discards_prefetched(tmp_path, monkeypatch, moto_env):
+    from cc import prefetch
+    from cc.worker import Worker
+
+    monkeypatch.setenv(prefetch.CcPrefetch, "true")
+    monkeypatch.setenv(prefetch.CcPrefetchDir, str(tmp_path / "staging"))
+    monkeypatch.setattr(prefetch, "_prefetcher", None)
+    payload = dict(PAYLOAD, inputs=[{"name": "in", "paths": {"default": "sims/in.bin"}, "store_name": "FFRD", "data_paths": {}}])
+    moto_env.put_payload(payload, "p1")
+
+    prefetchers = []
+
+    def handler(pm):
+        prefetchers.append(pm._iomgr._prefetcher)
+        with pm.get_reader("in", "default", None) as reader:
+            data = reader.read()
+        if data == b"fail":
+            raise RuntimeError("failed")
+
+    worker = Worker(handler, str(tmp_path / "worker.sock"))
+    try:
+        for data, status in [(b"one", "ok"), (b"two", "ok"), (b"fail", "error")]:
+            moto_env.put("model-library/sims/in.bin", data)
+            assert worker.run({"payload_id": "p1", "event_number": 1})["status"] == status
+            # the job's staged input is removed, so the next job reads the new object
+            assert os.listdir(tmp_path / "staging") == []
+    finally:
+        worker.close()
+        prefetch.get_prefetcher().close()
+    assert len(prefetchers) == 3
+    assert prefetchers[0] is prefetchers[1] is prefetchers[2]